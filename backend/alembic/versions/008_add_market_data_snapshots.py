@@ -0,0 +1,39 @@
+"""Add market data snapshots table
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-08-04 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create market_data_snapshots table used by the background refresher."""
+    op.create_table(
+        'market_data_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(50), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('fetched_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_market_data_snapshots_id', 'market_data_snapshots', ['id'])
+    op.create_index('ix_market_data_snapshots_source', 'market_data_snapshots', ['source'], unique=True)
+
+
+def downgrade():
+    """Drop market_data_snapshots table."""
+    op.drop_index('ix_market_data_snapshots_source', table_name='market_data_snapshots')
+    op.drop_index('ix_market_data_snapshots_id', table_name='market_data_snapshots')
+    op.drop_table('market_data_snapshots')
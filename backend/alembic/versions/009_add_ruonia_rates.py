@@ -0,0 +1,39 @@
+"""Add RUONIA daily rates table
+
+Revision ID: 009
+Revises: 008
+Create Date: 2025-08-05 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create ruonia_rates table holding the daily RUONIA series."""
+    op.create_table(
+        'ruonia_rates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('rate', sa.Float(), nullable=False),
+        sa.Column('volume', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ruonia_rates_id', 'ruonia_rates', ['id'])
+    op.create_index('ix_ruonia_rates_date', 'ruonia_rates', ['date'], unique=True)
+
+
+def downgrade():
+    """Drop ruonia_rates table."""
+    op.drop_index('ix_ruonia_rates_date', table_name='ruonia_rates')
+    op.drop_index('ix_ruonia_rates_id', table_name='ruonia_rates')
+    op.drop_table('ruonia_rates')
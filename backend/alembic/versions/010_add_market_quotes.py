@@ -0,0 +1,44 @@
+"""Add market quotes time series table
+
+Revision ID: 010
+Revises: 009
+Create Date: 2025-08-06 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create market_quotes table holding daily FX, index and commodity values."""
+    op.create_table(
+        'market_quotes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('asset_class', sa.String(20), nullable=False),
+        sa.Column('symbol', sa.String(50), nullable=False),
+        sa.Column('quote_date', sa.Date(), nullable=False),
+        sa.Column('value', sa.Float(), nullable=False),
+        sa.Column('source', sa.String(50), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('symbol', 'quote_date', name='uq_market_quotes_symbol_date')
+    )
+    op.create_index('ix_market_quotes_id', 'market_quotes', ['id'])
+    op.create_index('ix_market_quotes_symbol', 'market_quotes', ['symbol'])
+    op.create_index('ix_market_quotes_quote_date', 'market_quotes', ['quote_date'])
+
+
+def downgrade():
+    """Drop market_quotes table."""
+    op.drop_index('ix_market_quotes_quote_date', table_name='market_quotes')
+    op.drop_index('ix_market_quotes_symbol', table_name='market_quotes')
+    op.drop_index('ix_market_quotes_id', table_name='market_quotes')
+    op.drop_table('market_quotes')
@@ -0,0 +1,26 @@
+"""add_category_to_data_uploads
+
+Revision ID: 011
+Revises: 010
+Create Date: 2025-08-08 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add category column to data_uploads table."""
+    op.add_column('data_uploads', sa.Column('category', sa.String(50), nullable=True))
+
+
+def downgrade():
+    """Remove category column from data_uploads table."""
+    op.drop_column('data_uploads', 'category')
@@ -0,0 +1,28 @@
+"""add_dataset_storage_to_data_uploads
+
+Revision ID: 012
+Revises: 011
+Create Date: 2025-08-12 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add columnar dataset location and row preview to data_uploads table."""
+    op.add_column('data_uploads', sa.Column('dataset_path', sa.String(500), nullable=True))
+    op.add_column('data_uploads', sa.Column('preview_data', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    """Remove columnar dataset columns from data_uploads table."""
+    op.drop_column('data_uploads', 'preview_data')
+    op.drop_column('data_uploads', 'dataset_path')
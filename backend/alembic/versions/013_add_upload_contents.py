@@ -0,0 +1,44 @@
+"""Add upload content index table
+
+Revision ID: 013
+Revises: 012
+Create Date: 2025-08-14 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create upload_contents table indexing uploaded files by SHA-256 per user."""
+    op.create_table(
+        'upload_contents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(30), nullable=False),
+        sa.Column('variant', sa.String(50), nullable=False),
+        sa.Column('content_hash', sa.String(64), nullable=False),
+        sa.Column('parser_version', sa.Integer(), nullable=False),
+        sa.Column('object_ids', sa.JSON(), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'kind', 'variant', 'content_hash', name='uq_upload_contents_user_content')
+    )
+    op.create_index('ix_upload_contents_id', 'upload_contents', ['id'])
+    op.create_index('ix_upload_contents_user_id', 'upload_contents', ['user_id'])
+
+
+def downgrade():
+    """Drop upload_contents table."""
+    op.drop_index('ix_upload_contents_user_id', table_name='upload_contents')
+    op.drop_index('ix_upload_contents_id', table_name='upload_contents')
+    op.drop_table('upload_contents')
@@ -0,0 +1,28 @@
+"""add_processing_progress_to_data_uploads
+
+Revision ID: 014
+Revises: 013
+Create Date: 2025-08-15 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add background processing progress to data_uploads table."""
+    op.add_column('data_uploads', sa.Column('rows_processed', sa.Integer(), nullable=True))
+    op.add_column('data_uploads', sa.Column('error_count', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    """Remove processing progress columns from data_uploads table."""
+    op.drop_column('data_uploads', 'error_count')
+    op.drop_column('data_uploads', 'rows_processed')
@@ -0,0 +1,92 @@
+"""Move data upload rows to a compressed blob table
+
+Revision ID: 015
+Revises: 014
+Create Date: 2025-08-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.compression import compress_json, decompress_json
+
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+# Uploads copied per statement
+BATCH_SIZE = 100
+
+data_uploads = sa.table(
+    'data_uploads',
+    sa.column('id', sa.Integer()),
+    sa.column('raw_data', sa.JSON()),
+)
+
+data_upload_blobs = sa.table(
+    'data_upload_blobs',
+    sa.column('upload_id', sa.Integer()),
+    sa.column('codec', sa.String()),
+    sa.column('data', sa.LargeBinary()),
+    sa.column('size', sa.Integer()),
+)
+
+
+def _upload_ids(conn, query):
+    return [row[0] for row in conn.execute(query)]
+
+
+def upgrade():
+    """Create data_upload_blobs, compress existing raw_data into it and drop the column."""
+    op.create_table(
+        'data_upload_blobs',
+        sa.Column('upload_id', sa.Integer(), nullable=False),
+        sa.Column('codec', sa.String(10), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['upload_id'], ['data_uploads.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('upload_id')
+    )
+
+    conn = op.get_bind()
+    ids = _upload_ids(conn, sa.select(data_uploads.c.id).where(data_uploads.c.raw_data.isnot(None)))
+    for start in range(0, len(ids), BATCH_SIZE):
+        rows = conn.execute(
+            sa.select(data_uploads.c.id, data_uploads.c.raw_data)
+            .where(data_uploads.c.id.in_(ids[start:start + BATCH_SIZE]))
+        )
+        blobs = []
+        for upload_id, raw_data in rows:
+            if raw_data is None:
+                continue
+            codec, data = compress_json(raw_data)
+            blobs.append({'upload_id': upload_id, 'codec': codec, 'data': data, 'size': len(data)})
+        if blobs:
+            conn.execute(data_upload_blobs.insert(), blobs)
+
+    with op.batch_alter_table('data_uploads') as batch_op:
+        batch_op.drop_column('raw_data')
+
+
+def downgrade():
+    """Restore the raw_data column from data_upload_blobs and drop the table."""
+    op.add_column('data_uploads', sa.Column('raw_data', sa.JSON(), nullable=True))
+
+    conn = op.get_bind()
+    ids = _upload_ids(conn, sa.select(data_upload_blobs.c.upload_id))
+    for start in range(0, len(ids), BATCH_SIZE):
+        rows = conn.execute(
+            sa.select(data_upload_blobs.c.upload_id, data_upload_blobs.c.codec, data_upload_blobs.c.data)
+            .where(data_upload_blobs.c.upload_id.in_(ids[start:start + BATCH_SIZE]))
+        )
+        for upload_id, codec, data in rows.all():
+            conn.execute(
+                data_uploads.update()
+                .where(data_uploads.c.id == upload_id)
+                .values(raw_data=decompress_json(codec, data))
+            )
+
+    op.drop_table('data_upload_blobs')
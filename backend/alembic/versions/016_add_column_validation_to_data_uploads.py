@@ -0,0 +1,26 @@
+"""add_column_validation_to_data_uploads
+
+Revision ID: 016
+Revises: 015
+Create Date: 2025-08-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '016'
+down_revision = '015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add per-column validation results to data_uploads table."""
+    op.add_column('data_uploads', sa.Column('column_validation', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    """Remove per-column validation results from data_uploads table."""
+    op.drop_column('data_uploads', 'column_validation')
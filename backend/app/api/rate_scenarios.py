@@ -2,14 +2,16 @@
 API endpoints for rate scenario management
 """
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date
 import tempfile
 import os
 
+from app.core.http_cache import conditional_json_response
 from app.database import get_db
+from app.services.content_index import RATE_SCENARIOS, ContentIndex, read_and_hash
 from app.services.rate_scenario_service import RateScenarioService
 from app.schemas.rate_scenario import (
     RateScenarioResponse, RateScenarioCreate, RateScenarioUpdate,
@@ -44,9 +46,16 @@ async def upload_scenarios_from_excel(
             detail="Only Excel files (.xlsx, .xls) are supported"
         )
     
+    content, content_hash = await read_and_hash(file)
+    
+    # Same workbook uploaded before: its scenarios are already loaded
+    content_index = ContentIndex(db)
+    previous = content_index.lookup(current_user.id, RATE_SCENARIOS, content_hash)
+    if previous is not None:
+        return previous
+    
     # Save uploaded file temporarily
     with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-        content = await file.read()
         tmp_file.write(content)
         tmp_file_path = tmp_file.name
     
@@ -55,6 +64,12 @@ async def upload_scenarios_from_excel(
         service = RateScenarioService(db)
         results = service.upload_scenarios_from_excel(tmp_file_path, current_user.id)
         
+        scenario_ids = [result.scenario_id for result in results if result.scenario_id]
+        if scenario_ids:
+            content_index.record(current_user.id, RATE_SCENARIOS, content_hash, scenario_ids,
+                                 [result.model_dump() for result in results])
+            db.commit()
+        
         return results
         
     finally:
@@ -126,6 +141,7 @@ async def get_scenario(
 
 @router.get("/{scenario_id}/forecasts", response_model=List[RateForecastResponse])
 async def get_scenario_forecasts(
+    request: Request,
     scenario_id: int,
     indicator: str = "KEY_RATE",
     start_date: Optional[date] = None,
@@ -150,14 +166,25 @@ async def get_scenario_forecasts(
             detail="Access denied"
         )
     
-    forecasts = service.get_scenario_forecasts(
-        scenario_id=scenario_id,
-        indicator=indicator,
-        start_date=start_date,
-        end_date=end_date
-    )
+    count, max_id, max_created_at = service.get_forecasts_version(scenario_id)
+    last_modified = max(filter(None, (scenario.updated_at, max_created_at)), default=None)
     
-    return forecasts
+    def build():
+        forecasts = service.get_scenario_forecasts(
+            scenario_id=scenario_id,
+            indicator=indicator,
+            start_date=start_date,
+            end_date=end_date
+        )
+        return [RateForecastResponse.model_validate(forecast) for forecast in forecasts]
+    
+    return conditional_json_response(
+        request,
+        cache_key=("rate_scenario_forecasts", scenario_id, indicator, start_date, end_date),
+        validator=(scenario.updated_at, count, max_id, max_created_at),
+        build=build,
+        last_modified=last_modified,
+    )
 
 
 @router.post("/", response_model=RateScenarioResponse)
@@ -1,6 +1,6 @@
 """Market data API routes for external data integration."""
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 import logging
@@ -9,6 +9,9 @@ from app.database import get_db
 from app.models.user import User
 from app.api.dependencies import get_current_user
 from app.services.external_data_service import external_data_service
+from app.core.ttl_cache import get_cache_stats
+from app.core.circuit_breaker import get_circuit_breaker_metrics
+from app.services.market_dashboard import dashboard_snapshot
 from app.services.enhanced_scenario_service import EnhancedScenarioService
 
 logger = logging.getLogger(__name__)
@@ -18,12 +21,13 @@ router = APIRouter()
 
 @router.get("/market-data/currencies", response_model=List[Dict[str, Any]])
 async def get_currency_rates(
+    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get current currency exchange rates."""
     
     try:
-        rates = external_data_service.get_currency_rates()
+        rates = external_data_service.get_stored_currency_rates(db)
         
         return [
             {
@@ -131,7 +135,8 @@ async def get_economic_indicators(
         raise HTTPException(status_code=500, detail=f"Error fetching economic indicators: {str(e)}")
 
 
-@router.get("/market-data/volatility/{symbol}", response_model=Dict[str, float])
+# Symbols of recorded series contain a slash, e.g. USD/RUB
+@router.get("/market-data/volatility/{symbol:path}", response_model=Dict[str, Optional[float]])
 async def get_volatility_data(
     symbol: str,
     period: str = Query(default="1y", description="Time period for volatility"),
@@ -148,6 +153,24 @@ async def get_volatility_data(
         raise HTTPException(status_code=500, detail=f"Error fetching volatility data: {str(e)}")
 
 
+@router.get("/market-data/cache-stats", response_model=List[Dict[str, Any]])
+async def get_market_data_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Get hit/miss counters of the external market data caches."""
+    
+    return get_cache_stats()
+
+
+@router.get("/market-data/circuit-breakers", response_model=List[Dict[str, Any]])
+async def get_upstream_circuit_breakers(
+    current_user: User = Depends(get_current_user)
+):
+    """Get state, failure rates and latency of upstream provider circuit breakers."""
+    
+    return get_circuit_breaker_metrics()
+
+
 @router.post("/scenarios/{scenario_id}/enhanced-analysis", response_model=Dict[str, Any])
 async def run_enhanced_scenario_analysis(
     scenario_id: int,
@@ -175,6 +198,49 @@ async def run_enhanced_scenario_analysis(
         raise HTTPException(status_code=500, detail=f"Error running enhanced analysis: {str(e)}")
 
 
+@router.post("/scenarios/enhanced-analysis/batch", response_model=Dict[str, Any])
+async def run_enhanced_scenario_analysis_batch(
+    scenario_ids: List[int],
+    stress_test: bool = Query(default=False, description="Include stress testing"),
+    workers: int = Query(default=1, ge=1, le=8, description="Worker threads for the analyses"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Run enhanced analysis for several scenarios with one load of external and upload data."""
+    
+    if not scenario_ids:
+        raise HTTPException(status_code=400, detail="scenario_ids must not be empty")
+    
+    try:
+        enhanced_service = EnhancedScenarioService(db)
+        batch = enhanced_service.execute_enhanced_scenarios(
+            scenario_ids, stress_test, user_id=current_user.id, max_workers=workers
+        )
+        
+        return {
+            "results": [
+                {
+                    "scenario_id": scenario_id,
+                    "scenario_name": result.scenario_name,
+                    "base_case": result.base_case,
+                    "stressed_case": result.stressed_case,
+                    "risk_metrics": result.risk_metrics,
+                    "recommendations": result.recommendations
+                }
+                for scenario_id, result in batch.results.items()
+            ],
+            "errors": [
+                {"scenario_id": scenario_id, "detail": detail}
+                for scenario_id, detail in batch.errors.items()
+            ],
+            "external_factors": batch.external_factors
+        }
+        
+    except Exception as e:
+        logger.error(f"Error running batch enhanced analysis: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error running batch enhanced analysis: {str(e)}")
+
+
 @router.post("/scenarios/currency-risk", response_model=Dict[str, Any])
 async def run_currency_risk_analysis(
     upload_ids: List[int],
@@ -301,46 +367,10 @@ async def get_market_dashboard_data(
     
     try:
         logger.info(f"Dashboard data requested by user {current_user.email}")
-        # Get all market data for dashboard
-        currency_rates = external_data_service.get_currency_rates()
-        interest_rates = external_data_service.get_interest_rates()
-        commodity_prices = external_data_service.get_commodity_prices()
-        market_indices = external_data_service.get_market_indices()
-        economic_indicators = external_data_service.get_economic_indicators()
-        
-        return {
-            "currency_rates": [
-                {
-                    "base_currency": rate.base_currency,
-                    "target_currency": rate.target_currency,
-                    "rate": rate.rate,
-                    "timestamp": rate.timestamp.isoformat()
-                }
-                for rate in currency_rates[:5]  # Top 5 currencies
-            ],
-            "interest_rates": interest_rates,
-            "commodity_prices": [
-                {
-                    "commodity": price.commodity,
-                    "price": price.price,
-                    "currency": price.currency,
-                    "timestamp": price.timestamp.isoformat()
-                }
-                for price in commodity_prices[:5]  # Top 5 commodities
-            ],
-            "market_indices": [
-                {
-                    "symbol": data.symbol,
-                    "value": data.value,
-                    "timestamp": data.timestamp.isoformat(),
-                    "metadata": data.metadata
-                }
-                for data in market_indices[:5]  # Top 5 indices
-            ],
-            "economic_indicators": economic_indicators,
-            "last_updated": market_indices[0].timestamp.isoformat() if market_indices else None
-        }
+        # Pre-serialized snapshot, rebuilt concurrently from all sources in the background
+        body = await dashboard_snapshot.get_body()
+        return Response(content=body, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Error getting market dashboard data: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error getting market dashboard data: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error getting market dashboard data: {str(e)}")
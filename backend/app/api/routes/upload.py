@@ -1,21 +1,32 @@
 """Data upload API routes."""
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, undefer_group
 from typing import List, Optional
 import pandas as pd
 import io
 import json
 import logging
-from datetime import datetime
+import os
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
 
+from app.config import settings
 from app.database import get_db
 from app.models.user import User
 from app.models.data_upload import DataUpload, DataUploadStatus
 from app.api.dependencies import get_current_user
-from app.services.upload_service import UploadService
-from app.services.validation_service import ValidationService
+from app.services.dataset_store import dataset_store
+from app.services.upload_frames import upload_frame_cache
+from app.services.content_index import DATA_UPLOAD, ContentIndex, read_and_hash
+from app.services.upload_jobs import process_file_upload, upload_job_runner
+from app.services.batch_upload import batch_parser, batch_report, expand_bundle, read_batch_files, store_batch
+from app.services.upload_preview import build_preview, process_confirmed_upload, read_head
+from app.services.upload_corrections import apply_corrections
+from app.services.streaming_ingest import UploadTooLarge, detect_encoding, ingest_csv, spool_upload
 
 router = APIRouter()
 
@@ -37,116 +48,341 @@ async def upload_file(
             detail="Only CSV and Excel files are supported"
         )
     
-    # Validate file size (10MB limit)
-    file_content = await file.read()
-    if len(file_content) > 10 * 1024 * 1024:  # 10MB
+    # Validate file size
+    file_content, content_hash = await read_and_hash(file)
+    if len(file_content) > settings.max_file_size:
         raise HTTPException(
             status_code=400,
-            detail="File size exceeds 10MB limit"
+            detail=f"File size exceeds {settings.max_file_size / (1024 * 1024):.0f}MB limit"
         )
     
-    # Reset file pointer
-    await file.seek(0)
+    # Same bytes uploaded before: return the existing upload
+    content_index = ContentIndex(db)
+    previous = content_index.lookup(current_user.id, DATA_UPLOAD, content_hash, variant=category)
+    if previous is not None:
+        return {**previous, "deduplicated": True}
+    
+    # Create upload record
+    upload_record = DataUpload(
+        user_id=current_user.id,
+        name=name,
+        description=description,
+        source_type=file.filename.split('.')[-1].lower(),
+        category=category,
+        file_size=len(file_content),
+        status=DataUploadStatus.PENDING
+    )
+    
+    db.add(upload_record)
+    db.commit()
+    db.refresh(upload_record)
+    
+    # Parse, validate and store in the background; progress is polled
+    upload_job_runner.submit(
+        upload_record.id,
+        partial(process_file_upload, filename=file.filename, file_content=file_content, content_hash=content_hash)
+    )
+    
+    return {
+        "upload_id": upload_record.id,
+        "status": upload_record.status.value
+    }
+
+@router.post("/upload/batch", response_model=dict)
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    category: str = Form(...),
+    categories: Optional[str] = Form(None),  # JSON object of file name -> category, overrides category
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Upload several CSV/Excel files, or ZIP archives of them, parsed and validated concurrently."""
     
     try:
-        # Create upload record
+        category_overrides = json.loads(categories) if categories else {}
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON format for categories")
+    
+    if not isinstance(category_overrides, dict):
+        raise HTTPException(status_code=400, detail="Categories must map file names to categories")
+    
+    try:
+        contents = await read_batch_files(files, settings.max_file_size, settings.max_batch_upload_size)
+        bundle = expand_bundle(contents, settings.max_file_size, settings.max_batch_upload_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not bundle:
+        raise HTTPException(status_code=400, detail="The batch contains no files")
+    
+    file_categories = [
+        category_overrides.get(filename, category_overrides.get(os.path.basename(filename), category))
+        for filename, _ in bundle
+    ]
+    try:
+        parsed_files = await run_in_threadpool(batch_parser.parse, bundle, file_categories)
+    except BrokenProcessPool:
+        logging.error("Batch upload worker process died")
+        raise HTTPException(
+            status_code=503,
+            detail="Batch parsing was interrupted, please retry the upload"
+        )
+    
+    try:
+        uploads = store_batch(db, current_user.id, parsed_files)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error storing batch: {str(e)}"
+        )
+    
+    return batch_report(uploads, parsed_files)
+
+@router.post("/upload/stream", response_model=dict)
+async def upload_file_stream(
+    file: UploadFile = File(...),
+    name: str = Form(...),
+    description: Optional[str] = Form(None),
+    category: str = Form(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Upload a large CSV file, parsed, validated and stored in chunks."""
+    
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(
+            status_code=400,
+            detail="Only CSV files can be streamed"
+        )
+    
+    if not dataset_store.enabled:
+        raise HTTPException(
+            status_code=503,
+            detail="Streaming uploads require columnar dataset storage"
+        )
+    
+    # Spool to disk instead of holding the file in memory
+    try:
+        spool_path, file_size, content_hash = await spool_upload(
+            file, os.path.join(settings.upload_dir, "spool"), settings.max_stream_upload_size
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        # Same bytes uploaded before: return the existing upload
+        content_index = ContentIndex(db)
+        previous = content_index.lookup(current_user.id, DATA_UPLOAD, content_hash, variant=category)
+        if previous is not None:
+            return {**previous, "deduplicated": True}
+        
+        try:
+            encoding = detect_encoding(spool_path)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
         upload_record = DataUpload(
             user_id=current_user.id,
             name=name,
             description=description,
-            source_type=file.filename.split('.')[-1].lower(),
-            file_size=len(file_content),
+            source_type="csv",
+            category=category,
+            file_size=file_size,
             status=DataUploadStatus.PROCESSING
         )
-        
         db.add(upload_record)
         db.commit()
         db.refresh(upload_record)
         
-        # Process the file
-        upload_service = UploadService()
-        validation_service = ValidationService()
-        
-        # Parse file data with encoding detection
-        if file.filename.endswith('.csv'):
-            # List of encodings to try in order
-            encodings_to_try = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1', 'utf-16']
-            
-            df = None
-            used_encoding = None
-            
-            for encoding in encodings_to_try:
-                try:
-                    df = pd.read_csv(io.StringIO(file_content.decode(encoding)))
-                    used_encoding = encoding
-                    break
-                except (UnicodeDecodeError, UnicodeError, LookupError):
-                    continue
-            
-            if df is None:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Unable to decode CSV file. Please ensure the file is saved in UTF-8 or standard encoding."
-                )
-                
-            logging.info(f"Successfully parsed CSV file with encoding: {used_encoding}")
-            
-        else:  # Excel
-            try:
-                df = pd.read_excel(io.BytesIO(file_content))
-            except Exception as e:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Unable to read Excel file: {str(e)}"
-                )
-        
-        # Check if dataframe is empty
-        if df.empty:
+        try:
+            result = await run_in_threadpool(ingest_csv, spool_path, upload_record.id, category, encoding)
+        except Exception as e:
+            upload_record.status = DataUploadStatus.FAILED
+            upload_record.processing_log = str(e)
+            db.commit()
             raise HTTPException(
-                status_code=400,
-                detail="The uploaded file is empty or contains no valid data rows."
+                status_code=400 if isinstance(e, ValueError) else 500,
+                detail=f"Error processing file: {str(e)}"
             )
         
-        logging.info(f"Successfully parsed file with {len(df)} rows and {len(df.columns)} columns")
-        logging.info(f"Columns: {list(df.columns)}")
-        
-        # Validate data
-        validation_errors = validation_service.validate_financial_data(df, category)
-        
-        # Convert to JSON for storage
-        data_dict = df.to_dict(orient='records')
-        
-        # Update upload record
-        upload_record.raw_data = data_dict
-        upload_record.row_count = len(df)
-        upload_record.validation_errors = validation_errors
-        upload_record.status = DataUploadStatus.COMPLETED if not validation_errors else DataUploadStatus.FAILED
-        
+        upload_record.dataset_path = result.dataset_path
+        upload_record.preview_data = result.preview
+        upload_record.row_count = result.row_count
+        upload_record.validation_errors = result.validation_errors
+        upload_record.column_validation = result.column_validation
+        upload_record.status = DataUploadStatus.COMPLETED if not result.validation_errors else DataUploadStatus.FAILED
         db.commit()
         db.refresh(upload_record)
         
-        return {
+        logging.info(f"Streamed {file_size} bytes into {result.row_count} rows with encoding {encoding}")
+        
+        response = {
             "upload_id": upload_record.id,
             "status": upload_record.status.value,
             "row_count": upload_record.row_count,
-            "column_count": len(df.columns),
-            "columns": list(df.columns),
-            "validation_errors": validation_errors,
-            "preview_data": data_dict[:5] if data_dict else [],  # First 5 rows
-            "encoding_used": used_encoding if file.filename.endswith('.csv') else None
+            "column_count": len(result.columns),
+            "columns": result.columns,
+            "validation_errors": result.validation_errors,
+            "preview_data": result.preview,
+            "encoding_used": encoding
         }
+        content_index.record(current_user.id, DATA_UPLOAD, content_hash, [upload_record.id],
+                             jsonable_encoder(response), variant=category)
+        db.commit()
         
+        return response
+    
+    finally:
+        os.remove(spool_path)
+
+@router.post("/upload/preview", response_model=dict)
+async def preview_upload(
+    file: UploadFile = File(...),
+    name: str = Form(...),
+    description: Optional[str] = Form(None),
+    category: str = Form(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Upload a file and preview its first rows; processing starts once the column mapping is confirmed."""
+    
+    if not file.filename.endswith(('.csv', '.xlsx', '.xls')):
+        raise HTTPException(
+            status_code=400,
+            detail="Only CSV and Excel files are supported"
+        )
+    
+    source_type = file.filename.split('.')[-1].lower()
+    try:
+        file_path, file_size, _ = await spool_upload(
+            file, os.path.join(settings.upload_dir, "pending"), settings.max_file_size, suffix=f".{source_type}"
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        df, encoding = await run_in_threadpool(read_head, file_path, settings.upload_preview_scan_rows)
+        if df.empty:
+            raise ValueError("The uploaded file is empty or contains no valid data rows.")
+        preview = build_preview(df, encoding, category, settings.upload_preview_rows)
     except Exception as e:
-        # Update upload record with error
-        if 'upload_record' in locals():
-            upload_record.status = DataUploadStatus.FAILED
-            upload_record.processing_log = str(e)
-            db.commit()
-        
+        os.remove(file_path)
         raise HTTPException(
-            status_code=500,
-            detail=f"Error processing file: {str(e)}"
+            status_code=400,
+            detail=f"Unable to read file: {str(e)}"
         )
+    
+    upload_record = DataUpload(
+        user_id=current_user.id,
+        name=name,
+        description=description,
+        source_type=source_type,
+        category=category,
+        file_path=file_path,
+        file_size=file_size,
+        preview_data=jsonable_encoder(preview["preview_data"]),
+        status=DataUploadStatus.PENDING
+    )
+    db.add(upload_record)
+    db.commit()
+    db.refresh(upload_record)
+    
+    return {
+        "upload_id": upload_record.id,
+        "status": upload_record.status.value,
+        **preview
+    }
+
+@router.post("/uploads/{upload_id}/confirm", response_model=dict)
+async def confirm_upload(
+    upload_id: int,
+    column_mapping: Optional[str] = Form(None),  # JSON object of file column -> column name
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Confirm the column mapping of a previewed upload and process it in the background."""
+    
+    upload = db.query(DataUpload).filter(
+        DataUpload.id == upload_id,
+        DataUpload.user_id == current_user.id
+    ).first()
+    
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    if upload.status != DataUploadStatus.PENDING or not upload.file_path:
+        raise HTTPException(status_code=400, detail="Upload is not awaiting confirmation")
+    
+    try:
+        mapping = json.loads(column_mapping) if column_mapping else {}
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON format for column mapping")
+    
+    if not isinstance(mapping, dict) or not all(isinstance(value, str) for value in mapping.values()):
+        raise HTTPException(status_code=400, detail="Column mapping must map column names to new names")
+    
+    upload.status = DataUploadStatus.PROCESSING
+    db.commit()
+    
+    upload_job_runner.submit(upload.id, partial(process_confirmed_upload, column_mapping=mapping))
+    
+    return {
+        "upload_id": upload.id,
+        "status": upload.status.value
+    }
+
+@router.post("/uploads/{upload_id}/corrections", response_model=dict)
+async def correct_upload(
+    upload_id: int,
+    column_mapping: Optional[str] = Form(None),  # JSON object of column -> new column name
+    values: Optional[str] = Form(None),  # JSON list of {"row", "column", "value"}
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Remap columns or fix values of a processed upload, re-validating only the columns corrected."""
+    
+    upload = db.query(DataUpload).options(
+        undefer_group("details"), joinedload(DataUpload.blob)
+    ).filter(
+        DataUpload.id == upload_id,
+        DataUpload.user_id == current_user.id
+    ).first()
+    
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    if upload.status not in (DataUploadStatus.COMPLETED, DataUploadStatus.FAILED):
+        raise HTTPException(status_code=400, detail="Upload has not been processed yet")
+    
+    try:
+        mapping = json.loads(column_mapping) if column_mapping else {}
+        corrections = json.loads(values) if values else []
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON format for corrections")
+    
+    if not isinstance(mapping, dict) or not all(isinstance(value, str) for value in mapping.values()):
+        raise HTTPException(status_code=400, detail="Column mapping must map column names to new names")
+    
+    if not isinstance(corrections, list) or not all(isinstance(value, dict) for value in corrections):
+        raise HTTPException(status_code=400, detail="Values must be a list of row, column and value objects")
+    
+    try:
+        result = await run_in_threadpool(apply_corrections, upload, mapping, corrections)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Re-uploading the original file must not return the corrected upload
+    ContentIndex(db).forget(current_user.id, DATA_UPLOAD, upload_id)
+    db.commit()
+    upload_frame_cache.invalidate(upload_id)
+    
+    return {
+        "upload_id": upload_id,
+        "status": upload.status.value,
+        "columns": result.names,
+        "validation_errors": upload.validation_errors
+    }
 
 @router.post("/manual", response_model=dict)
 async def create_manual_entry(
@@ -169,6 +405,7 @@ async def create_manual_entry(
             name=name,
             description=description,
             source_type="manual",
+            category=category,
             raw_data=entries_data,
             row_count=len(entries_data),
             status=DataUploadStatus.COMPLETED
@@ -230,7 +467,9 @@ async def get_upload(
 ):
     """Get a specific upload by ID."""
     
-    upload = db.query(DataUpload).filter(
+    upload = db.query(DataUpload).options(
+        undefer_group("details"), joinedload(DataUpload.blob)
+    ).filter(
         DataUpload.id == upload_id,
         DataUpload.user_id == current_user.id
     ).first()
@@ -241,6 +480,10 @@ async def get_upload(
             detail="Upload not found"
         )
     
+    raw_data = upload.raw_data
+    if upload.dataset_path:
+        raw_data = dataset_store.load_upload_frame(upload).to_dict(orient='records')
+    
     return {
         "id": upload.id,
         "name": upload.name,
@@ -249,12 +492,47 @@ async def get_upload(
         "status": upload.status.value,
         "row_count": upload.row_count,
         "file_size": upload.file_size,
-        "raw_data": upload.raw_data,
+        "raw_data": raw_data,
+        "preview_data": upload.preview_data,
         "validation_errors": upload.validation_errors,
         "created_at": upload.created_at.isoformat(),
         "updated_at": upload.updated_at.isoformat()
     }
 
+@router.get("/uploads/{upload_id}/progress", response_model=dict)
+async def get_upload_progress(
+    upload_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Processing status of an upload, cheap enough to poll."""
+    
+    progress = db.query(
+        DataUpload.status,
+        DataUpload.row_count,
+        DataUpload.rows_processed,
+        DataUpload.error_count,
+        DataUpload.processing_log
+    ).filter(
+        DataUpload.id == upload_id,
+        DataUpload.user_id == current_user.id
+    ).first()
+    
+    if not progress:
+        raise HTTPException(
+            status_code=404,
+            detail="Upload not found"
+        )
+    
+    return {
+        "upload_id": upload_id,
+        "status": progress.status.value,
+        "row_count": progress.row_count,
+        "rows_processed": progress.rows_processed,
+        "error_count": progress.error_count,
+        "processing_log": progress.processing_log
+    }
+
 @router.delete("/uploads/{upload_id}")
 async def delete_upload(
     upload_id: int,
@@ -274,8 +552,14 @@ async def delete_upload(
             detail="Upload not found"
         )
     
+    dataset_path, pending_path = upload.dataset_path, upload.file_path
     db.delete(upload)
     db.commit()
+    dataset_store.delete(dataset_path)
+    # Previewed files that were never confirmed
+    if pending_path and os.path.exists(pending_path):
+        os.remove(pending_path)
+    upload_frame_cache.invalidate(upload_id)
     
     return {"message": "Upload deleted successfully"}
 
@@ -63,10 +63,62 @@ class Settings(BaseSettings):
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     upload_dir: str = "uploads"
     allowed_extensions: List[str] = ["csv", "xlsx", "xls", "json"]
+    dataset_storage: str = "arrow"  # "arrow" (columnar files, needs pyarrow) or "json" (raw_data column)
+    dataset_dir: Optional[str] = None  # defaults to <upload_dir>/datasets
+    upload_preview_rows: int = 5
+    upload_preview_scan_rows: int = 1000  # head of a file read to detect columns and types before confirming
+    max_stream_upload_size: int = 500 * 1024 * 1024  # 500MB, streamed CSV uploads
+    upload_chunk_rows: int = 50_000  # rows parsed, validated and written at a time when streaming
+    upload_job_workers: int = 2  # threads parsing and validating uploads in the background
+    upload_job_stale_minutes: int = 30  # unfinished uploads untouched this long are recovered at startup
+    upload_preview_max_age_hours: int = 24  # unconfirmed previews this old are failed and their files removed
+    batch_upload_workers: int = 4  # processes parsing the files of a batch upload
+    batch_upload_concurrency: int = 2  # batches parsed at the same time, later ones wait
+    max_batch_upload_size: int = 100 * 1024 * 1024  # 100MB, all files of a batch after unzipping
     
     # Monitoring
     sentry_dsn: Optional[str] = Field(None, env="SENTRY_DSN")
-    
+
+    # Market data background refresh
+    market_data_refresh_enabled: bool = True
+    market_data_refresh_interval: int = 3600  # seconds between refresh runs
+    market_data_refresh_jitter: float = 0.1  # +/- fraction of the interval
+    market_data_key_rate_days_back: int = 30
+    market_data_lock_file: Optional[str] = None  # defaults to <tmp>/cfo_cto_helper_market_data.lock
+    market_data_max_age: int = 3 * 3600  # seconds a stored snapshot is served before handlers fetch live
+
+    # In-process cache of external market data calls
+    external_data_cache_ttl: int = 300  # seconds a value is served as fresh
+    external_data_cache_stale_ttl: int = 3600  # further seconds served stale while refreshing
+
+    # Upstream circuit breakers and latency budgets
+    circuit_breaker_failure_rate: float = 0.5  # failure share of the window that opens the breaker
+    circuit_breaker_window: int = 20  # most recent calls considered
+    circuit_breaker_min_calls: int = 5  # calls in the window before the rate is evaluated
+    circuit_breaker_open_seconds: int = 60  # rejection period before a half-open probe
+    moex_request_timeout: float = 5.0  # seconds
+    cbr_request_timeout: float = 10.0  # seconds
+    cbr_ruonia_latency_budget: float = 20.0  # seconds for all RUONIA fallback endpoints together
+
+    # Market dashboard aggregation
+    dashboard_source_timeout: float = 5.0  # seconds per data source
+    dashboard_snapshot_ttl: int = 60  # seconds before the snapshot is rebuilt in the background
+
+    # Memory-mapped rate curve store shared by workers
+    curve_store_path: Optional[str] = None  # defaults to <tmp>/cfo_cto_helper_curves.bin
+
+    # Server-side cache of serialized conditional-GET responses
+    http_cache_max_entries: int = 256
+
+    # Historical-simulation VaR / Expected Shortfall
+    var_window: int = 250  # historical days revalued
+    var_confidence: float = 0.95
+    var_method: str = "hs"  # "hs" or "fhs" (EWMA-filtered)
+
+    # In-process cache of upload rows as DataFrames
+    upload_frame_cache_max_mb: int = 256  # memory bound, least recently used frames are evicted
+    parse_cache_max_mb: int = 128  # parsed upload files by content hash, shared by all users
+
     @field_validator("cors_origins", mode="before")
     @classmethod
     def assemble_cors_origins(cls, v):
@@ -0,0 +1,208 @@
+"""Circuit breaker and latency budget for upstream providers."""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# Breakers by provider name, for monitoring
+circuit_breakers: Dict[str, "CircuitBreaker"] = {}
+
+_deadline: ContextVar[Optional[float]] = ContextVar("upstream_deadline", default=None)
+
+
+class UpstreamUnavailableError(Exception):
+    """Upstream call was not attempted."""
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    """The provider's breaker is open and rejects calls."""
+
+
+class LatencyBudgetExceeded(UpstreamUnavailableError):
+    """The current operation has used up its latency budget."""
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@contextmanager
+def latency_budget(seconds: float):
+    """
+    Limit the total upstream time of the enclosed operation.
+
+    Nested budgets can only shorten the deadline. Breaker timeouts are capped
+    by the remaining budget and calls fail fast once it is used up.
+    """
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker over a sliding window of recent calls.
+
+    CLOSED: calls pass; once the window holds at least ``minimum_calls`` and
+    the failure rate reaches ``failure_rate_threshold`` the breaker opens.
+    Exceptions and calls slower than ``slow_call_threshold`` count as failures.
+    OPEN: calls are rejected immediately for ``open_seconds``.
+    HALF_OPEN: up to ``half_open_max_calls`` probes pass; a successful probe
+    closes the breaker, a failed one opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        failure_rate_threshold: float = 0.5,
+        window_size: int = 20,
+        minimum_calls: int = 5,
+        open_seconds: float = 60,
+        half_open_max_calls: int = 1,
+        slow_call_threshold: Optional[float] = None,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.slow_call_threshold = slow_call_threshold if slow_call_threshold is not None else timeout
+
+        self.state = CircuitState.CLOSED
+        self._window: Deque[Tuple[bool, float]] = deque(maxlen=window_size)
+        self._opened_at: Optional[float] = None
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "calls": 0,
+            "failures": 0,
+            "slow_calls": 0,
+            "rejected": 0,
+            "opened": 0,
+        }
+        self._last_failure: Optional[str] = None
+        self._last_state_change = datetime.now()
+
+    def _transition(self, state: CircuitState) -> None:
+        if state == self.state:
+            return
+        logger.warning("Circuit breaker state change", provider=self.name, old=self.state.value, new=state.value)
+        self.state = state
+        self._last_state_change = datetime.now()
+        if state == CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+            self._counters["opened"] += 1
+        elif state == CircuitState.HALF_OPEN:
+            self._half_open_calls = 0
+        else:
+            self._opened_at = None
+            self._window.clear()
+
+    def effective_timeout(self, requested: Optional[float] = None) -> float:
+        """Timeout for the next call: provider timeout capped by the remaining budget."""
+        timeout = min(requested, self.timeout) if requested is not None else self.timeout
+        deadline = _deadline.get()
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LatencyBudgetExceeded(f"{self.name}: latency budget exhausted")
+            timeout = min(timeout, remaining)
+        return timeout
+
+    def _before_call(self) -> None:
+        with self._lock:
+            if self.state == CircuitState.OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self._counters["rejected"] += 1
+                    raise CircuitOpenError(f"{self.name}: circuit open")
+                self._transition(CircuitState.HALF_OPEN)
+            if self.state == CircuitState.HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    self._counters["rejected"] += 1
+                    raise CircuitOpenError(f"{self.name}: circuit half-open, probe in progress")
+                self._half_open_calls += 1
+
+    def _record(self, success: bool, duration: float, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._counters["calls"] += 1
+            if not success:
+                self._counters["failures"] += 1
+                self._last_failure = error
+            self._window.append((success, duration))
+
+            if self.state == CircuitState.HALF_OPEN:
+                self._transition(CircuitState.CLOSED if success else CircuitState.OPEN)
+            elif self.state == CircuitState.CLOSED and len(self._window) >= self.minimum_calls:
+                failures = sum(1 for ok, _ in self._window if not ok)
+                if failures / len(self._window) >= self.failure_rate_threshold:
+                    self._transition(CircuitState.OPEN)
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func through the breaker; raises CircuitOpenError when rejected."""
+        self._before_call()
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._record(False, time.monotonic() - started, str(e))
+            raise
+
+        duration = time.monotonic() - started
+        slow = duration > self.slow_call_threshold
+        if slow:
+            with self._lock:
+                self._counters["slow_calls"] += 1
+        self._record(not slow, duration, f"slow call: {duration:.2f}s" if slow else None)
+        return result
+
+    def metrics(self) -> Dict[str, Any]:
+        """State, counters and latency of the current window."""
+        with self._lock:
+            durations = sorted(duration for _, duration in self._window)
+            failures = sum(1 for ok, _ in self._window if not ok)
+            retry_in = None
+            if self.state == CircuitState.OPEN:
+                retry_in = max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+            return {
+                "provider": self.name,
+                "state": self.state.value,
+                **self._counters,
+                "window_calls": len(self._window),
+                "window_failure_rate": round(failures / len(self._window), 4) if self._window else 0.0,
+                "latency_avg_ms": round(sum(durations) / len(durations) * 1000, 2) if durations else None,
+                "latency_p95_ms": round(durations[int(0.95 * (len(durations) - 1))] * 1000, 2) if durations else None,
+                "timeout_seconds": self.timeout,
+                "retry_in_seconds": round(retry_in, 2) if retry_in is not None else None,
+                "last_failure": self._last_failure,
+                "last_state_change": self._last_state_change.isoformat(),
+            }
+
+
+def get_circuit_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """Get or create the breaker for a provider."""
+    breaker = circuit_breakers.get(name)
+    if breaker is None:
+        breaker = circuit_breakers[name] = CircuitBreaker(name, **kwargs)
+    return breaker
+
+
+def get_circuit_breaker_metrics() -> List[Dict[str, Any]]:
+    """Metrics of all registered breakers."""
+    return [breaker.metrics() for breaker in circuit_breakers.values()]
@@ -0,0 +1,41 @@
+"""Compression of JSON payloads stored out of row."""
+
+import json
+import zlib
+from typing import Any, Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+ZSTD = "zstd"
+ZLIB = "zlib"
+
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+
+
+def compress(data: bytes) -> Tuple[str, bytes]:
+    """Compress bytes with zstd when available and zlib otherwise, returns (codec, compressed)"""
+    if zstandard is not None:
+        return ZSTD, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return ZLIB, zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed data")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == ZLIB:
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+
+def compress_json(value: Any) -> Tuple[str, bytes]:
+    return compress(json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+def decompress_json(codec: str, data: bytes) -> Any:
+    return json.loads(decompress(codec, data))
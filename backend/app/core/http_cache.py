@@ -0,0 +1,129 @@
+"""HTTP conditional-GET support and server-side cache of serialized responses."""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from app.config import settings
+
+
+class ResponseCache:
+    """Thread-safe bounded LRU cache of serialized response bodies keyed by ETag."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, etag: str) -> Optional[bytes]:
+        """Return the cached body if it was stored under the same ETag."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, etag: str, body: bytes) -> None:
+        """Store a body, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = (etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached bodies."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+response_cache = ResponseCache(max_entries=settings.http_cache_max_entries)
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a strong ETag from the cache key and data validator parts."""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Convert to UTC, dropping sub-second precision.
+
+    Naive timestamps are local time: models and date windows are written with
+    ``datetime.now()``.
+    """
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def latest_modified(*values: Optional[datetime]) -> Optional[datetime]:
+    """Latest of several Last-Modified candidates, naive ones taken as local time."""
+    return max((_as_utc(value) for value in values if value is not None), default=None)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since (RFC 7232)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return _as_utc(last_modified) <= since
+
+    return False
+
+
+def conditional_json_response(
+    request: Request,
+    cache_key: Hashable,
+    validator: Tuple[Any, ...],
+    build: Callable[[], Any],
+    last_modified: Optional[datetime] = None,
+) -> Response:
+    """
+    Serve a JSON payload with ETag / Last-Modified validators.
+
+    ``validator`` must change whenever the underlying data changes (row counts,
+    max ids, max update timestamps). ``build`` is only called when neither the
+    client nor the server-side cache holds the current representation.
+    """
+    etag = make_etag(cache_key, validator)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(cache_key, etag)
+    if body is None:
+        body = json.dumps(
+            jsonable_encoder(build()), ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        response_cache.set(cache_key, etag, body)
+
+    return Response(content=body, media_type="application/json", headers=headers)
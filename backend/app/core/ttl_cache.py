@@ -0,0 +1,178 @@
+"""In-process TTL cache with stale-while-revalidate and single-flight loading."""
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# All caches created by ttl_cached, for monitoring
+cache_registry: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """
+    Bounded TTL cache.
+
+    Fresh entries (age < ttl) are returned directly. Stale entries
+    (ttl <= age < ttl + stale_ttl) are returned immediately while one
+    background thread reloads them. Concurrent misses for the same key share
+    a single load; a failed load is not cached and is raised to every waiter.
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float = 0, max_entries: int = 128):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "refreshes": 0,
+            "errors": 0,
+        }
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for key, loading it with loader if needed."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                if age < self.ttl:
+                    self._counters["hits"] += 1
+                    self._entries.move_to_end(key)
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self._counters["stale_hits"] += 1
+                    self._entries.move_to_end(key)
+                    if key not in self._inflight:
+                        self._inflight[key] = Future()
+                        threading.Thread(
+                            target=self._revalidate,
+                            args=(key, loader),
+                            name=f"cache-refresh-{self.name}",
+                            daemon=True,
+                        ).start()
+                    return value
+
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self._counters["coalesced"] += 1
+                leader = False
+            else:
+                self._counters["misses"] += 1
+                flight = self._inflight[key] = Future()
+                leader = True
+
+        if not leader:
+            return flight.result()
+        return self._load(key, loader, flight)
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], flight: Future) -> Any:
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._counters["errors"] += 1
+            flight.set_exception(e)
+            raise
+
+        self.set(key, value)
+        with self._lock:
+            self._inflight.pop(key, None)
+        flight.set_result(value)
+        return value
+
+    def _revalidate(self, key: Hashable, loader: Callable[[], Any]) -> None:
+        with self._lock:
+            flight = self._inflight[key]
+            self._counters["refreshes"] += 1
+        try:
+            self._load(key, loader, flight)
+        except Exception as e:
+            logger.warning("Background cache refresh failed", cache=self.name, error=str(e))
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value as fresh, e.g. after an out-of-band refresh."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one key or the whole cache."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and configuration for monitoring."""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["stale_hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "size": len(self._entries),
+                "inflight": len(self._inflight),
+                "hit_ratio": round((self._counters["hits"] + self._counters["stale_hits"]) / lookups, 4) if lookups else None,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+            }
+
+
+def make_key(args: tuple, kwargs: dict) -> Hashable:
+    """Hashable cache key from call arguments; lists become tuples."""
+    def freeze(value):
+        if isinstance(value, (list, tuple)):
+            return tuple(freeze(item) for item in value)
+        if isinstance(value, dict):
+            return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+        return value
+
+    return freeze(args), freeze(kwargs)
+
+
+def ttl_cached(name: str, ttl: float, stale_ttl: float = 0, max_entries: int = 128):
+    """
+    Cache a method's results per argument tuple (the instance is not part of the key).
+
+    The wrapped function exposes its cache as ``.cache``. Lists and dicts are
+    returned as shallow copies so callers cannot mutate the cached value.
+    """
+    def decorator(func):
+        cache = TTLCache(name, ttl=ttl, stale_ttl=stale_ttl, max_entries=max_entries)
+        cache_registry[name] = cache
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            value = cache.get_or_load(make_key(args, kwargs), lambda: func(self, *args, **kwargs))
+            if isinstance(value, list):
+                return list(value)
+            if isinstance(value, dict):
+                return dict(value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def get_cache_stats() -> List[Dict[str, Any]]:
+    """Stats of all registered caches."""
+    return [{"name": name, **cache.stats()} for name, cache in cache_registry.items()]
@@ -38,7 +38,7 @@ async def init_db() -> None:
     """Initialize database tables."""
     try:
         # Import all models to ensure they are registered
-        from app.models import user, data_upload, scenario, analysis_result, alert, credit_obligation, payment_schedule, hedging_instrument
+        from app.models import user, data_upload, scenario, analysis_result, alert, credit_obligation, payment_schedule, hedging_instrument, market_data_snapshot, ruonia_rate, market_quote, upload_content
         
         # Create all tables
         Base.metadata.create_all(bind=engine)
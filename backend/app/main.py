@@ -5,11 +5,13 @@ from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import structlog
 import sentry_sdk
 from sentry_sdk.integrations.fastapi import FastApiIntegration
 from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
 import time
+from datetime import timedelta
 from typing import Dict, Any
 
 from app.config import settings
@@ -19,6 +21,9 @@ from app.api.routes.hedging import router as hedging_router
 from app.routers.credits import router as credits_router
 from app.routers.cbr import router as cbr_router
 from app.api.rate_scenarios import router as rate_scenarios_router
+from app.services.batch_upload import batch_parser
+from app.services.market_data_scheduler import market_data_scheduler
+from app.services.upload_jobs import upload_job_runner
 from shared.types import ErrorResponse
 
 # Configure structured logging
@@ -68,11 +73,26 @@ async def lifespan(app: FastAPI):
         logger.error("Database initialization failed", error=str(e))
         raise
     
+    # Uploads whose jobs died with a previous process, and abandoned previews
+    await asyncio.to_thread(
+        upload_job_runner.recover,
+        timedelta(minutes=settings.upload_job_stale_minutes),
+        timedelta(hours=settings.upload_preview_max_age_hours),
+    )
+    
+    # Refresh market data in the background so handlers never wait on upstream APIs
+    if settings.market_data_refresh_enabled:
+        await market_data_scheduler.start()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down CFO/CTO Helper MVP Backend")
     
+    await market_data_scheduler.stop()
+    await asyncio.to_thread(upload_job_runner.shutdown)
+    await asyncio.to_thread(batch_parser.shutdown)
+    
     try:
         await close_db()
         logger.info("Database connections closed")
@@ -1,18 +1,23 @@
 """Database models."""
 
 from .user import User, RefreshToken
-from .data_upload import DataUpload
+from .data_upload import DataUpload, DataUploadBlob
 from .scenario import Scenario
 from .analysis_result import AnalysisResult
 from .alert import Alert
 from .cbr_key_rate import CBRKeyRate
 from .rate_scenario import RateScenario, RateForecast, ScenarioType, DataType
 from .hedging_instrument import HedgingInstrument, ScenarioHedging
+from .market_data_snapshot import MarketDataSnapshot
+from .ruonia_rate import RuoniaRate
+from .market_quote import MarketQuote
+from .upload_content import UploadContent
 
 __all__ = [
     "User",
     "RefreshToken", 
     "DataUpload",
+    "DataUploadBlob",
     "Scenario",
     "AnalysisResult",
     "Alert",
@@ -23,4 +28,8 @@ __all__ = [
     "DataType",
     "HedgingInstrument",
     "ScenarioHedging",
+    "MarketDataSnapshot",
+    "RuoniaRate",
+    "MarketQuote",
+    "UploadContent",
 ]
\ No newline at end of file
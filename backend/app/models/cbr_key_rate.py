@@ -29,4 +29,11 @@ class CBRKeyRate(Base):
         """Get key rate effective on a specific date (uses effective_date, not announcement date)"""
         return db_session.query(cls).filter(
             cls.effective_date <= target_date
-        ).order_by(cls.effective_date.desc()).first()
\ No newline at end of file
+        ).order_by(cls.effective_date.desc()).first()
+    
+    @classmethod
+    def get_series_version(cls, db_session):
+        """Cheap validator for the stored rates: (row count, last effective date, last update)"""
+        return db_session.query(
+            func.count(cls.id), func.max(cls.effective_date), func.max(cls.updated_at)
+        ).one()
@@ -1,10 +1,11 @@
 """Data upload model."""
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Text, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Text, Enum, LargeBinary
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 import enum
 
+from app.core.compression import compress_json, decompress_json
 from app.database import Base
 
 
@@ -27,6 +28,7 @@ class DataUpload(Base):
     name = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
     source_type = Column(String(50), nullable=False)  # csv, excel, api, manual
+    category = Column(String(50), nullable=True)  # revenue, expenses, cash_flow, ...
     
     file_path = Column(String(500), nullable=True)
     file_size = Column(Integer, nullable=True)
@@ -34,18 +36,43 @@ class DataUpload(Base):
     
     status = Column(Enum(DataUploadStatus), default=DataUploadStatus.PENDING, nullable=False)
     
-    # Store raw data for manual uploads or processed data
-    raw_data = Column(JSON, nullable=True)
+    # Columnar storage: file uploads live in an Arrow file, only a few rows are kept here
+    dataset_path = Column(String(500), nullable=True)
+    
+    # Payloads are loaded on first access so that listing uploads reads only metadata
+    preview_data = deferred(Column(JSON, nullable=True), group="details")
     
     # Validation and processing metadata
-    validation_errors = Column(JSON, nullable=True)
-    processing_log = Column(Text, nullable=True)
+    validation_errors = deferred(Column(JSON, nullable=True), group="details")
+    processing_log = deferred(Column(Text, nullable=True), group="details")
+    
+    # Validation results per column (ValidationResult), so corrections re-validate only what changed
+    column_validation = deferred(Column(JSON, nullable=True), group="details")
+    
+    # Background processing progress
+    rows_processed = Column(Integer, nullable=True)
+    error_count = Column(Integer, nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
     # Relationships
     user = relationship("User", back_populates="data_uploads")
+    blob = relationship("DataUploadBlob", uselist=False, cascade="all, delete-orphan")
+    
+    @property
+    def raw_data(self):
+        """Rows of manual uploads and of uploads not stored as Arrow, kept compressed out of row"""
+        return self.blob.load() if self.blob is not None else None
+    
+    @raw_data.setter
+    def raw_data(self, value):
+        if value is None:
+            self.blob = None
+        elif self.blob is None:
+            self.blob = DataUploadBlob.from_value(value)
+        else:
+            self.blob.store(value)
     
     def __repr__(self):
         return f"<DataUpload(id={self.id}, name={self.name}, status={self.status})>"
@@ -62,4 +89,29 @@ class DataUpload(Base):
         """Get file extension from file path."""
         if self.file_path:
             return self.file_path.split('.')[-1].lower()
-        return ""
\ No newline at end of file
+        return ""
+
+class DataUploadBlob(Base):
+    """Compressed JSON rows of a data upload."""
+    
+    __tablename__ = "data_upload_blobs"
+    
+    upload_id = Column(Integer, ForeignKey("data_uploads.id", ondelete="CASCADE"), primary_key=True)
+    codec = Column(String(10), nullable=False)  # zstd, zlib
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=True)  # compressed bytes
+    
+    @classmethod
+    def from_value(cls, value) -> "DataUploadBlob":
+        blob = cls()
+        blob.store(value)
+        return blob
+    
+    def store(self, value) -> None:
+        """Compress a JSON value into the blob."""
+        self.codec, self.data = compress_json(value)
+        self.size = len(self.data)
+    
+    def load(self):
+        """Decompressed JSON value of the blob."""
+        return decompress_json(self.codec, self.data)
@@ -0,0 +1,52 @@
+"""
+Market data snapshot model for storing the latest refreshed upstream values
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy.sql import func
+from datetime import datetime
+
+from app.database import Base
+
+
+class MarketDataSnapshot(Base):
+    """Latest market data payload per source, written by the background refresher"""
+
+    __tablename__ = "market_data_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String(50), unique=True, nullable=False, index=True)  # "ruonia", "moex_fx"
+    payload = Column(JSON, nullable=False)
+    fetched_at = Column(DateTime, nullable=False)  # Time of the successful upstream fetch
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<MarketDataSnapshot(source={self.source}, fetched_at={self.fetched_at})>"
+
+    def age_seconds(self) -> float:
+        """Seconds elapsed since the snapshot was fetched"""
+        return (datetime.now() - self.fetched_at).total_seconds()
+
+    def is_fresh(self, max_age: float) -> bool:
+        """Whether the snapshot was fetched at most max_age seconds ago"""
+        return self.age_seconds() <= max_age
+
+    @classmethod
+    def get(cls, db_session, source: str):
+        """Get the stored snapshot for a source"""
+        return db_session.query(cls).filter(cls.source == source).first()
+
+    @classmethod
+    def upsert(cls, db_session, source: str, payload, fetched_at: datetime = None):
+        """Insert or replace the snapshot for a source (caller commits)"""
+        fetched_at = fetched_at or datetime.now()
+        snapshot = cls.get(db_session, source)
+        if snapshot:
+            snapshot.payload = payload
+            snapshot.fetched_at = fetched_at
+            snapshot.updated_at = datetime.now()
+        else:
+            snapshot = cls(source=source, payload=payload, fetched_at=fetched_at)
+            db_session.add(snapshot)
+        return snapshot
@@ -0,0 +1,67 @@
+"""
+Market quote model for storing daily FX, index and commodity series
+"""
+
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, UniqueConstraint, func as sa_func
+from sqlalchemy.sql import func
+from datetime import datetime
+
+from app.database import Base
+
+
+class MarketQuote(Base):
+    """Last observed value of a market symbol per day"""
+
+    __tablename__ = "market_quotes"
+    __table_args__ = (UniqueConstraint("symbol", "quote_date", name="uq_market_quotes_symbol_date"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    asset_class = Column(String(20), nullable=False)  # "fx", "index", "commodity"
+    symbol = Column(String(50), nullable=False, index=True)  # "USD/RUB", "^GSPC", "GOLD"
+    quote_date = Column(Date, nullable=False, index=True)
+    value = Column(Float, nullable=False)
+    source = Column(String(50), nullable=True)  # "moex", ...
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<MarketQuote(symbol={self.symbol}, date={self.quote_date}, value={self.value})>"
+
+    @classmethod
+    def record(cls, db_session, asset_class: str, quotes, source: str = None) -> int:
+        """
+        Upsert (symbol, value, timestamp) observations, keeping the latest value per day
+
+        Existing rows for the affected days are loaded with one query. The caller commits.
+        """
+        latest = {}
+        for symbol, value, timestamp in quotes:
+            latest[(symbol, timestamp.date())] = value
+        if not latest:
+            return 0
+
+        symbols = {symbol for symbol, _ in latest}
+        dates = {quote_date for _, quote_date in latest}
+        existing = {
+            (row.symbol, row.quote_date): row
+            for row in db_session.query(cls).filter(cls.symbol.in_(symbols), cls.quote_date.in_(dates))
+        }
+
+        now = datetime.now()
+        for (symbol, quote_date), value in latest.items():
+            row = existing.get((symbol, quote_date))
+            if row is None:
+                db_session.add(cls(
+                    asset_class=asset_class, symbol=symbol, quote_date=quote_date, value=value, source=source
+                ))
+            elif row.value != value:
+                row.value = value
+                row.updated_at = now
+        return len(latest)
+
+    @classmethod
+    def get_series_version(cls, db_session, symbols):
+        """Cheap validator for the stored series of a symbol set"""
+        return tuple(db_session.query(
+            sa_func.count(cls.id), sa_func.max(cls.quote_date), sa_func.max(cls.updated_at)
+        ).filter(cls.symbol.in_(list(symbols))).one())
@@ -6,9 +6,12 @@ from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, String, Tex
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
+import logging
 
 from app.database import Base
 
+logger = logging.getLogger(__name__)
+
 
 class PaymentSchedule(Base):
     """Payment schedule model for detailed credit period tracking"""
@@ -104,19 +107,21 @@ class PaymentSchedule(Base):
         
         Args:
             db_session: Database session
-            base_rate_indicator: Base rate indicator (e.g., 'KEY_RATE')
+            base_rate_indicator: Base rate indicator ('KEY_RATE' or 'RUONIA')
             credit_spread: Credit spread percentage
         """
         if not self.period_start_date or not self.period_end_date:
             return
         
+        if base_rate_indicator not in ("KEY_RATE", "RUONIA"):
+            print(f"Period {self.period_number}: Base rate indicator {base_rate_indicator} not supported for historical recalculation")
+            return
+        
+        from app.services.cbr_service import CBRService
+        cbr_service = CBRService(db_session)
+        current_date = datetime.now()
+        
         if base_rate_indicator == "KEY_RATE":
-            from app.services.cbr_service import CBRService
-            from datetime import datetime
-            cbr_service = CBRService(db_session)
-            
-            current_date = datetime.now()
-            
             # Check if this is a future period
             if self.period_start_date > current_date:
                 # For future periods, use current key rate
@@ -148,18 +153,37 @@ class PaymentSchedule(Base):
                     logger.warning(f"No official CBR data available for period {self.period_start_date} to {self.period_end_date}")
                     # Don't update the rate if we don't have official data
                     return
-            
-            # Recalculate interest amount
-            if self.principal_amount and self.period_days:
-                self.interest_amount = self.calculate_interest_amount(
-                    self.principal_amount, 
-                    self.interest_rate, 
-                    self.period_days
-                )
-                
-                # Update total payment
-                self.total_payment = self.interest_amount
-                
-                print(f"Period {self.period_number}: Recalculated interest amount: {self.interest_amount:.2f}")
         else:
-            print(f"Period {self.period_number}: Base rate indicator {base_rate_indicator} not supported for historical recalculation")
\ No newline at end of file
+            if self.period_start_date > current_date:
+                # For future periods, use the latest published RUONIA
+                current_rate = cbr_service.get_current_ruonia()
+                if current_rate is None:
+                    logger.warning(f"Period {self.period_number}: No current RUONIA available, keeping original rate")
+                    return
+                self.base_rate = current_rate
+            else:
+                # For past/current periods, compound daily RUONIA in arrears
+                compounded_rate = cbr_service.get_compounded_ruonia_for_period(
+                    self.period_start_date,
+                    self.period_end_date
+                )
+                if compounded_rate is None:
+                    logger.warning(f"No RUONIA data available for period {self.period_start_date} to {self.period_end_date}")
+                    return
+                self.base_rate = compounded_rate
+            
+            self.interest_rate = self.base_rate + credit_spread
+            logger.info(f"Period {self.period_number}: RUONIA base rate {self.base_rate:.4f}%, total interest rate: {self.interest_rate:.2f}%")
+        
+        # Recalculate interest amount
+        if self.principal_amount and self.period_days:
+            self.interest_amount = self.calculate_interest_amount(
+                self.principal_amount, 
+                self.interest_rate, 
+                self.period_days
+            )
+            
+            # Update total payment
+            self.total_payment = self.interest_amount
+            
+            print(f"Period {self.period_number}: Recalculated interest amount: {self.interest_amount:.2f}")
@@ -0,0 +1,36 @@
+"""
+RUONIA rate model for storing the daily Russian overnight index average series
+"""
+
+from sqlalchemy import Column, Integer, Float, Date, DateTime
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class RuoniaRate(Base):
+    """One published RUONIA value per business day"""
+
+    __tablename__ = "ruonia_rates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    date = Column(Date, unique=True, nullable=False, index=True)  # Rate date (overnight start)
+    rate = Column(Float, nullable=False)  # RUONIA percentage
+    volume = Column(Float, nullable=True)  # Transaction volume, bln RUB
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<RuoniaRate(date={self.date}, rate={self.rate})>"
+
+    @classmethod
+    def get_latest_rate(cls, db_session):
+        """Get the most recent published RUONIA rate"""
+        return db_session.query(cls).order_by(cls.date.desc()).first()
+
+    @classmethod
+    def get_series_version(cls, db_session):
+        """Cheap validator for the stored series: (row count, last date, last update)"""
+        return db_session.query(
+            func.count(cls.id), func.max(cls.date), func.max(cls.updated_at)
+        ).one()
@@ -0,0 +1,30 @@
+"""
+Upload content index model: per-user SHA-256 of uploaded files and what they produced
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class UploadContent(Base):
+    """Result of processing a file's bytes for a user, so identical re-uploads can be answered at once"""
+
+    __tablename__ = "upload_contents"
+    __table_args__ = (
+        UniqueConstraint("user_id", "kind", "variant", "content_hash", name="uq_upload_contents_user_content"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    kind = Column(String(30), nullable=False)  # "data_upload", "credit_upload", "rate_scenarios"
+    variant = Column(String(50), nullable=False, default="")  # e.g. the data upload category
+    content_hash = Column(String(64), nullable=False)  # SHA-256 hex digest of the file bytes
+    parser_version = Column(Integer, nullable=False)
+    object_ids = Column(JSON, nullable=False)  # ids of the rows created from the file
+    result = Column(JSON, nullable=False)  # response returned for the original upload
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<UploadContent(user_id={self.user_id}, kind={self.kind}, hash={self.content_hash[:12]})>"
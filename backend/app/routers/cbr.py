@@ -2,10 +2,12 @@
 CBR (Central Bank of Russia) API endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional
+from app.core.http_cache import conditional_json_response, latest_modified
 from app.database import get_db
 from app.services.cbr_service import CBRService
 from app.models.cbr_key_rate import CBRKeyRate
@@ -71,7 +73,7 @@ async def debug_ruonia(
     
     try:
         cbr_service = CBRService(db)
-        current_rate = cbr_service.get_current_ruonia()
+        current_rate = cbr_service.fetch_current_ruonia()
         
         return {
             "rate": current_rate,
@@ -98,6 +100,7 @@ async def update_historical_key_rates(
     
     try:
         updated_count = cbr_service.update_key_rates(days_back=days_back)
+        cbr_service.publish_curves()
         
         return {
             "message": f"Successfully updated {updated_count} key rate records",
@@ -111,32 +114,55 @@ async def update_historical_key_rates(
             detail=f"Error updating historical key rates: {str(e)}"
         )
 
+def _key_rate_table_version(db: Session):
+    """Validator for the key rate table: (row count, max id, max updated_at)"""
+    return db.query(
+        func.count(CBRKeyRate.id), func.max(CBRKeyRate.id), func.max(CBRKeyRate.updated_at)
+    ).one()
+
+
 @router.get("/key-rate/history")
 async def get_key_rate_history(
+    request: Request,
     days: int = 30,
     db: Session = Depends(get_db)
 ):
     """Get key rate history for specified number of days"""
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
-    
-    rates = db.query(CBRKeyRate).filter(
-        CBRKeyRate.effective_date >= start_date,
-        CBRKeyRate.effective_date <= end_date
-    ).order_by(CBRKeyRate.effective_date.desc()).all()
-    
-    return {
-        "rates": [
-            {
-                "announcement_date": rate.date.isoformat(),
-                "effective_date": rate.effective_date.isoformat(),
-                "rate": rate.rate
-            }
-            for rate in rates
-        ],
-        "period_days": days,
-        "count": len(rates)
-    }
+    count, max_id, last_modified = _key_rate_table_version(db)
+    today = datetime.now().date()
+
+    def build():
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days)
+        
+        rates = db.query(CBRKeyRate).filter(
+            CBRKeyRate.effective_date >= start_date,
+            CBRKeyRate.effective_date <= end_date
+        ).order_by(CBRKeyRate.effective_date.desc()).all()
+        
+        return {
+            "rates": [
+                {
+                    "announcement_date": rate.date.isoformat(),
+                    "effective_date": rate.effective_date.isoformat(),
+                    "rate": rate.rate
+                }
+                for rate in rates
+            ],
+            "period_days": days,
+            "count": len(rates)
+        }
+
+    # The window moves daily, so the date is part of the validator, and the
+    # response changes at local midnight even when no rate does
+    window_moved = datetime.combine(today, datetime.min.time()).astimezone(timezone.utc)
+    return conditional_json_response(
+        request,
+        cache_key=("cbr_key_rate_history", days),
+        validator=(count, max_id, last_modified, today),
+        build=build,
+        last_modified=latest_modified(last_modified, window_moved),
+    )
 
 @router.post("/key-rate/update")
 async def update_key_rates(
@@ -148,6 +174,7 @@ async def update_key_rates(
     
     try:
         updated_count = cbr_service.update_key_rates(days_back)
+        cbr_service.publish_curves()
         
         return {
             "message": f"Successfully updated {updated_count} key rate records",
@@ -188,38 +215,48 @@ async def get_key_rate_on_date(
 
 @router.get("/key-rate/data-source")
 async def get_data_source_info(
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Get information about the data source for key rates"""
-    # Check if we have any data
-    total_records = db.query(CBRKeyRate).count()
-    
-    if total_records == 0:
+    total_records, max_id, last_modified = _key_rate_table_version(db)
+
+    def build():
+        # Check if we have any data
+        if total_records == 0:
+            return {
+                "status": "no_data",
+                "message": "No key rate data available",
+                "source": None,
+                "total_records": 0
+            }
+        
+        # Get date range
+        oldest = db.query(CBRKeyRate).order_by(CBRKeyRate.effective_date).first()
+        newest = db.query(CBRKeyRate).order_by(CBRKeyRate.effective_date.desc()).first()
+        
         return {
-            "status": "no_data",
-            "message": "No key rate data available",
-            "source": None,
-            "total_records": 0
+            "status": "official_data",
+            "message": "Using official data from Central Bank of Russia",
+            "source": {
+                "name": "Central Bank of Russia (CBR)",
+                "api": "SOAP API - DailyInfoWebServ",
+                "url": "http://www.cbr.ru/DailyInfoWebServ/DailyInfo.asmx",
+                "method": "KeyRateXML"
+            },
+            "total_records": total_records,
+            "date_range": {
+                "from": oldest.effective_date.isoformat() if oldest else None,
+                "to": newest.effective_date.isoformat() if newest else None
+            },
+            "last_update": newest.created_at.isoformat() if newest and newest.created_at else None,
+            "disclaimer": "All historical key rate data is sourced directly from the official CBR API"
         }
-    
-    # Get date range
-    oldest = db.query(CBRKeyRate).order_by(CBRKeyRate.effective_date).first()
-    newest = db.query(CBRKeyRate).order_by(CBRKeyRate.effective_date.desc()).first()
-    
-    return {
-        "status": "official_data",
-        "message": "Using official data from Central Bank of Russia",
-        "source": {
-            "name": "Central Bank of Russia (CBR)",
-            "api": "SOAP API - DailyInfoWebServ",
-            "url": "http://www.cbr.ru/DailyInfoWebServ/DailyInfo.asmx",
-            "method": "KeyRateXML"
-        },
-        "total_records": total_records,
-        "date_range": {
-            "from": oldest.effective_date.isoformat() if oldest else None,
-            "to": newest.effective_date.isoformat() if newest else None
-        },
-        "last_update": newest.created_at.isoformat() if newest and newest.created_at else None,
-        "disclaimer": "All historical key rate data is sourced directly from the official CBR API"
-    }
\ No newline at end of file
+
+    return conditional_json_response(
+        request,
+        cache_key=("cbr_key_rate_data_source",),
+        validator=(total_records, max_id, last_modified),
+        build=build,
+        last_modified=last_modified,
+    )
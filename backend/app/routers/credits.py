@@ -9,12 +9,15 @@ import pandas as pd
 import io
 from datetime import datetime
 import json
+import logging
 
 from app.database import get_db
 from app.models.user import User
 from app.models.credit_obligation import CreditObligation, PaymentFrequency, PaymentType
 from app.models.payment_schedule import PaymentSchedule
 from app.services.cbr_service import CBRService
+from app.services.content_index import CREDIT_UPLOAD, ContentIndex, read_and_hash
+from app.services.excel_reader import excel_reader
 from datetime import timedelta
 import calendar
 # from app.api.dependencies import get_current_user
@@ -29,6 +32,8 @@ from app.schemas.credit import (
     CreditBulkUpload
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/credits", tags=["credits"])
 
 
@@ -44,21 +49,29 @@ def get_base_rate_value(base_rate_indicator: str, db: Session) -> float:
                 return current_rate
             else:
                 # Fallback to default value if no data available
-                print(f"Warning: No KEY_RATE data available, using default value 16.0")
+                logger.warning("No KEY_RATE data available, using default value 16.0")
+                return 16.0
+        elif base_rate_indicator == "RUONIA":
+            cbr_service = CBRService(db)
+            current_rate = cbr_service.get_current_ruonia()
+            if current_rate is not None:
+                return current_rate
+            else:
+                logger.warning("No RUONIA data available, using default value 16.0")
                 return 16.0
         elif base_rate_indicator == "LIBOR":
             # TODO: Add LIBOR data source
-            print(f"Warning: LIBOR data source not implemented, using default value 5.0")
+            logger.warning("LIBOR data source not implemented, using default value 5.0")
             return 5.0
         elif base_rate_indicator == "SOFR":
             # TODO: Add SOFR data source
-            print(f"Warning: SOFR data source not implemented, using default value 4.5")
+            logger.warning("SOFR data source not implemented, using default value 4.5")
             return 4.5
         else:
-            print(f"Warning: Unknown base rate indicator {base_rate_indicator}, using default value 16.0")
+            logger.warning(f"Unknown base rate indicator {base_rate_indicator}, using default value 16.0")
             return 16.0
     except Exception as e:
-        print(f"Error getting base rate for {base_rate_indicator}: {str(e)}, using default value 16.0")
+        logger.error(f"Error getting base rate for {base_rate_indicator}: {str(e)}, using default value 16.0")
         return 16.0
 
 
@@ -206,7 +219,7 @@ async def upload_payment_schedule(
         content = await file.read()
         
         # Parse Excel file
-        df = pd.read_excel(io.BytesIO(content), header=None)
+        df = excel_reader.read(content, header=None)
         
         # Find header row (contains "Дата")
         header_row = None
@@ -222,7 +235,7 @@ async def upload_payment_schedule(
             )
         
         # Read with proper headers
-        df = pd.read_excel(io.BytesIO(content), header=header_row)
+        df = excel_reader.read(content, header=header_row)
         
         # Clean data - remove rows after header and empty rows
         df = df.iloc[1:].dropna(how='all')
@@ -340,7 +353,13 @@ async def upload_credit_data(
     
     try:
         # Read file content
-        content = await file.read()
+        content, content_hash = await read_and_hash(file)
+        
+        # Same file uploaded before: its credits already exist
+        content_index = ContentIndex(db)
+        previous = content_index.lookup(current_user.id, CREDIT_UPLOAD, content_hash)
+        if previous is not None:
+            return {**previous, 'deduplicated': True}
         
         # Parse based on file type
         if file.filename.endswith('.csv'):
@@ -362,7 +381,7 @@ async def upload_credit_data(
                 )
         else:
             # Excel file
-            df = pd.read_excel(io.BytesIO(content))
+            df = excel_reader.read(content)
         
         # Column mapping: Russian -> English
         column_mapping = {
@@ -468,13 +487,20 @@ async def upload_credit_data(
             
             db.commit()
         
-        return {
+        response = {
             'message': f'Successfully uploaded {len(credits)} credit obligations',
             'uploaded_count': len(credits),
             'error_count': len(errors),
             'errors': errors[:10] if errors else []  # Limit to first 10 errors
         }
         
+        if credits:
+            content_index.record(current_user.id, CREDIT_UPLOAD, content_hash,
+                                 [credit.id for credit in credits], response)
+            db.commit()
+        
+        return response
+        
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -706,6 +732,7 @@ async def recalculate_interest_with_historical_rates(
     """
     Recalculate interest amounts for all payment periods using historical rates
     For periods where rates changed, uses average rate for the period
+    For RUONIA credits, uses the daily rate compounded in arrears over the period
     """
     
     # Get credit
@@ -810,7 +837,7 @@ def download_template():
                 'Дата начала': '# YYYY-MM-DD',
                 'Дата окончания': '# YYYY-MM-DD',
                 'День платежа': '# Число от 1 до 31 (день месяца для всех платежей)',
-                'Базовый индикатор ставки': '# KEY_RATE, LIBOR, SOFR',
+                'Базовый индикатор ставки': '# KEY_RATE, RUONIA, LIBOR, SOFR',
                 'Кредитный спред (%)': '# Число с десятичной точкой',
                 'Периодичность платежей': '# MONTHLY, QUARTERLY, SEMI_ANNUAL, ANNUAL',
                 'Тип платежей': '# ANNUITY, DIFFERENTIATED, BULLET, INTEREST_ONLY'
@@ -913,7 +940,7 @@ def download_template():
             # Base rate indicator dropdown (column G)
             indicator_validation = DataValidation(
                 type="list",
-                formula1='"KEY_RATE,LIBOR,SOFR"',
+                formula1='"KEY_RATE,RUONIA,LIBOR,SOFR"',
                 allow_blank=False
             )
             indicator_validation.error = 'Выберите значение из списка'
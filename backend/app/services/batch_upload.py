@@ -0,0 +1,268 @@
+"""
+Batch upload of several files at once
+Files sent together (or packed in a ZIP archive) are parsed and validated
+concurrently in a shared pool of worker processes, and their DataUpload
+records are written in a single transaction.
+"""
+
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from fastapi import UploadFile
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.data_upload import DataUpload, DataUploadStatus
+from app.services.dataset_store import DatasetStore, dataset_store
+from app.services.streaming_ingest import SPOOL_CHUNK_SIZE
+from app.services.upload_jobs import parse_file_content
+from app.services.validation_service import ValidationService
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+
+
+class BundleTooLarge(ValueError):
+    """The files of a batch exceed the batch size limits"""
+
+
+@dataclass
+class ParsedFile:
+    """Outcome of parsing and validating one file of a batch"""
+    filename: str
+    category: str
+    file_size: int
+    frame: Optional[pd.DataFrame] = None
+    encoding: Optional[str] = None
+    validation_errors: List[Dict[str, Any]] = field(default_factory=list)
+    column_validation: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+async def read_batch_files(files: List[UploadFile], max_file_size: int,
+                           max_total_size: int) -> List[Tuple[str, bytes]]:
+    """
+    Contents of the files of a batch, read in blocks
+
+    Reading stops at the first block past a limit, so an oversized part is
+    never held in memory whole. ZIP archives are only bounded by the batch size.
+    """
+    contents = []
+    total = 0
+    for file in files:
+        limit = max_total_size if file.filename.lower().endswith('.zip') else max_file_size
+        blocks = []
+        size = 0
+        while True:
+            block = await file.read(SPOOL_CHUNK_SIZE)
+            if not block:
+                break
+            size += len(block)
+            total += len(block)
+            if size > limit:
+                raise BundleTooLarge(f"'{file.filename}' exceeds {limit / (1024 * 1024):.0f}MB limit")
+            if total > max_total_size:
+                raise BundleTooLarge(f"Batch exceeds {max_total_size / (1024 * 1024):.0f}MB limit")
+            blocks.append(block)
+        contents.append((file.filename, b''.join(blocks)))
+    return contents
+
+
+def expand_bundle(files: List[Tuple[str, bytes]], max_file_size: int,
+                  max_total_size: int) -> List[Tuple[str, bytes]]:
+    """
+    Files of a batch with ZIP archives replaced by the spreadsheets they contain
+
+    Sizes are checked against the archive directory before anything is
+    decompressed.
+    """
+    expanded = []
+    total = 0
+    for filename, content in files:
+        if not filename.lower().endswith('.zip'):
+            if len(content) > max_file_size:
+                raise BundleTooLarge(f"'{filename}' exceeds {max_file_size / (1024 * 1024):.0f}MB limit")
+            expanded.append((filename, content))
+            total += len(content)
+            continue
+
+        try:
+            archive = zipfile.ZipFile(io.BytesIO(content))
+        except zipfile.BadZipFile:
+            raise ValueError(f"'{filename}' is not a valid ZIP archive")
+
+        with archive:
+            for info in archive.infolist():
+                name = os.path.basename(info.filename)
+                if info.is_dir() or not name or info.filename.startswith('__MACOSX/') or name.startswith('.'):
+                    continue
+                if info.file_size > max_file_size:
+                    raise BundleTooLarge(f"'{info.filename}' exceeds {max_file_size / (1024 * 1024):.0f}MB limit")
+                total += info.file_size
+                if total > max_total_size:
+                    raise BundleTooLarge(f"Batch exceeds {max_total_size / (1024 * 1024):.0f}MB limit")
+                try:
+                    expanded.append((info.filename, archive.read(info)))
+                except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError, RuntimeError) as e:
+                    # Corrupt members, unsupported compression or encryption
+                    raise ValueError(f"'{info.filename}' in '{filename}' cannot be extracted: {str(e)}")
+
+    if total > max_total_size:
+        raise BundleTooLarge(f"Batch exceeds {max_total_size / (1024 * 1024):.0f}MB limit")
+    return expanded
+
+
+def parse_and_validate(filename: str, content: bytes, category: str) -> ParsedFile:
+    """Parse and validate one file; runs in a worker process"""
+    parsed = ParsedFile(filename=filename, category=category, file_size=len(content))
+    if not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+        parsed.error = "Only CSV and Excel files are supported"
+        return parsed
+
+    try:
+        parsed.frame, parsed.encoding = parse_file_content(filename.lower(), content)
+        validation = ValidationService().validate_by_column(parsed.frame, category)
+        parsed.validation_errors = validation.errors()
+        parsed.column_validation = validation.to_dict()
+    except Exception as e:
+        parsed.error = str(e)
+    return parsed
+
+
+class BatchParser:
+    """
+    Long-lived process pool parsing the files of batch uploads
+
+    Workers are started with forkserver (spawn where it is unavailable): forking
+    the threaded server would copy its locks and open connections. At most
+    max_batches batches are parsed at a time, later ones wait for a slot.
+    """
+
+    def __init__(self, max_workers: int, max_batches: int):
+        # More processes than cores only adds start-up and pickling overhead
+        self.max_workers = min(max_workers, os.cpu_count() or 1)
+        self._batches = threading.BoundedSemaphore(max_batches)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context(method))
+                logger.info(f"Started batch upload pool of {self.max_workers} {method} processes")
+            return self._pool
+
+    def parse(self, files: List[Tuple[str, bytes]], categories: List[str]) -> List[ParsedFile]:
+        """Parse and validate files concurrently, results in the order of the files"""
+        with self._batches:
+            if self.max_workers <= 1 or len(files) <= 1:
+                return [parse_and_validate(filename, content, category)
+                        for (filename, content), category in zip(files, categories)]
+
+            pool = self._get_pool()
+            try:
+                return list(pool.map(
+                    parse_and_validate,
+                    [filename for filename, _ in files],
+                    [content for _, content in files],
+                    categories,
+                ))
+            except BrokenProcessPool:
+                # A worker died; the next batch starts a fresh pool
+                with self._lock:
+                    if self._pool is pool:
+                        self._pool = None
+                raise
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def store_batch(db: Session, user_id: int, parsed_files: List[ParsedFile],
+                store: DatasetStore = dataset_store) -> List[DataUpload]:
+    """Write the DataUpload records of a parsed batch in one transaction"""
+    uploads = []
+    dataset_paths = []
+    try:
+        for parsed in parsed_files:
+            upload = DataUpload(
+                user_id=user_id,
+                name=os.path.splitext(os.path.basename(parsed.filename))[0][:100],
+                description=f"Batch upload of {parsed.filename}",
+                source_type=parsed.filename.rsplit('.', 1)[-1].lower(),
+                category=parsed.category,
+                file_size=parsed.file_size,
+                status=DataUploadStatus.PROCESSING
+            )
+            db.add(upload)
+            uploads.append(upload)
+
+        # Ids are needed to name the datasets
+        db.flush()
+
+        for upload, parsed in zip(uploads, parsed_files):
+            if parsed.error is not None:
+                upload.status = DataUploadStatus.FAILED
+                upload.processing_log = parsed.error
+                continue
+            store.store_upload_rows(upload, parsed.frame)
+            if upload.dataset_path:
+                dataset_paths.append(upload.dataset_path)
+            upload.row_count = len(parsed.frame)
+            upload.validation_errors = parsed.validation_errors
+            upload.column_validation = parsed.column_validation
+            upload.status = DataUploadStatus.COMPLETED if not parsed.validation_errors else DataUploadStatus.FAILED
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        for path in dataset_paths:
+            store.delete(path)
+        raise
+
+    logger.info(f"Stored batch of {len(uploads)} uploads for user {user_id}")
+    return uploads
+
+
+def batch_report(uploads: List[DataUpload], parsed_files: List[ParsedFile]) -> Dict[str, Any]:
+    """Consolidated report of a stored batch"""
+    files = []
+    for upload, parsed in zip(uploads, parsed_files):
+        files.append({
+            "filename": parsed.filename,
+            "upload_id": upload.id,
+            "category": parsed.category,
+            "status": upload.status.value,
+            "row_count": upload.row_count,
+            "column_count": len(parsed.frame.columns) if parsed.frame is not None else None,
+            "error": parsed.error,
+            "validation_errors": parsed.validation_errors,
+        })
+
+    return {
+        "file_count": len(files),
+        "completed": sum(1 for upload in uploads if upload.status == DataUploadStatus.COMPLETED),
+        "failed": sum(1 for upload in uploads if upload.status == DataUploadStatus.FAILED),
+        "total_rows": sum(upload.row_count or 0 for upload in uploads),
+        "files": files,
+    }
+
+
+batch_parser = BatchParser(settings.batch_upload_workers, settings.batch_upload_concurrency)
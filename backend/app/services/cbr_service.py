@@ -3,25 +3,73 @@ CBR (Central Bank of Russia) service for fetching key rate data
 """
 
 import xml.etree.ElementTree as ET
+import threading
 import requests
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
+from urllib.parse import urlparse
 from sqlalchemy.orm import Session
+from app.config import settings
+from app.core.circuit_breaker import get_circuit_breaker, latency_budget, UpstreamUnavailableError
 from app.models.cbr_key_rate import CBRKeyRate
+from app.models.market_data_snapshot import MarketDataSnapshot
+from app.models.ruonia_rate import RuoniaRate
+from app.services.ruonia_index import RuoniaCompoundingIndex
+from app.services.curve_store import curve_store, publish_curves, update_stamp, Curve, KEY_RATE_CURVE, RUONIA_CURVE
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _provider_breaker(provider: str):
+    return get_circuit_breaker(
+        provider,
+        timeout=settings.cbr_request_timeout,
+        failure_rate_threshold=settings.circuit_breaker_failure_rate,
+        window_size=settings.circuit_breaker_window,
+        minimum_calls=settings.circuit_breaker_min_calls,
+        open_seconds=settings.circuit_breaker_open_seconds,
+    )
+
+
+# cbr.ru and the cbr-xml-daily.ru mirror fail independently
+cbr_breaker = _provider_breaker("cbr")
+cbr_mirror_breaker = _provider_breaker("cbr_xml_daily")
+
+# Compounding index shared across requests, rebuilt when the stored series changes
+_ruonia_index_lock = threading.Lock()
+_ruonia_index_cache: Dict[str, object] = {'version': None, 'index': None}
+
 class CBRService:
     """Service for interacting with CBR web services"""
     
     CBR_KEY_RATE_URL = "http://www.cbr.ru/DailyInfoWebServ/DailyInfo.asmx"
     CBR_KEY_RATE_XML_URL = "http://www.cbr.ru/scripts/XML_key_rate.asp"
     CBR_REST_API_URL = "https://www.cbr-xml-daily.ru/key-rate"
+    RUONIA_SNAPSHOT_SOURCE = "ruonia"
     
     def __init__(self, db_session: Session):
         self.db_session = db_session
     
+    @staticmethod
+    def _request(method: str, url: str, timeout: float = 30, **kwargs) -> requests.Response:
+        """
+        HTTP call to CBR through the provider's circuit breaker
+        
+        The timeout is capped by the breaker timeout and the current latency
+        budget. Connection errors, timeouts and 5xx responses count as failures;
+        while the breaker is open the call fails immediately.
+        """
+        breaker = cbr_mirror_breaker if 'cbr-xml-daily' in urlparse(url).netloc else cbr_breaker
+        effective_timeout = breaker.effective_timeout(timeout)
+        
+        def send():
+            response = requests.request(method, url, timeout=effective_timeout, **kwargs)
+            if response.status_code >= 500:
+                response.raise_for_status()
+            return response
+        
+        return breaker.call(send)
+    
     def fetch_key_rate_data(self, from_date: datetime, to_date: datetime) -> List[Dict]:
         """
         Fetch key rate data from CBR web service using KeyRateXML operation
@@ -55,7 +103,8 @@ class CBRService:
             print(f"Fetching CBR key rate data from {from_date} to {to_date}")
             print(f"SOAP request to: {self.CBR_KEY_RATE_URL}")
             
-            response = requests.post(
+            response = self._request(
+                'POST',
                 self.CBR_KEY_RATE_URL,
                 data=soap_body,
                 headers=headers,
@@ -116,7 +165,7 @@ class CBRService:
             print(f"Successfully parsed {len(key_rates)} key rate records")
             return key_rates
             
-        except requests.RequestException as e:
+        except (requests.RequestException, UpstreamUnavailableError) as e:
             logger.error(f"Error fetching CBR key rate data: {e}")
             return []
         except ET.ParseError as e:
@@ -178,7 +227,7 @@ class CBRService:
         try:
             print(f"Fetching CBR data from REST API: {self.CBR_REST_API_URL}")
             
-            response = requests.get(self.CBR_REST_API_URL, timeout=30)
+            response = self._request('GET', self.CBR_REST_API_URL, timeout=30)
             response.raise_for_status()
             
             print(f"Response status: {response.status_code}")
@@ -217,7 +266,7 @@ class CBRService:
             print(f"Parsed {len(key_rates)} key rate records from REST API")
             return key_rates
             
-        except requests.RequestException as e:
+        except (requests.RequestException, UpstreamUnavailableError) as e:
             logger.error(f"Error fetching CBR REST key rate data: {e}")
             return []
         except (ValueError, KeyError) as e:
@@ -234,7 +283,7 @@ class CBRService:
         try:
             print(f"Fetching CBR data from XML API: {self.CBR_KEY_RATE_XML_URL}")
             
-            response = requests.get(self.CBR_KEY_RATE_XML_URL, timeout=30)
+            response = self._request('GET', self.CBR_KEY_RATE_XML_URL, timeout=30)
             response.raise_for_status()
             
             print(f"Response status: {response.status_code}")
@@ -277,7 +326,7 @@ class CBRService:
             print(f"Parsed {len(key_rates)} key rate records")
             return key_rates
             
-        except requests.RequestException as e:
+        except (requests.RequestException, UpstreamUnavailableError) as e:
             logger.error(f"Error fetching CBR XML key rate data: {e}")
             return []
         except ET.ParseError as e:
@@ -355,6 +404,7 @@ class CBRService:
             updated_count += 1
         
         self.db_session.commit()
+        self.db_session.info.pop('key_rate_version', None)
         logger.info(f"Updated {updated_count} key rate records")
         
         return updated_count
@@ -369,19 +419,283 @@ class CBRService:
         latest_rate = CBRKeyRate.get_latest_rate(self.db_session)
         return latest_rate.rate if latest_rate else None
     
+    def fetch_ruonia_data(self, from_date: datetime, to_date: datetime) -> List[Dict]:
+        """
+        Fetch the daily RUONIA series from CBR web service using RuoniaXML operation
+
+        Args:
+            from_date: Start date for data retrieval
+            to_date: End date for data retrieval
+
+        Returns:
+            List of dictionaries containing date, rate and volume data
+        """
+        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" 
+               xmlns:xsd="http://www.w3.org/2001/XMLSchema" 
+               xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
+  <soap:Body>
+    <RuoniaXML xmlns="http://web.cbr.ru/">
+      <fromDate>{from_date.strftime('%Y-%m-%d')}</fromDate>
+      <ToDate>{to_date.strftime('%Y-%m-%d')}</ToDate>
+    </RuoniaXML>
+  </soap:Body>
+</soap:Envelope>"""
+
+        headers = {
+            'Content-Type': 'text/xml; charset=utf-8',
+            'SOAPAction': 'http://web.cbr.ru/RuoniaXML'
+        }
+
+        try:
+            logger.info(f"Fetching RUONIA series from {from_date:%Y-%m-%d} to {to_date:%Y-%m-%d}")
+            response = self._request(
+                'POST',
+                self.CBR_KEY_RATE_URL,
+                data=soap_body,
+                headers=headers,
+                timeout=30
+            )
+            response.raise_for_status()
+            return self.parse_ruonia_xml(response.content)
+
+        except (requests.RequestException, UpstreamUnavailableError) as e:
+            logger.error(f"Error fetching CBR RUONIA data: {e}")
+            return []
+        except ET.ParseError as e:
+            logger.error(f"Error parsing CBR RUONIA response: {e}")
+            return []
+
+    @staticmethod
+    def parse_ruonia_xml(content: bytes) -> List[Dict]:
+        """Parse <ro> records (D0, ruo, vol) of a RuoniaXML response"""
+        root = ET.fromstring(content)
+        ruonia_rates = []
+
+        for ro_elem in root.iter('ro'):
+            date_elem = ro_elem.find('D0')
+            rate_elem = ro_elem.find('ruo')
+            volume_elem = ro_elem.find('vol')
+
+            if date_elem is None or rate_elem is None:
+                continue
+            try:
+                # Date format: YYYY-MM-DDTHH:MM:SS+03:00, only the date part matters
+                rate_date = datetime.fromisoformat(date_elem.text[:10]).date()
+                ruonia_rates.append({
+                    'date': rate_date,
+                    'rate': float(rate_elem.text.replace(',', '.')),
+                    'volume': float(volume_elem.text.replace(',', '.')) if volume_elem is not None and volume_elem.text else None
+                })
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.warning(f"Error parsing RUONIA data: {e}")
+                continue
+
+        return ruonia_rates
+
+    def update_ruonia_rates(self, days_back: int = 365) -> int:
+        """
+        Update the stored RUONIA series
+
+        Existing dates in the range are loaded with a single query and new rows
+        are inserted in bulk, so a full-year backfill costs a handful of statements.
+
+        Args:
+            days_back: Number of days back to fetch data
+
+        Returns:
+            Number of records inserted or updated
+        """
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days_back)
+
+        ruonia_rates = self.fetch_ruonia_data(start_date, end_date)
+        if not ruonia_rates:
+            logger.error("Failed to fetch RUONIA series from CBR")
+            raise Exception("Unable to fetch RUONIA data from CBR. Please check internet connection and CBR API availability.")
+
+        # Last value wins if the service returns a date twice
+        by_date = {item['date']: item for item in ruonia_rates}
+
+        existing = {
+            row.date: row
+            for row in self.db_session.query(RuoniaRate).filter(
+                RuoniaRate.date.in_(list(by_date.keys()))
+            )
+        }
+
+        now = datetime.now()
+        new_rows = []
+        updated_count = 0
+        for rate_date, item in by_date.items():
+            row = existing.get(rate_date)
+            if row is None:
+                new_rows.append({**item, 'created_at': now, 'updated_at': now})
+            elif row.rate != item['rate'] or row.volume != item['volume']:
+                row.rate = item['rate']
+                row.volume = item['volume']
+                row.updated_at = now
+                updated_count += 1
+
+        if new_rows:
+            self.db_session.bulk_insert_mappings(RuoniaRate, new_rows)
+        self.db_session.commit()
+        self.db_session.info.pop('ruonia_index', None)
+
+        logger.info(f"RUONIA series: {len(new_rows)} new, {updated_count} updated records")
+        return len(new_rows) + updated_count
+
     def get_current_ruonia(self) -> Optional[float]:
         """
-        Get the current RUONIA rate from CBR
-        
+        Get the current RUONIA rate
+
+        Reads the latest value of the stored daily series, then the scraped
+        snapshot, and only goes to CBR when nothing has been stored yet or the
+        snapshot is older than market_data_max_age.
+
+        Returns:
+            Current RUONIA rate percentage or None if not available
+        """
+        latest_rate = RuoniaRate.get_latest_rate(self.db_session)
+        if latest_rate:
+            return latest_rate.rate
+
+        snapshot = MarketDataSnapshot.get(self.db_session, self.RUONIA_SNAPSHOT_SOURCE)
+        stored_rate = snapshot.payload.get('rate') if snapshot else None
+        if stored_rate is not None and snapshot.is_fresh(settings.market_data_max_age):
+            return stored_rate
+
+        if stored_rate is not None:
+            logger.warning(f"Stored RUONIA rate is {snapshot.age_seconds():.0f}s old, fetching from CBR")
+        else:
+            logger.info("No stored RUONIA rate, fetching from CBR")
+        rate = self.refresh_ruonia()
+        self.publish_curves()
+        return rate if rate is not None else stored_rate
+
+    def publish_curves(self) -> None:
+        """Republish the shared curve file after the stored rates changed"""
+        try:
+            publish_curves(self.db_session)
+        except Exception as e:
+            logger.warning(f"Could not publish curve store: {str(e)}")
+
+    @staticmethod
+    def _published_curve(name: str, rows: int, last_update: Optional[datetime]) -> Optional[Curve]:
+        """Curve from the shared file, None when the stored rates changed since it was published"""
+        curve = curve_store.get_curve(name)
+        if curve is None or not rows:
+            return curve
+        if len(curve.days) != rows or curve.source_updated != update_stamp(last_update):
+            logger.debug(f"Curve {name} is behind the database, reading the stored rates")
+            return None
+        return curve
+
+    def refresh_ruonia(self, days_back: int = 14) -> Optional[float]:
+        """
+        Refresh the stored RUONIA series from CBR
+
+        Falls back to scraping the current value into a snapshot when the
+        RuoniaXML service is unavailable.
+
+        Args:
+            days_back: Number of days back to fetch data
+
+        Returns:
+            Latest RUONIA rate percentage or None if not available
+        """
+        try:
+            self.update_ruonia_rates(days_back=days_back)
+            return RuoniaRate.get_latest_rate(self.db_session).rate
+        except Exception as e:
+            logger.warning(f"RUONIA series refresh failed, falling back to page scraping: {str(e)}")
+
+        rate = self.fetch_current_ruonia()
+        if rate is None:
+            latest_rate = RuoniaRate.get_latest_rate(self.db_session)
+            return latest_rate.rate if latest_rate else None
+
+        MarketDataSnapshot.upsert(
+            self.db_session,
+            self.RUONIA_SNAPSHOT_SOURCE,
+            {'rate': rate, 'date': datetime.now().date().isoformat()}
+        )
+        self.db_session.commit()
+        logger.info(f"Stored RUONIA rate {rate}%")
+        return rate
+
+    def get_ruonia_index(self) -> Optional[RuoniaCompoundingIndex]:
+        """
+        Get the compounding index over the stored RUONIA series
+
+        Built once per series version and shared between sessions; within one
+        session the version is only checked on first use.
+
+        Returns:
+            RuoniaCompoundingIndex or None if no RUONIA data is stored
+        """
+        session_cache = self.db_session.info
+        if 'ruonia_index' in session_cache:
+            return session_cache['ruonia_index']
+
+        # Prefer the shared curve file; the database is the fallback before it is
+        # published and while the file lags behind a refresh
+        series_version = tuple(RuoniaRate.get_series_version(self.db_session))
+        curve = self._published_curve(RUONIA_CURVE, series_version[0], series_version[2])
+        if curve is not None:
+            version = ('curve_store', curve_store.generation)
+        else:
+            version = ('db',) + series_version
+
+        with _ruonia_index_lock:
+            if _ruonia_index_cache['version'] != version:
+                if curve is not None:
+                    dates = curve.days.astype('datetime64[D]')
+                    rates = curve.rates
+                else:
+                    rows = self.db_session.query(RuoniaRate.date, RuoniaRate.rate).order_by(RuoniaRate.date).all()
+                    dates = [row.date for row in rows]
+                    rates = [row.rate for row in rows]
+                _ruonia_index_cache['index'] = RuoniaCompoundingIndex(dates, rates) if len(dates) else None
+                _ruonia_index_cache['version'] = version
+            index = _ruonia_index_cache['index']
+
+        session_cache['ruonia_index'] = index
+        return index
+
+    def get_compounded_ruonia_for_period(self, start_date: datetime, end_date: datetime) -> Optional[float]:
+        """
+        Get RUONIA compounded in arrears over a period
+
+        Args:
+            start_date: Start of period
+            end_date: End of period
+
+        Returns:
+            Annualized compounded RUONIA percentage or None if not available
+        """
+        index = self.get_ruonia_index()
+        if index is None:
+            return None
+        return index.compounded_rate(start_date, end_date)
+
+    def fetch_current_ruonia(self) -> Optional[float]:
+        """
+        Fetch the current RUONIA rate from CBR
+
+        All fallback endpoints share one latency budget, so an unreachable
+        CBR costs at most the budget instead of the sum of timeouts.
+
         Returns:
             Current RUONIA rate percentage or None if not available
         """
+        with latency_budget(settings.cbr_ruonia_latency_budget):
+            return self._scrape_current_ruonia()
+
+    def _scrape_current_ruonia(self) -> Optional[float]:
+        """Try the RUONIA page and XML endpoints in turn"""
         logger.info("=== Starting RUONIA rate fetching ===")
-        
-        # TEMPORARY: Return known working value immediately for testing
-        logger.info("Returning temporary RUONIA value for testing")
-        return 19.1
-        
+
         try:
             # Method 1: Parse HTML page from https://cbr.ru/hd_base/ruonia/
             try:
@@ -398,7 +712,7 @@ class CBRService:
                 }
                 
                 logger.info("Attempting to fetch RUONIA page...")
-                response = requests.get("https://cbr.ru/hd_base/ruonia/", headers=headers, timeout=10)
+                response = self._request('GET', "https://cbr.ru/hd_base/ruonia/", headers=headers, timeout=10)
                 logger.info(f"Response status: {response.status_code}, content length: {len(response.content)}")
                 response.raise_for_status()
                 
@@ -504,7 +818,7 @@ class CBRService:
                 today = date.today()
                 # Try to get RUONIA from interbank rates XML
                 url = f"http://www.cbr.ru/scripts/XML_mkr.asp?date_req1={today.strftime('%d/%m/%Y')}&date_req2={today.strftime('%d/%m/%Y')}"
-                response = requests.get(url, timeout=10)
+                response = self._request('GET', url, timeout=10)
                 if response.status_code == 200:
                     root = ET.fromstring(response.content)
                     # Look for RUONIA in mkr (interbank rates) data
@@ -525,7 +839,7 @@ class CBRService:
             
             for endpoint in xml_endpoints:
                 try:
-                    response = requests.get(endpoint, timeout=5)
+                    response = self._request('GET', endpoint, timeout=5)
                     if response.status_code == 200:
                         root = ET.fromstring(response.content)
                         
@@ -552,7 +866,7 @@ class CBRService:
             # Method 3: Try alternative REST API endpoints
             try:
                 # Try cbr-xml-daily.ru which aggregates CBR data
-                response = requests.get("https://www.cbr-xml-daily.ru/daily_json.js", timeout=5)
+                response = self._request('GET', "https://www.cbr-xml-daily.ru/daily_json.js", timeout=5)
                 if response.status_code == 200:
                     data = response.json()
                     # Check if RUONIA is in the data
@@ -563,7 +877,7 @@ class CBRService:
             
             # Method 4: Try to parse RUONIA data from CSV/text format
             try:
-                response = requests.get("https://cbr.ru/hd_base/ruonia/?UniDbQuery.Posted=True&UniDbQuery.To=&UniDbQuery.From=", headers=headers, timeout=10)
+                response = self._request('GET', "https://cbr.ru/hd_base/ruonia/?UniDbQuery.Posted=True&UniDbQuery.To=&UniDbQuery.From=", headers=headers, timeout=10)
                 if response.status_code == 200:
                     # The page might contain data in text format
                     content = response.text
@@ -610,7 +924,7 @@ class CBRService:
                 for date_str in date_formats:
                     try:
                         url = f"http://www.cbr.ru/scripts/XML_mkr.asp?date_req={date_str}"
-                        response = requests.get(url, timeout=5)
+                        response = self._request('GET', url, timeout=5)
                         if response.status_code == 200 and len(response.content) > 100:
                             root = ET.fromstring(response.content)
                             # Look for any element containing RUONIA data
@@ -632,7 +946,7 @@ class CBRService:
             # In production, this should trigger an alert to fix the parsing
             try:
                 # Check if we can at least fetch the page
-                response = requests.get("https://cbr.ru/hd_base/ruonia/", timeout=5)
+                response = self._request('GET', "https://cbr.ru/hd_base/ruonia/", timeout=5)
                 if response.status_code == 200:
                     # If page is accessible, return current known rate with warning
                     logger.warning("RUONIA page accessible but parsing failed - using known current rate")
@@ -659,6 +973,15 @@ class CBRService:
         Returns:
             Key rate percentage or None if not available
         """
+        session_cache = self.db_session.info
+        if 'key_rate_version' not in session_cache:
+            session_cache['key_rate_version'] = tuple(CBRKeyRate.get_series_version(self.db_session))
+
+        rows, _, last_update = session_cache['key_rate_version']
+        curve = self._published_curve(KEY_RATE_CURVE, rows, last_update)
+        if curve is not None:
+            return curve.rate_on(target_date)
+
         rate_record = CBRKeyRate.get_rate_on_date(self.db_session, target_date)
         return rate_record.rate if rate_record else None
     
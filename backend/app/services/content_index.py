@@ -0,0 +1,165 @@
+"""
+Content-hash index of uploaded files
+Uploads are hashed with a streaming SHA-256. A user re-uploading bytes that
+were already processed by the same parser version gets the earlier result
+back; parsed and validated frames are cached by content hash across users.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import pandas as pd
+from fastapi import UploadFile
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.credit_obligation import CreditObligation
+from app.models.data_upload import DataUpload
+from app.models.payment_schedule import PaymentSchedule  # noqa: F401 - resolves CreditObligation.payment_schedule
+from app.models.rate_scenario import RateScenario
+from app.models.upload_content import UploadContent
+from app.services.upload_frames import frame_nbytes, read_only_view
+
+logger = logging.getLogger(__name__)
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Upload kinds
+DATA_UPLOAD = "data_upload"
+CREDIT_UPLOAD = "credit_upload"
+RATE_SCENARIOS = "rate_scenarios"
+
+# Bump a kind's version when its parsing or validation changes, so earlier results are not reused
+PARSER_VERSIONS = {
+    DATA_UPLOAD: 4,  # 2: column type inference, 3: calamine Excel reader, 4: per-column validation
+    CREDIT_UPLOAD: 2,  # 2: calamine Excel reader
+    RATE_SCENARIOS: 2,  # 2: calamine Excel reader
+}
+
+# Rows created by each kind; a result is only reused while they all still exist
+_CREATED_MODELS = {
+    DATA_UPLOAD: DataUpload,
+    CREDIT_UPLOAD: CreditObligation,
+    RATE_SCENARIOS: RateScenario,
+}
+
+
+async def read_and_hash(file: UploadFile) -> Tuple[bytes, str]:
+    """Read an upload in blocks, returns (content, SHA-256 hex digest)"""
+    digest = hashlib.sha256()
+    blocks = []
+    while True:
+        block = await file.read(HASH_BLOCK_SIZE)
+        if not block:
+            break
+        digest.update(block)
+        blocks.append(block)
+    return b"".join(blocks), digest.hexdigest()
+
+
+class ContentIndex:
+    """Per-user index of processed upload contents"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _entry(self, user_id: int, kind: str, content_hash: str, variant: str) -> Optional[UploadContent]:
+        return self.db.query(UploadContent).filter(
+            UploadContent.user_id == user_id,
+            UploadContent.kind == kind,
+            UploadContent.variant == variant,
+            UploadContent.content_hash == content_hash,
+        ).first()
+
+    def lookup(self, user_id: int, kind: str, content_hash: str, variant: str = "") -> Optional[Any]:
+        """Result of an earlier upload of the same bytes, if it can still be reused"""
+        entry = self._entry(user_id, kind, content_hash, variant)
+        if entry is None or entry.parser_version != PARSER_VERSIONS[kind]:
+            return None
+
+        ids = set(entry.object_ids)
+        if ids:
+            model = _CREATED_MODELS[kind]
+            existing = self.db.query(model.id).filter(model.id.in_(ids)).count()
+            if existing != len(ids):
+                # Something created from the file was deleted since: process it again
+                return None
+
+        logger.info(f"Upload of user {user_id} matches earlier {kind} content {content_hash[:12]}")
+        return entry.result
+
+    def record(self, user_id: int, kind: str, content_hash: str, object_ids: List[int],
+               result: Any, variant: str = "") -> None:
+        """Remember the result of processing a file (the caller commits)"""
+        entry = self._entry(user_id, kind, content_hash, variant)
+        if entry is None:
+            entry = UploadContent(user_id=user_id, kind=kind, variant=variant, content_hash=content_hash)
+            self.db.add(entry)
+        entry.parser_version = PARSER_VERSIONS[kind]
+        entry.object_ids = list(object_ids)
+        entry.result = result
+
+    def forget(self, user_id: int, kind: str, object_id: int) -> None:
+        """Drop the entries of files an object was created from, once it changed (the caller commits)"""
+        entries = self.db.query(UploadContent).filter(
+            UploadContent.user_id == user_id,
+            UploadContent.kind == kind,
+        ).all()
+        for entry in entries:
+            if object_id in entry.object_ids:
+                self.db.delete(entry)
+
+
+@dataclass(frozen=True)
+class ParsedUpload:
+    """Parsed and validated rows of a data upload file"""
+    frame: pd.DataFrame
+    validation_errors: List[Dict[str, Any]]
+    encoding: Optional[str]
+    column_validation: Optional[Dict[str, Any]] = None
+
+
+class ParseCache:
+    """LRU cache of parsed uploads by (content hash, parser version, category), bounded by memory"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[ParsedUpload, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(content_hash: str, category: str) -> Hashable:
+        return content_hash, PARSER_VERSIONS[DATA_UPLOAD], category
+
+    def get(self, content_hash: str, category: str) -> Optional[ParsedUpload]:
+        with self._lock:
+            entry = self._entries.get(self.key(content_hash, category))
+            if entry is None:
+                return None
+            self._entries.move_to_end(self.key(content_hash, category))
+            parsed = entry[0]
+        # Callers get their own copy-on-write view of the frame
+        return ParsedUpload(read_only_view(parsed.frame), list(parsed.validation_errors), parsed.encoding,
+                            parsed.column_validation)
+
+    def put(self, content_hash: str, category: str, parsed: ParsedUpload) -> None:
+        nbytes = frame_nbytes(parsed.frame)
+        if nbytes > self.max_bytes:
+            return
+        key = self.key(content_hash, category)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (parsed, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+
+parse_cache = ParseCache(settings.parse_cache_max_mb * 1024 * 1024)
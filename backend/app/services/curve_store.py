@@ -0,0 +1,277 @@
+"""
+Shared rate-curve store
+Compact binary file of rate curves (key rate, RUONIA)
+written atomically by the market data refresher and memory-mapped read-only
+by every worker, so all workers see the same curves without loading them
+from the database
+
+File layout (little-endian):
+    header     magic(8s) format_version(I) curve_count(I) generation(Q)
+    directory  curve_count x [name(64s) points(I) reserved(I) days_offset(Q) rates_offset(Q)
+                              source_updated(q)]
+    data       per curve: int32 day numbers (days since 1970-01-01), float64 rates,
+               each block aligned to 8 bytes
+
+source_updated is the last update of the database rows a curve was built from
+(microseconds since 1970-01-01, -1 if unknown); with the point count it tells
+readers whether the file still matches the tables, corrections included.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CRVSTOR1"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sIIQ")
+DIRECTORY_ENTRY = struct.Struct("<64sIIQQq")
+
+KEY_RATE_CURVE = "key_rate"
+RUONIA_CURVE = "ruonia"
+
+_EPOCH = date(1970, 1, 1)
+NO_SOURCE_UPDATE = -1
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def to_day_number(value: Union[date, datetime]) -> int:
+    """Days since 1970-01-01"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+def update_stamp(value: Optional[datetime]) -> int:
+    """Microseconds since 1970-01-01 of a stored update timestamp, NO_SOURCE_UPDATE for None"""
+    if value is None:
+        return NO_SOURCE_UPDATE
+    return (value.replace(tzinfo=None) - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+
+
+class Curve(NamedTuple):
+    """Step curve: rates[i] applies from days[i] until the next point"""
+
+    days: np.ndarray  # int32, sorted ascending
+    rates: np.ndarray  # float64
+    source_updated: int = NO_SOURCE_UPDATE  # update_stamp of the newest source row
+
+    def rate_on(self, target: Union[date, datetime]) -> Optional[float]:
+        """Rate in effect on a date, None before the first point"""
+        pos = int(np.searchsorted(self.days, to_day_number(target), side="right")) - 1
+        return float(self.rates[pos]) if pos >= 0 else None
+
+    def rates_on(self, targets: Iterable[Union[date, datetime]]) -> np.ndarray:
+        """Vectorized rate_on, NaN before the first point"""
+        day_numbers = np.fromiter((to_day_number(t) for t in targets), dtype=np.int64)
+        pos = np.searchsorted(self.days, day_numbers, side="right") - 1
+        result = np.full(len(day_numbers), np.nan)
+        valid = pos >= 0
+        result[valid] = self.rates[pos[valid]]
+        return result
+
+
+def write_curve_store(path: str, curves: Dict[str, Tuple[Iterable, Iterable]],
+                      source_updated: Optional[Dict[str, Optional[datetime]]] = None) -> int:
+    """
+    Atomically write curves to the store file
+
+    Args:
+        path: Store file path
+        curves: Mapping of curve name to (dates or day numbers, rates)
+        source_updated: Mapping of curve name to the last update of its source rows
+
+    Returns:
+        Generation number of the written file
+    """
+    prepared = []
+    for name, (days, rates) in curves.items():
+        encoded_name = name.encode("utf-8")
+        if len(encoded_name) > 64:
+            raise ValueError(f"Curve name too long: {name}")
+        day_numbers = np.array(
+            [d if isinstance(d, (int, np.integer)) else to_day_number(d) for d in days], dtype="<i4"
+        )
+        rate_values = np.asarray(list(rates), dtype="<f8")
+        if len(day_numbers) != len(rate_values):
+            raise ValueError(f"Curve {name}: {len(day_numbers)} dates but {len(rate_values)} rates")
+        order = np.argsort(day_numbers, kind="stable")
+        stamp = update_stamp((source_updated or {}).get(name))
+        prepared.append((encoded_name, day_numbers[order], rate_values[order], stamp))
+
+    generation = time.time_ns()
+    offset = _align(HEADER.size + DIRECTORY_ENTRY.size * len(prepared))
+    directory = []
+    for encoded_name, day_numbers, rate_values, stamp in prepared:
+        days_offset = offset
+        rates_offset = _align(days_offset + day_numbers.nbytes)
+        offset = _align(rates_offset + rate_values.nbytes)
+        directory.append((encoded_name, len(day_numbers), days_offset, rates_offset, stamp))
+
+    buffer = bytearray(offset)
+    HEADER.pack_into(buffer, 0, MAGIC, FORMAT_VERSION, len(prepared), generation)
+    for i, ((encoded_name, points, days_offset, rates_offset, stamp), (_, day_numbers, rate_values, _)) in enumerate(
+        zip(directory, prepared)
+    ):
+        DIRECTORY_ENTRY.pack_into(
+            buffer, HEADER.size + i * DIRECTORY_ENTRY.size, encoded_name, points, 0, days_offset, rates_offset, stamp
+        )
+        buffer[days_offset:days_offset + day_numbers.nbytes] = day_numbers.tobytes()
+        buffer[rates_offset:rates_offset + rate_values.nbytes] = rate_values.tobytes()
+
+    directory_path = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory_path, prefix=".curves-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(buffer)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    # Persist the rename itself
+    try:
+        dir_fd = os.open(directory_path, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+
+    return generation
+
+
+class CurveStore:
+    """
+    Read-only view of the curve store file
+
+    The file is memory-mapped and curves are zero-copy numpy views into the
+    mapping. A stat() on access detects a replaced file; the new mapping is
+    only adopted when its generation differs from the current one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.generation: Optional[int] = None
+        self._curves: Dict[str, Curve] = {}
+        self._file_id: Optional[Tuple[int, int, int]] = None
+        self._mapping: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_id == self._file_id:
+            return
+
+        with self._lock:
+            if file_id == self._file_id:
+                return
+            try:
+                with open(self.path, "rb") as store_file:
+                    mapping = mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Cannot map curve store {self.path}: {str(e)}")
+                return
+
+            magic, format_version, curve_count, generation = HEADER.unpack_from(mapping, 0)
+            if magic != MAGIC or format_version != FORMAT_VERSION:
+                logger.warning(f"Curve store {self.path} has unsupported format")
+                mapping.close()
+                return
+
+            if generation != self.generation:
+                curves = {}
+                for i in range(curve_count):
+                    encoded_name, points, _, days_offset, rates_offset, stamp = DIRECTORY_ENTRY.unpack_from(
+                        mapping, HEADER.size + i * DIRECTORY_ENTRY.size
+                    )
+                    name = encoded_name.rstrip(b"\0").decode("utf-8")
+                    curves[name] = Curve(
+                        days=np.frombuffer(mapping, dtype="<i4", count=points, offset=days_offset),
+                        rates=np.frombuffer(mapping, dtype="<f8", count=points, offset=rates_offset),
+                        source_updated=stamp,
+                    )
+                # Old views keep the previous mapping alive until they are released
+                self._curves = curves
+                self._mapping = mapping
+                self.generation = generation
+                logger.info(f"Loaded curve store generation {generation} ({curve_count} curves)")
+            else:
+                mapping.close()
+            self._file_id = file_id
+
+    def get_curve(self, name: str) -> Optional[Curve]:
+        """Get a curve by name, None if the store or the curve does not exist"""
+        self._refresh()
+        return self._curves.get(name)
+
+    def names(self) -> list:
+        """Names of all curves in the current generation"""
+        self._refresh()
+        return list(self._curves)
+
+
+def build_curves(db: Session) -> Dict[str, Tuple[list, list]]:
+    """Collect key rate and RUONIA curves from the database"""
+    from app.models.cbr_key_rate import CBRKeyRate
+    from app.models.ruonia_rate import RuoniaRate
+
+    curves: Dict[str, Tuple[list, list]] = {}
+
+    key_rates = db.query(CBRKeyRate.effective_date, CBRKeyRate.rate).order_by(CBRKeyRate.effective_date).all()
+    if key_rates:
+        curves[KEY_RATE_CURVE] = ([row.effective_date for row in key_rates], [row.rate for row in key_rates])
+
+    ruonia_rates = db.query(RuoniaRate.date, RuoniaRate.rate).order_by(RuoniaRate.date).all()
+    if ruonia_rates:
+        curves[RUONIA_CURVE] = ([row.date for row in ruonia_rates], [row.rate for row in ruonia_rates])
+
+    return curves
+
+
+def default_store_path() -> str:
+    return settings.curve_store_path or os.path.join(tempfile.gettempdir(), "cfo_cto_helper_curves.bin")
+
+
+def publish_curves(db: Session, path: Optional[str] = None) -> int:
+    """Rebuild the curve store file from the database, returns the number of curves"""
+    from app.models.cbr_key_rate import CBRKeyRate
+    from app.models.ruonia_rate import RuoniaRate
+
+    # Read before the rows: a concurrent write makes the file look older, never newer
+    source_updated = {
+        KEY_RATE_CURVE: CBRKeyRate.get_series_version(db)[2],
+        RUONIA_CURVE: RuoniaRate.get_series_version(db)[2],
+    }
+    curves = build_curves(db)
+    generation = write_curve_store(path or default_store_path(), curves, source_updated)
+    logger.info(f"Published curve store generation {generation} ({len(curves)} curves)")
+    return len(curves)
+
+
+# Singleton reader
+curve_store = CurveStore(default_store_path())
@@ -0,0 +1,147 @@
+"""
+Columnar storage of uploaded datasets
+File uploads are written as Arrow IPC files and read back through a memory
+map, so analyses load only the columns they use without decoding row JSON.
+Without pyarrow (or with DATASET_STORAGE=json) rows stay in DataUpload.raw_data,
+compressed in the data_upload_blobs table.
+"""
+
+import logging
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from app.config import settings
+from app.models.data_upload import DataUpload
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # Optional dependency: fall back to JSON rows
+    pa = None
+    ipc = None
+
+logger = logging.getLogger(__name__)
+
+ARROW = "arrow"
+JSON = "json"
+
+
+def _json_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    return df.to_dict(orient='records')
+
+
+class DatasetStore:
+    """Arrow IPC files of upload rows, one file per upload"""
+
+    def __init__(self, root: str, storage: str = ARROW):
+        self.root = root
+        self.storage = storage
+
+    @property
+    def enabled(self) -> bool:
+        return self.storage == ARROW and pa is not None
+
+    def path_for(self, upload_id: int) -> str:
+        return os.path.join(self.root, f"upload_{upload_id}.arrow")
+
+    def write(self, upload_id: int, df: pd.DataFrame) -> str:
+        """Write the rows of an upload, returns the file path"""
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        path = self.path_for(upload_id)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        # Uncompressed so that reads can map the buffers instead of copying them
+        with pa.OSFile(tmp_path, 'wb') as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+        return path
+
+    @contextmanager
+    def writer(self, upload_id: int, schema: "pa.Schema") -> Iterator["DatasetWriter"]:
+        """
+        Write the rows of an upload chunk by chunk
+
+        The file only replaces the upload's dataset once every chunk was
+        written; on error the partial file is removed.
+        """
+        path = self.path_for(upload_id)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        try:
+            with pa.OSFile(tmp_path, 'wb') as sink, ipc.new_file(sink, schema) as writer:
+                yield DatasetWriter(path, schema, writer)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def read(self, path: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Read a dataset, optionally only the given columns (missing ones are skipped)"""
+        if pa is None:
+            raise RuntimeError("pyarrow is required to read columnar datasets")
+        with pa.memory_map(path, 'r') as source:
+            table = ipc.open_file(source).read_all()
+            if columns is not None:
+                wanted = set(columns)
+                table = table.select([name for name in table.column_names if name in wanted])
+            return table.to_pandas(split_blocks=True)
+
+    def delete(self, path: Optional[str]) -> None:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def store_upload_rows(self, upload: DataUpload, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Persist the rows of a flushed upload record, returns the preview rows
+
+        Columnar storage keeps only preview_data in the table; if it is
+        disabled or the frame cannot be represented in Arrow (mixed-type
+        columns), the rows are stored as JSON in raw_data as before.
+        """
+        preview = _json_records(df.head(settings.upload_preview_rows))
+        upload.preview_data = preview
+
+        if self.enabled:
+            try:
+                upload.dataset_path = self.write(upload.id, df)
+                upload.raw_data = None
+                return preview
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+                logger.warning(f"Upload {upload.id} cannot be stored as Arrow, keeping JSON rows: {str(e)}")
+
+        upload.dataset_path = None
+        upload.raw_data = _json_records(df)
+        return preview
+
+    def load_upload_frame(self, upload: DataUpload, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Rows of an upload from its dataset file or its JSON rows"""
+        if upload.dataset_path:
+            return self.read(upload.dataset_path, columns)
+        df = pd.DataFrame(upload.raw_data or [])
+        if columns is not None:
+            wanted = set(columns)
+            df = df[[name for name in df.columns if name in wanted]]
+        return df
+
+
+class DatasetWriter:
+    """Appends DataFrame chunks with a fixed schema to an open dataset file"""
+
+    def __init__(self, path: str, schema: "pa.Schema", writer):
+        self.path = path
+        self.schema = schema
+        self.rows = 0
+        self._writer = writer
+
+    def write(self, df: pd.DataFrame) -> None:
+        self._writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+        self.rows += len(df)
+
+
+dataset_store = DatasetStore(
+    settings.dataset_dir or os.path.join(settings.upload_dir, "datasets"),
+    storage=settings.dataset_storage,
+)
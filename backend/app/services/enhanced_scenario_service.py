@@ -8,10 +8,16 @@ import numpy as np
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 import logging
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 
-from app.services.scenario_service import ScenarioService, ScenarioType
-from app.services.external_data_service import external_data_service, MarketData, CurrencyRate
+from app.models.scenario import Scenario
+from app.services.scenario_service import SCENARIO_COLUMNS, ScenarioService, ScenarioType
+from app.services.external_data_service import external_data_service, CurrencyRate
+from app.services.market_analytics import MarketAnalytics, factor_symbols
+from app.services.exposure_service import EXPOSURE_COLUMNS, ExposureService, ExposureSet
+from app.services.var_engine import KEY_RATE_FACTOR, RiskPortfolio, VaRResult, var_engine
+from app.services.upload_frames import upload_frame_cache
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +34,52 @@ class RiskScenario:
     probability: float  # Scenario probability
 
 
+RISK_FACTORS = ('market', 'currency', 'interest_rate', 'commodity')
+
+
+@dataclass
+class ShockMatrix:
+    """Risk scenarios as a (scenarios x risk factors) shock matrix, columns in RISK_FACTORS order"""
+    names: List[str]
+    probabilities: np.ndarray
+    shocks: np.ndarray
+
+    @classmethod
+    def from_scenarios(cls, scenarios: Dict[str, RiskScenario]) -> 'ShockMatrix':
+        values = np.array([
+            (s.market_shock, s.currency_shock, s.interest_rate_shock, s.commodity_shock, s.probability)
+            for s in scenarios.values()
+        ], dtype=np.float64).reshape(-1, len(RISK_FACTORS) + 1)
+        return cls(names=list(scenarios), probabilities=values[:, -1], shocks=values[:, :-1])
+
+    def stress_results(self, sensitivities: np.ndarray, current_impact: float, impact_key: str) -> Dict[str, Dict[str, float]]:
+        """
+        Stressed impact of every scenario from one matrix product
+
+        Args:
+            sensitivities: Impact change per unit shock of each risk factor
+            current_impact: Impact at current market levels
+            impact_key: Result key for the stressed impact ('fx_impact', ...)
+        """
+        changes = self.shocks @ sensitivities
+        impacts = current_impact + changes
+        return {
+            name: {
+                impact_key: impact,
+                'impact_change': change,
+                'scenario_probability': probability
+            }
+            for name, impact, change, probability in zip(
+                self.names, impacts.tolist(), changes.tolist(), self.probabilities.tolist()
+            )
+        }
+
+
+def factor_vector(**sensitivities: float) -> np.ndarray:
+    """Sensitivity vector over RISK_FACTORS, unspecified factors are zero"""
+    return np.array([sensitivities.get(factor, 0.0) for factor in RISK_FACTORS], dtype=np.float64)
+
+
 @dataclass
 class ScenarioResult:
     """Enhanced scenario result with risk metrics"""
@@ -39,6 +91,14 @@ class ScenarioResult:
     recommendations: List[str]
 
 
+@dataclass
+class BatchScenarioResult:
+    """Enhanced results of a batch of scenarios sharing one set of external factors"""
+    external_factors: Dict[str, Any]
+    results: Dict[int, ScenarioResult] = field(default_factory=dict)
+    errors: Dict[int, str] = field(default_factory=dict)
+
+
 class EnhancedScenarioService(ScenarioService):
     """Enhanced scenario service with external data integration"""
     
@@ -94,6 +154,20 @@ class EnhancedScenarioService(ScenarioService):
                 probability=0.08
             )
         }
+        self._shock_matrix: Optional[ShockMatrix] = None
+    
+    def add_risk_scenarios(self, scenarios: Dict[str, RiskScenario]) -> None:
+        """Add or replace user-defined risk scenarios used by the stress tests"""
+        self.risk_scenarios.update(scenarios)
+        self._shock_matrix = None
+    
+    def get_shock_matrix(self, scenarios: Optional[Dict[str, RiskScenario]] = None) -> ShockMatrix:
+        """Shock matrix of the given scenarios, or of self.risk_scenarios (built once)"""
+        if scenarios is not None:
+            return ShockMatrix.from_scenarios(scenarios)
+        if self._shock_matrix is None:
+            self._shock_matrix = ShockMatrix.from_scenarios(self.risk_scenarios)
+        return self._shock_matrix
     
     def execute_enhanced_scenario(self, scenario_id: int, stress_test: bool = False) -> ScenarioResult:
         """
@@ -106,24 +180,99 @@ class EnhancedScenarioService(ScenarioService):
         Returns:
             ScenarioResult with enhanced analysis
         """
-        # Get base scenario
-        scenario = self.db.query(self.models.Scenario).filter_by(id=scenario_id).first()
-        if not scenario:
-            raise ValueError(f"Scenario {scenario_id} not found")
+        batch = self.execute_enhanced_scenarios([scenario_id], stress_test)
+        if scenario_id in batch.errors:
+            raise ValueError(batch.errors[scenario_id])
+        return batch.results[scenario_id]
+    
+    def execute_enhanced_scenarios(self, scenario_ids: List[int], stress_test: bool = False,
+                                   user_id: Optional[int] = None, max_workers: int = 1) -> BatchScenarioResult:
+        """
+        Execute enhanced analysis for many scenarios against shared inputs
         
-        # Get external market data
-        external_factors = self._get_external_factors()
+        External factors and upload data are loaded once for the whole batch.
+        The per-scenario analyses only read those inputs and may run in a
+        thread pool; results are stored with a single commit.
         
-        # Execute base scenario
-        base_result = self.execute_scenario(scenario_id)
+        Args:
+            scenario_ids: Scenario IDs from database
+            stress_test: Whether to perform stress testing
+            user_id: Only run scenarios owned by this user if given
+            max_workers: Number of worker threads for the analyses
+            
+        Returns:
+            BatchScenarioResult with results and errors by scenario id
+        """
+        query = self.db.query(Scenario).filter(Scenario.id.in_(set(scenario_ids)))
+        if user_id is not None:
+            query = query.filter(Scenario.user_id == user_id)
+        scenarios = {scenario.id: scenario for scenario in query.all()}
+        
+        batch = BatchScenarioResult(external_factors=self._get_external_factors())
+        for scenario_id in scenario_ids:
+            if scenario_id not in scenarios:
+                batch.errors[scenario_id] = f"Scenario {scenario_id} not found"
+        if not scenarios:
+            return batch
+        
+        upload_ids = {upload_id for scenario in scenarios.values() for upload_id in scenario.data_upload_ids or []}
+        frames = self._load_upload_frames(list(upload_ids), columns=SCENARIO_COLUMNS + EXPOSURE_COLUMNS)
+        
+        def analyze(scenario):
+            return self.analyze_data(scenario.scenario_type, scenario.parameters, self._scenario_data(scenario, frames))
+        
+        outcomes = {}
+        if max_workers > 1 and len(scenarios) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = {scenario_id: pool.submit(analyze, scenario) for scenario_id, scenario in scenarios.items()}
+                for scenario_id, future in futures.items():
+                    try:
+                        outcomes[scenario_id] = future.result()
+                    except Exception as e:
+                        outcomes[scenario_id] = e
+        else:
+            for scenario_id, scenario in scenarios.items():
+                try:
+                    outcomes[scenario_id] = analyze(scenario)
+                except Exception as e:
+                    outcomes[scenario_id] = e
+        
+        for scenario_id, outcome in outcomes.items():
+            scenario = scenarios[scenario_id]
+            if isinstance(outcome, Exception):
+                logger.error(f"Scenario {scenario_id} analysis failed: {str(outcome)}")
+                self._mark_failed(scenario, outcome)
+                batch.errors[scenario_id] = str(outcome)
+                continue
+            
+            self._store_analysis_result(scenario, outcome)
+            cash_flows = self._scenario_cash_flows(scenario, frames)
+            batch.results[scenario_id] = self._build_scenario_result(
+                scenario, outcome, batch.external_factors, cash_flows, stress_test
+            )
         
+        self.db.commit()
+        return batch
+    
+    def _scenario_cash_flows(self, scenario, frames: Dict[int, Tuple[str, pd.DataFrame]]) -> pd.DataFrame:
+        """All rows of a scenario's uploads, tagged for exposure caching"""
+        upload_ids = [upload_id for upload_id in scenario.data_upload_ids or [] if upload_id in frames]
+        dfs = [frames[upload_id][1] for upload_id in upload_ids]
+        cash_flows = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+        cash_flows.attrs['upload_ids'] = upload_ids
+        cash_flows.attrs['user_id'] = scenario.user_id
+        return cash_flows
+    
+    def _build_scenario_result(self, scenario, base_result: Dict[str, Any], external_factors: Dict[str, Any],
+                               cash_flows: pd.DataFrame, stress_test: bool) -> ScenarioResult:
+        """Add stress tests, risk metrics and recommendations to a base analysis"""
         # Perform stress testing if requested
         stressed_results = {}
         if stress_test:
             stressed_results = self._perform_stress_testing(scenario, external_factors)
         
         # Calculate risk metrics
-        risk_metrics = self._calculate_risk_metrics(base_result, external_factors)
+        risk_metrics = self._calculate_risk_metrics(base_result, external_factors, cash_flows)
         
         # Generate recommendations
         recommendations = self._generate_enhanced_recommendations(
@@ -139,13 +288,15 @@ class EnhancedScenarioService(ScenarioService):
             recommendations=recommendations
         )
     
-    def execute_currency_risk_scenario(self, cash_flows: pd.DataFrame, base_currency: str = 'RUB') -> Dict[str, Any]:
+    def execute_currency_risk_scenario(self, cash_flows: pd.DataFrame, base_currency: str = 'RUB',
+                                       scenarios: Optional[Dict[str, RiskScenario]] = None) -> Dict[str, Any]:
         """
         Execute currency risk scenario analysis
         
         Args:
             cash_flows: DataFrame with cash flows data
             base_currency: Base currency for analysis
+            scenarios: Risk scenarios to stress test, defaults to self.risk_scenarios
             
         Returns:
             Dictionary with currency risk analysis
@@ -160,16 +311,10 @@ class EnhancedScenarioService(ScenarioService):
         current_fx_impact = self._calculate_fx_impact(currency_exposures, currency_rates)
         
         # Stress test currency scenarios
-        fx_stress_results = {}
-        for scenario_name, scenario in self.risk_scenarios.items():
-            stressed_rates = self._apply_currency_shock(currency_rates, scenario.currency_shock)
-            stressed_impact = self._calculate_fx_impact(currency_exposures, stressed_rates)
-            
-            fx_stress_results[scenario_name] = {
-                'fx_impact': stressed_impact,
-                'impact_change': stressed_impact - current_fx_impact,
-                'scenario_probability': scenario.probability
-            }
+        sensitivities = factor_vector(currency=self._fx_shock_sensitivity(currency_exposures, currency_rates))
+        fx_stress_results = self.get_shock_matrix(scenarios).stress_results(
+            sensitivities, current_fx_impact, 'fx_impact'
+        )
         
         return {
             'analysis_type': 'currency_risk',
@@ -181,13 +326,15 @@ class EnhancedScenarioService(ScenarioService):
             'recommendations': self._generate_fx_recommendations(currency_exposures, fx_stress_results)
         }
     
-    def execute_interest_rate_risk_scenario(self, cash_flows: pd.DataFrame, country: str = 'US') -> Dict[str, Any]:
+    def execute_interest_rate_risk_scenario(self, cash_flows: pd.DataFrame, country: str = 'US',
+                                            scenarios: Optional[Dict[str, RiskScenario]] = None) -> Dict[str, Any]:
         """
         Execute interest rate risk scenario analysis
         
         Args:
             cash_flows: DataFrame with cash flows data
             country: Country for interest rate analysis
+            scenarios: Risk scenarios to stress test, defaults to self.risk_scenarios
             
         Returns:
             Dictionary with interest rate risk analysis
@@ -202,16 +349,12 @@ class EnhancedScenarioService(ScenarioService):
         current_rate_impact = self._calculate_interest_rate_impact(rate_sensitive_items, interest_rates)
         
         # Stress test interest rate scenarios
-        rate_stress_results = {}
-        for scenario_name, scenario in self.risk_scenarios.items():
-            stressed_rates = self._apply_interest_rate_shock(interest_rates, scenario.interest_rate_shock)
-            stressed_impact = self._calculate_interest_rate_impact(rate_sensitive_items, stressed_rates)
-            
-            rate_stress_results[scenario_name] = {
-                'rate_impact': stressed_impact,
-                'impact_change': stressed_impact - current_rate_impact,
-                'scenario_probability': scenario.probability
-            }
+        sensitivities = factor_vector(
+            interest_rate=self._interest_rate_shock_sensitivity(rate_sensitive_items, interest_rates)
+        )
+        rate_stress_results = self.get_shock_matrix(scenarios).stress_results(
+            sensitivities, current_rate_impact, 'rate_impact'
+        )
         
         return {
             'analysis_type': 'interest_rate_risk',
@@ -223,12 +366,14 @@ class EnhancedScenarioService(ScenarioService):
             'recommendations': self._generate_rate_recommendations(rate_sensitive_items, rate_stress_results)
         }
     
-    def execute_commodity_risk_scenario(self, cash_flows: pd.DataFrame) -> Dict[str, Any]:
+    def execute_commodity_risk_scenario(self, cash_flows: pd.DataFrame,
+                                        scenarios: Optional[Dict[str, RiskScenario]] = None) -> Dict[str, Any]:
         """
         Execute commodity risk scenario analysis
         
         Args:
             cash_flows: DataFrame with cash flows data
+            scenarios: Risk scenarios to stress test, defaults to self.risk_scenarios
             
         Returns:
             Dictionary with commodity risk analysis
@@ -243,16 +388,11 @@ class EnhancedScenarioService(ScenarioService):
         current_commodity_impact = self._calculate_commodity_impact(commodity_exposures, commodity_prices)
         
         # Stress test commodity scenarios
-        commodity_stress_results = {}
-        for scenario_name, scenario in self.risk_scenarios.items():
-            stressed_prices = self._apply_commodity_shock(commodity_prices, scenario.commodity_shock)
-            stressed_impact = self._calculate_commodity_impact(commodity_exposures, stressed_prices)
-            
-            commodity_stress_results[scenario_name] = {
-                'commodity_impact': stressed_impact,
-                'impact_change': stressed_impact - current_commodity_impact,
-                'scenario_probability': scenario.probability
-            }
+        # Impact is linear in prices, so its shock sensitivity equals the current impact
+        sensitivities = factor_vector(commodity=current_commodity_impact)
+        commodity_stress_results = self.get_shock_matrix(scenarios).stress_results(
+            sensitivities, current_commodity_impact, 'commodity_impact'
+        )
         
         return {
             'analysis_type': 'commodity_risk',
@@ -263,12 +403,14 @@ class EnhancedScenarioService(ScenarioService):
             'recommendations': self._generate_commodity_recommendations(commodity_exposures, commodity_stress_results)
         }
     
-    def execute_market_correlation_scenario(self, cash_flows: pd.DataFrame) -> Dict[str, Any]:
+    def execute_market_correlation_scenario(self, cash_flows: pd.DataFrame,
+                                            scenarios: Optional[Dict[str, RiskScenario]] = None) -> Dict[str, Any]:
         """
         Execute market correlation scenario analysis
         
         Args:
             cash_flows: DataFrame with cash flows data
+            scenarios: Risk scenarios to stress test, defaults to self.risk_scenarios
             
         Returns:
             Dictionary with market correlation analysis
@@ -283,16 +425,11 @@ class EnhancedScenarioService(ScenarioService):
         current_market_impact = self._calculate_market_impact(market_correlations, market_indices)
         
         # Stress test market scenarios
-        market_stress_results = {}
-        for scenario_name, scenario in self.risk_scenarios.items():
-            stressed_indices = self._apply_market_shock(market_indices, scenario.market_shock)
-            stressed_impact = self._calculate_market_impact(market_correlations, stressed_indices)
-            
-            market_stress_results[scenario_name] = {
-                'market_impact': stressed_impact,
-                'impact_change': stressed_impact - current_market_impact,
-                'scenario_probability': scenario.probability
-            }
+        # Impact is linear in index levels, so its shock sensitivity equals the current impact
+        sensitivities = factor_vector(market=current_market_impact)
+        market_stress_results = self.get_shock_matrix(scenarios).stress_results(
+            sensitivities, current_market_impact, 'market_impact'
+        )
         
         return {
             'analysis_type': 'market_correlation',
@@ -336,11 +473,14 @@ class EnhancedScenarioService(ScenarioService):
         
         return stress_results
     
-    def _calculate_risk_metrics(self, base_result: Dict[str, Any], external_factors: Dict[str, Any]) -> Dict[str, Any]:
+    def _calculate_risk_metrics(self, base_result: Dict[str, Any], external_factors: Dict[str, Any],
+                                cash_flows: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """Calculate enhanced risk metrics"""
+        cash_flows = cash_flows if cash_flows is not None else pd.DataFrame()
+        var_result = self._calculate_historical_var(self._build_risk_portfolio(cash_flows, external_factors))
         return {
-            'value_at_risk': self._calculate_var(base_result),
-            'expected_shortfall': self._calculate_expected_shortfall(base_result),
+            'value_at_risk': self._calculate_var(var_result),
+            'expected_shortfall': self._calculate_expected_shortfall(var_result),
             'stress_test_impact': self._calculate_stress_impact(base_result, external_factors),
             'correlation_risk': self._calculate_correlation_risk(external_factors),
             'liquidity_risk': self._calculate_liquidity_risk(base_result),
@@ -348,16 +488,13 @@ class EnhancedScenarioService(ScenarioService):
         }
     
     # Helper methods (mock implementations for development)
+    def _get_exposures(self, cash_flows: pd.DataFrame) -> ExposureSet:
+        """Exposures of the cash flows, computed once per upload version"""
+        return ExposureService(self.db).get_exposures(cash_flows)
+    
     def _identify_currency_exposures(self, cash_flows: pd.DataFrame) -> Dict[str, float]:
         """Identify currency exposures in cash flows"""
-        # Mock implementation
-        return {
-            'CNY': 250000,
-            'USD': 150000,
-            'EUR': 500000,
-            'INR': 800000,
-            'RUB': -1000000  # Base currency
-        }
+        return dict(self._get_exposures(cash_flows).currency)
     
     def _calculate_fx_impact(self, exposures: Dict[str, float], rates: List[CurrencyRate]) -> float:
         """Calculate FX impact on cash flows"""
@@ -378,18 +515,14 @@ class EnhancedScenarioService(ScenarioService):
         
         return total_impact
     
-    def _apply_currency_shock(self, rates: List[CurrencyRate], shock: float) -> List[CurrencyRate]:
-        """Apply currency shock to rates"""
-        shocked_rates = []
-        for rate in rates:
-            new_rate = CurrencyRate(
-                base_currency=rate.base_currency,
-                target_currency=rate.target_currency,
-                rate=rate.rate * (1 + shock),
-                timestamp=rate.timestamp
-            )
-            shocked_rates.append(new_rate)
-        return shocked_rates
+    def _fx_shock_sensitivity(self, exposures: Dict[str, float], rates: List[CurrencyRate]) -> float:
+        """FX impact change per unit relative shock of all rates to RUB"""
+        rate_dict = {rate.base_currency: rate.rate for rate in rates if rate.target_currency == 'RUB'}
+        # RUB exposure is not affected by the shock
+        matched = [currency for currency in exposures if currency in rate_dict]
+        amounts = np.fromiter((exposures[c] for c in matched), dtype=np.float64, count=len(matched))
+        values = np.fromiter((rate_dict[c] for c in matched), dtype=np.float64, count=len(matched))
+        return float(amounts @ values)
     
     def _generate_fx_recommendations(self, exposures: Dict[str, float], stress_results: Dict[str, Any]) -> List[str]:
         """Generate FX risk recommendations"""
@@ -397,6 +530,8 @@ class EnhancedScenarioService(ScenarioService):
         
         # Analyze exposure concentration
         total_exposure = sum(abs(exp) for exp in exposures.values())
+        if not total_exposure or not stress_results:
+            return recommendations
         for currency, exposure in exposures.items():
             if abs(exposure) / total_exposure > 0.3:
                 recommendations.append(f"Consider hedging {currency} exposure of {exposure:,.0f}")
@@ -410,12 +545,7 @@ class EnhancedScenarioService(ScenarioService):
     
     def _identify_rate_sensitive_items(self, cash_flows: pd.DataFrame) -> Dict[str, float]:
         """Identify interest rate sensitive items"""
-        # Mock implementation
-        return {
-            'variable_rate_debt': -500000,
-            'fixed_deposits': 200000,
-            'floating_rate_investments': 150000
-        }
+        return dict(self._get_exposures(cash_flows).rate_sensitive)
     
     def _calculate_interest_rate_impact(self, items: Dict[str, float], rates: Dict[str, float]) -> float:
         """Calculate interest rate impact"""
@@ -430,12 +560,17 @@ class EnhancedScenarioService(ScenarioService):
         
         return total_impact
     
-    def _apply_interest_rate_shock(self, rates: Dict[str, float], shock: float) -> Dict[str, float]:
-        """Apply interest rate shock"""
-        shocked_rates = {}
-        for rate_type, rate in rates.items():
-            shocked_rates[rate_type] = rate + shock
-        return shocked_rates
+    def _interest_rate_shock_sensitivity(self, items: Dict[str, float], rates: Dict[str, float]) -> float:
+        """Interest rate impact change per unit additive shock of the base rate"""
+        if 'federal_funds_rate' not in rates:
+            return 0.0  # The default base rate is not shocked
+        return self._rate_sensitivity(items)
+    
+    def _rate_sensitivity(self, items: Dict[str, float]) -> float:
+        """Interest impact per unit rate of the rate sensitive items"""
+        weights = np.fromiter((1.0 if 'debt' in item else 0.8 for item in items), dtype=np.float64, count=len(items))
+        amounts = np.fromiter(items.values(), dtype=np.float64, count=len(items))
+        return float(amounts @ weights)
     
     def _generate_rate_recommendations(self, items: Dict[str, float], stress_results: Dict[str, Any]) -> List[str]:
         """Generate interest rate recommendations"""
@@ -449,12 +584,7 @@ class EnhancedScenarioService(ScenarioService):
     
     def _identify_commodity_exposures(self, cash_flows: pd.DataFrame) -> Dict[str, float]:
         """Identify commodity exposures"""
-        # Mock implementation
-        return {
-            'OIL': 50000,
-            'GOLD': -25000,
-            'WHEAT': 30000
-        }
+        return dict(self._get_exposures(cash_flows).commodity)
     
     def _calculate_commodity_impact(self, exposures: Dict[str, float], prices) -> float:
         """Calculate commodity impact"""
@@ -467,20 +597,6 @@ class EnhancedScenarioService(ScenarioService):
         
         return total_impact
     
-    def _apply_commodity_shock(self, prices, shock: float):
-        """Apply commodity shock to prices"""
-        shocked_prices = []
-        for price in prices:
-            from app.services.external_data_service import CommodityPrice
-            shocked_price = CommodityPrice(
-                commodity=price.commodity,
-                price=price.price * (1 + shock),
-                currency=price.currency,
-                timestamp=price.timestamp
-            )
-            shocked_prices.append(shocked_price)
-        return shocked_prices
-    
     def _generate_commodity_recommendations(self, exposures: Dict[str, float], stress_results: Dict[str, Any]) -> List[str]:
         """Generate commodity recommendations"""
         recommendations = []
@@ -511,20 +627,6 @@ class EnhancedScenarioService(ScenarioService):
         
         return total_impact
     
-    def _apply_market_shock(self, indices, shock: float):
-        """Apply market shock to indices"""
-        shocked_indices = []
-        for idx in indices:
-            shocked_idx = MarketData(
-                symbol=idx.symbol,
-                value=idx.value * (1 + shock),
-                timestamp=idx.timestamp,
-                source=idx.source,
-                metadata=idx.metadata
-            )
-            shocked_indices.append(shocked_idx)
-        return shocked_indices
-    
     def _generate_market_recommendations(self, correlations: Dict[str, float], stress_results: Dict[str, Any]) -> List[str]:
         """Generate market recommendations"""
         recommendations = []
@@ -545,12 +647,38 @@ class EnhancedScenarioService(ScenarioService):
         # Mock implementation
         return {'stressed_result': True}
     
-    def _calculate_var(self, result: Dict[str, Any]) -> float:
+    def _build_risk_portfolio(self, cash_flows: pd.DataFrame, external_factors: Dict[str, Any]) -> RiskPortfolio:
+        """Linear FX and key rate sensitivities of the exposures for historical simulation"""
+        exposures = self._identify_currency_exposures(cash_flows)
+        rate_dict = {
+            rate.base_currency: rate.rate
+            for rate in external_factors.get('currency_rates', []) if rate.target_currency == 'RUB'
+        }
+        sensitivities = {
+            f"{currency}/RUB": exposure * rate_dict[currency]
+            for currency, exposure in exposures.items() if currency in rate_dict
+        }
+        sensitivities[KEY_RATE_FACTOR] = self._rate_sensitivity(self._identify_rate_sensitive_items(cash_flows))
+        return RiskPortfolio(sensitivities=sensitivities)
+    
+    def _calculate_historical_var(self, portfolio: RiskPortfolio) -> Optional[VaRResult]:
+        """Historical-simulation VaR/ES of the portfolio, None without enough stored history"""
+        try:
+            return var_engine.compute(self.db, portfolio)
+        except Exception as e:
+            logger.warning(f"Historical VaR failed: {str(e)}")
+            return None
+    
+    def _calculate_var(self, var_result: Optional[VaRResult]) -> float:
         """Calculate Value at Risk"""
+        if var_result is not None:
+            return var_result.value_at_risk
         return 95000  # Mock VaR at 95% confidence
     
-    def _calculate_expected_shortfall(self, result: Dict[str, Any]) -> float:
+    def _calculate_expected_shortfall(self, var_result: Optional[VaRResult]) -> float:
         """Calculate Expected Shortfall"""
+        if var_result is not None:
+            return var_result.expected_shortfall
         return 125000  # Mock ES
     
     def _calculate_stress_impact(self, result: Dict[str, Any], external_factors: Dict[str, Any]) -> float:
@@ -558,8 +686,13 @@ class EnhancedScenarioService(ScenarioService):
         return 0.15  # Mock 15% impact
     
     def _calculate_correlation_risk(self, external_factors: Dict[str, Any]) -> float:
-        """Calculate correlation risk"""
-        return 0.65  # Mock correlation risk
+        """Calculate correlation risk as mean absolute EWMA correlation of stored factor series"""
+        try:
+            correlation = MarketAnalytics(self.db).average_correlation(factor_symbols(external_factors))
+        except Exception as e:
+            logger.warning(f"Correlation risk from stored quotes failed: {str(e)}")
+            correlation = None
+        return correlation if correlation is not None else 0.65  # Mock correlation risk
     
     def _calculate_liquidity_risk(self, result: Dict[str, Any]) -> float:
         """Calculate liquidity risk"""
@@ -595,27 +728,19 @@ class EnhancedScenarioService(ScenarioService):
     def _get_cash_flows_from_uploads(self, upload_ids: List[int], user_id: int) -> pd.DataFrame:
         """Get cash flows data from uploads"""
         try:
-            from app.models.data_upload import DataUpload
-            
-            uploads = self.db.query(DataUpload).filter(
-                DataUpload.id.in_(upload_ids),
-                DataUpload.user_id == user_id
-            ).all()
+            uploads = upload_frame_cache.get_frames(
+                self.db, upload_ids, user_id=user_id, columns=('date',) + EXPOSURE_COLUMNS
+            )
             
             if not uploads:
                 raise ValueError("No uploads found")
             
-            # Combine all upload data
-            all_data = []
-            for upload in uploads:
-                if upload.raw_data:
-                    all_data.extend(upload.raw_data)
-            
-            if not all_data:
-                raise ValueError("No data found in uploads")
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(all_data)
+            # Combine all upload data; the upload ids let exposures be cached per upload version.
+            # Uploads without rows still contribute the user's credit obligations.
+            dfs = [upload.frame for upload in uploads.values() if not upload.frame.empty]
+            df = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+            df.attrs['upload_ids'] = sorted(uploads)
+            df.attrs['user_id'] = user_id
             
             # Ensure required columns exist
             if 'amount' not in df.columns:
@@ -0,0 +1,113 @@
+"""
+Excel reading with the fastest available engine
+Workbooks are read with calamine (Rust) when python-calamine is installed and
+with openpyxl in read-only streaming mode otherwise. Both engines produce the
+same DataFrames. Workbook metadata (format, sheet names) is cached by content.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, Tuple, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+try:
+    import python_calamine
+except ImportError:  # optional dependency
+    python_calamine = None
+
+CALAMINE = "calamine"
+OPENPYXL = "openpyxl"
+XLRD = "xlrd"
+
+# Legacy .xls files are OLE compound documents; .xlsx files are ZIP archives
+_OLE_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+ExcelSource = Union[str, bytes]
+
+
+@dataclass(frozen=True)
+class WorkbookInfo:
+    """Cached metadata of a workbook"""
+    engine: str
+    sheet_names: Tuple[str, ...]
+
+
+class ExcelReader:
+    """Reads Excel files from paths or bytes"""
+
+    def __init__(self, prefer_calamine: bool = True, cache_size: int = 128):
+        self.calamine = prefer_calamine and python_calamine is not None
+        self.cache_size = cache_size
+        self._info: "OrderedDict[Hashable, WorkbookInfo]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(self, source: ExcelSource, **kwargs) -> pd.DataFrame:
+        """pd.read_excel with the engine chosen for this workbook"""
+        engine = self.workbook_info(source).engine
+        df = pd.read_excel(self._file(source), engine=engine, **kwargs)
+
+        # openpyxl drops blank rows at the end of a partial read and calamine
+        # keeps them; such heads are read with pandas' default engine so engines agree
+        if engine == CALAMINE and kwargs.get("nrows") is not None and len(df) and df.iloc[-1].isna().all():
+            df = pd.read_excel(self._file(source), **kwargs)
+        return df
+
+    def sheet_names(self, source: ExcelSource) -> Tuple[str, ...]:
+        return self.workbook_info(source).sheet_names
+
+    def workbook_info(self, source: ExcelSource) -> WorkbookInfo:
+        """Engine and sheet names of a workbook, opened once per content"""
+        key = self._key(source)
+        with self._lock:
+            info = self._info.get(key)
+            if info is not None:
+                self._info.move_to_end(key)
+                return info
+
+        info = self._load_info(source)
+        with self._lock:
+            self._info[key] = info
+            while len(self._info) > self.cache_size:
+                self._info.popitem(last=False)
+        return info
+
+    def _load_info(self, source: ExcelSource) -> WorkbookInfo:
+        if self.calamine:
+            workbook = python_calamine.CalamineWorkbook.from_object(self._file(source))
+            try:
+                return WorkbookInfo(CALAMINE, tuple(workbook.sheet_names))
+            finally:
+                workbook.close()
+
+        legacy = self._header(source).startswith(_OLE_MAGIC)
+        with pd.ExcelFile(self._file(source), engine=XLRD if legacy else OPENPYXL) as workbook:
+            return WorkbookInfo(workbook.engine, tuple(workbook.sheet_names))
+
+    @staticmethod
+    def _key(source: ExcelSource) -> Hashable:
+        if isinstance(source, bytes):
+            return hashlib.sha1(source).hexdigest()
+        stat = os.stat(source)
+        return os.path.abspath(source), stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _header(source: ExcelSource) -> bytes:
+        if isinstance(source, bytes):
+            return source[:len(_OLE_MAGIC)]
+        with open(source, "rb") as f:
+            return f.read(len(_OLE_MAGIC))
+
+    @staticmethod
+    def _file(source: ExcelSource):
+        return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+excel_reader = ExcelReader()
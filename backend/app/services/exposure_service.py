@@ -0,0 +1,183 @@
+"""
+Risk exposures of uploaded cash flows and credit obligations
+One group-by over (currency, rate type, category) feeds the currency,
+interest rate and commodity analyses; results are cached per upload version
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.models.credit_obligation import CreditObligation
+from app.models.data_upload import DataUpload
+from app.models.payment_schedule import PaymentSchedule  # noqa: F401 - resolves CreditObligation.payment_schedule
+
+logger = logging.getLogger(__name__)
+
+BASE_CURRENCY = 'RUB'
+COMMODITY_SYMBOLS = ('GOLD', 'SILVER', 'COPPER', 'OIL', 'WHEAT')
+
+# Upload columns read by cash_flow_frame
+EXPOSURE_COLUMNS = ('inflow', 'outflow', 'amount', 'net_flow', 'currency', 'commodity', 'category', 'type')
+
+# Rate types
+VARIABLE_RATE = 'variable'
+FIXED_RATE = 'fixed'
+NO_RATE = 'none'
+
+# Rate-sensitive cash flow categories by keyword, first match wins
+RATE_SENSITIVE_KEYWORDS = (
+    ('DEPOSIT', 'fixed_deposits'),
+    ('INVEST', 'floating_rate_investments'),
+    ('LOAN', 'variable_rate_debt'),
+    ('CREDIT', 'variable_rate_debt'),
+    ('DEBT', 'variable_rate_debt'),
+)
+
+_cache_lock = threading.Lock()
+_cache: "OrderedDict[Hashable, ExposureSet]" = OrderedDict()
+_CACHE_MAX_ENTRIES = 64
+
+
+@dataclass(frozen=True)
+class ExposureSet:
+    """Net exposures by currency, rate-sensitive item and commodity"""
+    currency: Dict[str, float] = field(default_factory=dict)
+    rate_sensitive: Dict[str, float] = field(default_factory=dict)
+    commodity: Dict[str, float] = field(default_factory=dict)
+
+
+def cash_flow_frame(cash_flows: pd.DataFrame) -> pd.DataFrame:
+    """Normalize uploaded rows to (currency, rate_type, category, amount)"""
+    if cash_flows is None or cash_flows.empty:
+        return pd.DataFrame(columns=['currency', 'rate_type', 'category', 'amount'])
+
+    index = cash_flows.index
+    if {'inflow', 'outflow'} <= set(cash_flows.columns):
+        amount = (pd.to_numeric(cash_flows['inflow'], errors='coerce').fillna(0)
+                  - pd.to_numeric(cash_flows['outflow'], errors='coerce').fillna(0))
+    elif 'amount' in cash_flows.columns:
+        amount = pd.to_numeric(cash_flows['amount'], errors='coerce')
+    elif 'net_flow' in cash_flows.columns:
+        amount = pd.to_numeric(cash_flows['net_flow'], errors='coerce')
+    else:
+        amount = pd.Series(0.0, index=index)
+
+    def text_column(*names: str, default: str) -> pd.Series:
+        for name in names:
+            if name in cash_flows.columns:
+                return cash_flows[name].fillna(default).astype(str).str.strip().str.upper()
+        return pd.Series(default, index=index)
+
+    return pd.DataFrame({
+        'currency': text_column('currency', default=BASE_CURRENCY),
+        'rate_type': NO_RATE,
+        'category': text_column('commodity', 'category', 'type', default=''),
+        'amount': amount.fillna(0).astype(np.float64),
+    })
+
+
+def credit_frame(credits: List) -> pd.DataFrame:
+    """Credit obligations as debt rows: negative principal, fixed or variable rate"""
+    return pd.DataFrame({
+        'currency': [(credit.currency or BASE_CURRENCY).upper() for credit in credits],
+        'rate_type': [
+            FIXED_RATE if (credit.base_rate_indicator or '').upper() == 'FIXED' else VARIABLE_RATE
+            for credit in credits
+        ],
+        'category': 'DEBT',
+        'amount': np.array([-(credit.principal_amount or 0.0) for credit in credits], dtype=np.float64),
+    })
+
+
+def aggregate_exposures(frame: pd.DataFrame) -> ExposureSet:
+    """Exposures from one group-by over (currency, rate type, category)"""
+    if frame.empty:
+        return ExposureSet()
+
+    grouped = frame.groupby(['currency', 'rate_type', 'category'], sort=False)['amount'].sum()
+    groups = grouped.reset_index()
+
+    # Everything below works on the handful of group rows, not the uploaded rows
+    currency = groups.groupby('currency', sort=False)['amount'].sum()
+
+    rate_items = pd.Series(None, index=groups.index, dtype=object)
+    credits = groups['rate_type'] != NO_RATE
+    rate_items[credits & (groups['rate_type'] == VARIABLE_RATE)] = 'variable_rate_debt'
+    for keyword, item in RATE_SENSITIVE_KEYWORDS:
+        matches = ~credits & rate_items.isna() & groups['category'].str.contains(keyword, regex=False)
+        rate_items[matches] = item
+    rate_sensitive = groups['amount'].groupby(rate_items).sum()
+
+    commodities = groups[groups['category'].isin(COMMODITY_SYMBOLS)]
+    commodity = commodities.groupby('category', sort=False)['amount'].sum()
+
+    return ExposureSet(
+        currency={key: float(value) for key, value in currency.items() if value},
+        rate_sensitive={key: float(value) for key, value in rate_sensitive.items() if value},
+        commodity={key: float(value) for key, value in commodity.items() if value},
+    )
+
+
+class ExposureService:
+    """Exposure extraction for the risk analyses of a set of uploads"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def upload_version(self, upload_ids: List[int], user_id: int) -> tuple:
+        """Cheap validator of the uploads and the user's credit obligations"""
+        uploads = tuple(self.db.query(DataUpload.id, DataUpload.updated_at).filter(
+            DataUpload.id.in_(upload_ids), DataUpload.user_id == user_id
+        ).order_by(DataUpload.id).all())
+        credits = tuple(self._credits_query(upload_ids, user_id).with_entities(
+            func.count(CreditObligation.id), func.max(CreditObligation.updated_at)
+        ).one())
+        return uploads, credits
+
+    def _credits_query(self, upload_ids: List[int], user_id: int):
+        # Credits created from these uploads plus the user's credits not tied to any upload
+        return self.db.query(CreditObligation).filter(
+            CreditObligation.user_id == user_id,
+            or_(CreditObligation.upload_id.in_(upload_ids), CreditObligation.upload_id.is_(None))
+        )
+
+    def get_exposures(self, cash_flows: pd.DataFrame) -> ExposureSet:
+        """
+        Exposures of a cash flow frame
+
+        Frames loaded from uploads carry 'upload_ids' and 'user_id' in
+        DataFrame.attrs; their exposures include the user's credit
+        obligations and are cached per upload version. Other frames are
+        aggregated as-is.
+        """
+        upload_ids: Optional[List[int]] = cash_flows.attrs.get('upload_ids') if cash_flows is not None else None
+        user_id = cash_flows.attrs.get('user_id') if cash_flows is not None else None
+        if not upload_ids or self.db is None:
+            return aggregate_exposures(cash_flow_frame(cash_flows))
+
+        upload_ids = sorted(upload_ids)
+        key = (user_id, tuple(upload_ids), self.upload_version(upload_ids, user_id))
+        with _cache_lock:
+            exposures = _cache.get(key)
+            if exposures is not None:
+                _cache.move_to_end(key)
+                return exposures
+
+        frame = pd.concat(
+            [cash_flow_frame(cash_flows), credit_frame(self._credits_query(upload_ids, user_id).all())],
+            ignore_index=True,
+        )
+        exposures = aggregate_exposures(frame)
+        with _cache_lock:
+            _cache[key] = exposures
+            while len(_cache) > _CACHE_MAX_ENTRIES:
+                _cache.popitem(last=False)
+        return exposures
@@ -5,14 +5,27 @@ Handles fetching data from various external APIs for scenario analysis
 
 import requests
 import json
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 import logging
 from dataclasses import dataclass
 from enum import Enum
 
+from app.config import settings
+from app.core.circuit_breaker import get_circuit_breaker
+from app.core.ttl_cache import ttl_cached, make_key
+
 logger = logging.getLogger(__name__)
 
+moex_breaker = get_circuit_breaker(
+    "moex",
+    timeout=settings.moex_request_timeout,
+    failure_rate_threshold=settings.circuit_breaker_failure_rate,
+    window_size=settings.circuit_breaker_window,
+    minimum_calls=settings.circuit_breaker_min_calls,
+    open_seconds=settings.circuit_breaker_open_seconds,
+)
+
 
 class DataProvider(str, Enum):
     """Supported external data providers"""
@@ -54,6 +67,17 @@ class CommodityPrice:
 class ExternalDataService:
     """Service for fetching external market data"""
     
+    FX_SNAPSHOT_SOURCE = "moex_fx"
+    
+    # Валютные инструменты на MOEX
+    MOEX_CURRENCY_INSTRUMENTS = {
+        'USD000UTSTOM': 'USD',  # USD/RUB
+        'EUR_RUB__TOM': 'EUR',  # EUR/RUB
+        'CNYRUB_TOM': 'CNY',    # CNY/RUB
+        # INR/RUB не торгуется на MOEX, используем mock
+    }
+    MOEX_FX_MARKETDATA_URL = "https://iss.moex.com/iss/engines/currency/markets/selt/securities.json"
+    
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({
@@ -67,6 +91,9 @@ class ExternalDataService:
             'alpha_vantage': 'https://www.alphavantage.co/query',
             'commodities': 'https://api.metals.live/v1/spot',
         }
+        
+        # Last successful MOEX rates, served while MOEX is failing
+        self._last_good_currency_rates: Optional[List[CurrencyRate]] = None
     
     def get_currency_rates(self) -> List[CurrencyRate]:
         """
@@ -78,16 +105,133 @@ class ExternalDataService:
         logger.info("get_currency_rates() called")
         try:
             # Try to get real data from Moscow Exchange
-            rates = self._get_moex_currency_rates()
-            logger.info(f"Successfully fetched {len(rates)} currency rates from MOEX")
-            return rates
+            return self._fetch_currency_rates()
             
         except Exception as e:
             logger.error(f"Error fetching currency rates from MOEX: {str(e)}")
+            if self._last_good_currency_rates:
+                logger.info("Using last known good MOEX currency rates as fallback")
+                return list(self._last_good_currency_rates)
             # Fallback to mock data
             logger.info("Using mock currency rates as fallback")
             return self._get_mock_currency_rates()
     
+    # Only successful fetches are cached; fallbacks are chosen outside the cache
+    @ttl_cached("external_data.currency_rates", ttl=settings.external_data_cache_ttl,
+                stale_ttl=settings.external_data_cache_stale_ttl)
+    def _fetch_currency_rates(self) -> List[CurrencyRate]:
+        rates = self._get_moex_currency_rates()
+        logger.info(f"Successfully fetched {len(rates)} currency rates from MOEX")
+        self._last_good_currency_rates = rates
+        self._store_currency_quotes(rates)
+        return rates
+    
+    def refresh_currency_rates(self, db) -> List[CurrencyRate]:
+        """
+        Fetch currency rates from MOEX and store them as the latest snapshot
+
+        Args:
+            db: Database session
+
+        Returns:
+            List of freshly fetched CurrencyRate objects
+        """
+        from app.models.market_data_snapshot import MarketDataSnapshot
+
+        rates = self._get_moex_currency_rates()
+        MarketDataSnapshot.upsert(db, self.FX_SNAPSHOT_SOURCE, self.currency_rates_to_payload(rates))
+        self.record_currency_quotes(db, rates)
+        db.commit()
+        # Fresh rates also serve live callers until the next refresh
+        self._last_good_currency_rates = rates
+        ExternalDataService._fetch_currency_rates.cache.set(make_key((), {}), rates)
+        return list(rates)
+
+    def record_currency_quotes(self, db, rates: List[CurrencyRate]) -> int:
+        """
+        Add traded MOEX rates to the daily FX quote series (the caller commits)
+
+        Mock rates (INR/RUB) are not recorded so analytics only see real prices.
+        """
+        from app.models.market_quote import MarketQuote
+
+        traded = set(self.MOEX_CURRENCY_INSTRUMENTS.values())
+        quotes = [
+            (f"{rate.base_currency}/{rate.target_currency}", rate.rate, rate.timestamp)
+            for rate in rates if rate.base_currency in traded
+        ]
+        return MarketQuote.record(db, 'fx', quotes, source='moex')
+
+    def _store_currency_quotes(self, rates: List[CurrencyRate]) -> None:
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            self.record_currency_quotes(db, rates)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not store currency quotes: {str(e)}")
+        finally:
+            db.close()
+
+    def get_stored_currency_rates(self, db) -> List[CurrencyRate]:
+        """
+        Get currency rates stored by the background refresher
+
+        Falls back to a live fetch when nothing has been stored yet or the
+        stored rates are older than market_data_max_age, which means the
+        refresher has stopped; stale rates are still preferred to mock ones.
+        Rate timestamps are those of the fetch.
+
+        Args:
+            db: Database session
+
+        Returns:
+            List of CurrencyRate objects
+        """
+        from app.models.market_data_snapshot import MarketDataSnapshot
+
+        snapshot = MarketDataSnapshot.get(db, self.FX_SNAPSHOT_SOURCE)
+        if snapshot and snapshot.payload:
+            if snapshot.is_fresh(settings.market_data_max_age):
+                return self.currency_rates_from_payload(snapshot.payload)
+            logger.warning(f"Stored currency rates are {snapshot.age_seconds():.0f}s old, fetching live")
+            try:
+                return self._fetch_currency_rates()
+            except Exception as e:
+                logger.error(f"Error fetching currency rates from MOEX: {str(e)}")
+                return self.currency_rates_from_payload(snapshot.payload)
+
+        logger.info("No stored currency rates, fetching live")
+        return self.get_currency_rates()
+
+    @staticmethod
+    def currency_rates_to_payload(rates: List[CurrencyRate]) -> List[Dict[str, Any]]:
+        """Serialize currency rates for snapshot storage"""
+        return [
+            {
+                'base_currency': rate.base_currency,
+                'target_currency': rate.target_currency,
+                'rate': rate.rate,
+                'timestamp': rate.timestamp.isoformat()
+            }
+            for rate in rates
+        ]
+
+    @staticmethod
+    def currency_rates_from_payload(payload: List[Dict[str, Any]]) -> List[CurrencyRate]:
+        """Deserialize currency rates from snapshot storage"""
+        return [
+            CurrencyRate(
+                base_currency=item['base_currency'],
+                target_currency=item['target_currency'],
+                rate=item['rate'],
+                timestamp=datetime.fromisoformat(item['timestamp'])
+            )
+            for item in payload
+        ]
+
     def get_interest_rates(self, country: str = 'US') -> Dict[str, float]:
         """
         Get interest rates for a country
@@ -99,14 +243,19 @@ class ExternalDataService:
             Dictionary with interest rate types and values
         """
         try:
-            # This would typically use Federal Reserve API or similar
-            # For now, return mock data
-            return self._get_mock_interest_rates(country)
+            return self._fetch_interest_rates(country)
             
         except Exception as e:
             logger.error(f"Error fetching interest rates: {str(e)}")
             return self._get_mock_interest_rates(country)
     
+    @ttl_cached("external_data.interest_rates", ttl=settings.external_data_cache_ttl,
+                stale_ttl=settings.external_data_cache_stale_ttl)
+    def _fetch_interest_rates(self, country: str) -> Dict[str, float]:
+        # This would typically use Federal Reserve API or similar
+        # For now, return mock data
+        return self._get_mock_interest_rates(country)
+    
     def get_commodity_prices(self, commodities: List[str] = None) -> List[CommodityPrice]:
         """
         Get commodity prices
@@ -121,14 +270,19 @@ class ExternalDataService:
             commodities = ['GOLD', 'SILVER', 'COPPER', 'OIL', 'WHEAT']
         
         try:
-            # This would typically use a commodities API
-            # For now, return mock data
-            return self._get_mock_commodity_prices(commodities)
+            return self._fetch_commodity_prices(tuple(commodities))
             
         except Exception as e:
             logger.error(f"Error fetching commodity prices: {str(e)}")
             return self._get_mock_commodity_prices(commodities)
     
+    @ttl_cached("external_data.commodity_prices", ttl=settings.external_data_cache_ttl,
+                stale_ttl=settings.external_data_cache_stale_ttl)
+    def _fetch_commodity_prices(self, commodities: Tuple[str, ...]) -> List[CommodityPrice]:
+        # This would typically use a commodities API
+        # For now, return mock data
+        return self._get_mock_commodity_prices(list(commodities))
+    
     def get_market_indices(self, indices: List[str] = None) -> List[MarketData]:
         """
         Get market index data
@@ -148,9 +302,7 @@ class ExternalDataService:
             
             for index in indices:
                 try:
-                    # This would typically use Yahoo Finance API
-                    # For now, return mock data
-                    data = self._get_mock_market_data(index)
+                    data = self._fetch_market_index(index)
                     market_data.append(MarketData(
                         symbol=index,
                         value=data['price'],
@@ -169,7 +321,14 @@ class ExternalDataService:
             logger.error(f"Error fetching market indices: {str(e)}")
             return []
     
-    def get_volatility_data(self, symbol: str, period: str = '1y') -> Dict[str, float]:
+    @ttl_cached("external_data.market_indices", ttl=settings.external_data_cache_ttl,
+                stale_ttl=settings.external_data_cache_stale_ttl)
+    def _fetch_market_index(self, index: str) -> Dict[str, Any]:
+        # This would typically use Yahoo Finance API
+        # For now, return mock data
+        return self._get_mock_market_data(index)
+    
+    def get_volatility_data(self, symbol: str, period: str = '1y') -> Dict[str, Optional[float]]:
         """
         Get volatility data for a financial instrument
         
@@ -178,17 +337,33 @@ class ExternalDataService:
             period: Time period for volatility calculation
             
         Returns:
-            Dictionary with volatility metrics
+            Dictionary with volatility metrics; computed from the stored quote
+            series (e.g. 'USD/RUB') when enough history exists, mock otherwise.
+            Quotes give no implied volatility or beta, those keys are None then
         """
         try:
-            # This would calculate actual volatility from historical data
-            # For now, return mock data
+            stats = self._fetch_volatility_data(symbol, period)
+            if stats:
+                return {'implied_volatility': None, 'beta': None, **stats}
             return self._get_mock_volatility_data(symbol, period)
             
         except Exception as e:
             logger.error(f"Error fetching volatility data: {str(e)}")
             return self._get_mock_volatility_data(symbol, period)
     
+    @ttl_cached("external_data.volatility_data", ttl=settings.external_data_cache_ttl,
+                stale_ttl=settings.external_data_cache_stale_ttl)
+    def _fetch_volatility_data(self, symbol: str, period: str) -> Optional[Dict[str, float]]:
+        """Volatility from the stored quote series, None without enough history"""
+        from app.database import SessionLocal
+        from app.services.market_analytics import MarketAnalytics
+
+        db = SessionLocal()
+        try:
+            return MarketAnalytics(db).volatility(symbol, period)
+        finally:
+            db.close()
+    
     def get_economic_indicators(self, country: str = 'US') -> Dict[str, Any]:
         """
         Get economic indicators for scenario analysis
@@ -200,14 +375,19 @@ class ExternalDataService:
             Dictionary with economic indicators
         """
         try:
-            # This would typically use FRED API or similar
-            # For now, return mock data
-            return self._get_mock_economic_indicators(country)
+            return self._fetch_economic_indicators(country)
             
         except Exception as e:
             logger.error(f"Error fetching economic indicators: {str(e)}")
             return self._get_mock_economic_indicators(country)
     
+    @ttl_cached("external_data.economic_indicators", ttl=settings.external_data_cache_ttl,
+                stale_ttl=settings.external_data_cache_stale_ttl)
+    def _fetch_economic_indicators(self, country: str) -> Dict[str, Any]:
+        # This would typically use FRED API or similar
+        # For now, return mock data
+        return self._get_mock_economic_indicators(country)
+    
     # Mock data methods for development
     def _get_mock_currency_rates(self) -> List[CurrencyRate]:
         """Mock currency rates for development"""
@@ -233,41 +413,46 @@ class ExternalDataService:
         return rates
     
     def _get_moex_currency_rates(self) -> List[CurrencyRate]:
-        """Get real currency rates from Moscow Exchange"""
-        # Валютные инструменты на MOEX
-        moex_instruments = {
-            'USD000UTSTOM': 'USD',  # USD/RUB
-            'EUR_RUB__TOM': 'EUR',  # EUR/RUB
-            'CNYRUB_TOM': 'CNY',    # CNY/RUB
-            # INR/RUB не торгуется на MOEX, используем mock
-        }
+        """Get real currency rates from Moscow Exchange in a single ISS request"""
+        timestamp = datetime.now()
+        
+        timeout = moex_breaker.effective_timeout(10)
+        
+        def fetch():
+            # Один запрос на все инструменты, только блок marketdata
+            response = self.session.get(
+                self.MOEX_FX_MARKETDATA_URL,
+                params={
+                    'securities': ','.join(self.MOEX_CURRENCY_INSTRUMENTS),
+                    'iss.meta': 'off',
+                    'iss.only': 'marketdata',
+                    'marketdata.columns': 'SECID,BOARDID,MARKETPRICE,LAST,WAPRICE',
+                },
+                timeout=timeout
+            )
+            response.raise_for_status()
+            return response.json()
+        
+        # Fails fast while MOEX is known to be down
+        prices = self._parse_moex_marketdata(moex_breaker.call(fetch))
         
         rates = []
-        timestamp = datetime.now()
+        for instrument, currency in self.MOEX_CURRENCY_INSTRUMENTS.items():
+            rate_value = prices.get(instrument)
+            if rate_value:
+                rates.append(CurrencyRate(
+                    base_currency=currency,
+                    target_currency='RUB',
+                    rate=rate_value,
+                    timestamp=timestamp
+                ))
+                logger.info(f"MOEX: {currency}/RUB = {rate_value}")
+            else:
+                logger.warning(f"No MOEX price for {instrument}")
         
-        for instrument, currency in moex_instruments.items():
-            try:
-                # Получаем данные по инструменту
-                url = f"https://iss.moex.com/iss/engines/currency/markets/selt/securities/{instrument}.json"
-                response = self.session.get(url, timeout=10)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                # Извлекаем курс из данных
-                rate_value = self._extract_rate_from_moex_data(data, currency)
-                if rate_value:
-                    rates.append(CurrencyRate(
-                        base_currency=currency,
-                        target_currency='RUB',
-                        rate=rate_value,
-                        timestamp=timestamp
-                    ))
-                    logger.info(f"MOEX: {currency}/RUB = {rate_value}")
-                    
-            except Exception as e:
-                logger.warning(f"Error fetching {instrument}: {str(e)}")
-                continue
+        # An answer without prices is a failure, not a set of rates to cache
+        if not rates:
+            raise RuntimeError("MOEX returned no currency rates")
         
         # Добавляем INR/RUB из mock данных (не торгуется на MOEX)
         rates.append(CurrencyRate(
@@ -280,58 +465,40 @@ class ExternalDataService:
         logger.info(f"Retrieved {len(rates)} currency rates from MOEX")
         return rates
     
-    def _extract_rate_from_moex_data(self, data: dict, currency: str) -> Optional[float]:
-        """Extract exchange rate from MOEX API response"""
-        try:
-            # Проверяем структуру данных
-            if 'marketdata' not in data or 'data' not in data['marketdata']:
-                return None
-                
-            marketdata_data = data['marketdata']['data']
-            marketdata_columns = data['marketdata']['columns']
-            
-            # Создаем индекс колонок для удобства
-            col_index = {col: i for i, col in enumerate(marketdata_columns)}
-            
-            # Ищем курс с площадки CETS (основная площадка)
-            for row in marketdata_data:
-                if len(row) > col_index.get('BOARDID', 0):
-                    board_id = row[col_index['BOARDID']]
-                    
-                    # Приоритет: CETS площадка
-                    if board_id == 'CETS':
-                        # Проверяем MARKETPRICE (рыночная цена)
-                        if 'MARKETPRICE' in col_index:
-                            market_price = row[col_index['MARKETPRICE']]
-                            if market_price and isinstance(market_price, (int, float)) and market_price > 0:
-                                return float(market_price)
-                        
-                        # Если нет MARKETPRICE, проверяем LAST (последняя цена)
-                        if 'LAST' in col_index:
-                            last_price = row[col_index['LAST']]
-                            if last_price and isinstance(last_price, (int, float)) and last_price > 0:
-                                return float(last_price)
-                        
-                        # Если нет LAST, проверяем WAPRICE (взвешенная средняя цена)
-                        if 'WAPRICE' in col_index:
-                            waprice = row[col_index['WAPRICE']]
-                            if waprice and isinstance(waprice, (int, float)) and waprice > 0:
-                                return float(waprice)
-            
-            # Если не нашли CETS, ищем любую другую площадку
-            for row in marketdata_data:
-                if len(row) > col_index.get('BOARDID', 0):
-                    for price_col in ['MARKETPRICE', 'LAST', 'WAPRICE']:
-                        if price_col in col_index:
-                            price_value = row[col_index[price_col]]
-                            if price_value and isinstance(price_value, (int, float)) and price_value > 0:
-                                return float(price_value)
-                                
-            return None
+    @staticmethod
+    def _parse_moex_marketdata(data: dict) -> Dict[str, float]:
+        """
+        Extract one price per security from the columnar ISS marketdata block
+        
+        The CETS board (main trading mode) wins over other boards; within a
+        board MARKETPRICE is preferred, then LAST, then WAPRICE.
+        """
+        marketdata = data.get('marketdata') or {}
+        columns = marketdata.get('columns') or []
+        if 'SECID' not in columns:
+            return {}
+        
+        col_index = {col: i for i, col in enumerate(columns)}
+        price_columns = [col_index[col] for col in ('MARKETPRICE', 'LAST', 'WAPRICE') if col in col_index]
+        board_column = col_index.get('BOARDID')
+        
+        prices: Dict[str, float] = {}
+        from_cets = set()
+        for row in marketdata.get('data') or []:
+            secid = row[col_index['SECID']]
+            is_cets = board_column is not None and row[board_column] == 'CETS'
+            if secid in from_cets or (secid in prices and not is_cets):
+                continue
             
-        except Exception as e:
-            logger.error(f"Error extracting rate for {currency}: {str(e)}")
-            return None
+            for i in price_columns:
+                value = row[i]
+                if value and isinstance(value, (int, float)) and value > 0:
+                    prices[secid] = float(value)
+                    if is_cets:
+                        from_cets.add(secid)
+                    break
+        
+        return prices
     
     def _get_mock_interest_rates(self, country: str) -> Dict[str, float]:
         """Mock interest rates for development"""
@@ -0,0 +1,194 @@
+"""
+Market analytics over stored quote series
+Rolling volatility, EWMA covariance and correlation computed with NumPy over
+the market_quotes table, cached per (window, asset set, data version)
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.models.market_quote import MarketQuote
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+PERIOD_DAYS = {'1m': 31, '3m': 92, '6m': 183, '1y': 365, '2y': 730, '5y': 1826}
+EWMA_LAMBDA = 0.94  # RiskMetrics daily decay
+
+_cache_lock = threading.Lock()
+_cache: "OrderedDict[Hashable, Any]" = OrderedDict()
+_CACHE_MAX_ENTRIES = 128
+
+
+def log_returns(prices: np.ndarray) -> np.ndarray:
+    """Daily log returns of a (days x assets) price matrix"""
+    return np.diff(np.log(np.asarray(prices, dtype=np.float64)), axis=0)
+
+
+def rolling_volatility(returns: np.ndarray, window: int, annualize: bool = True) -> np.ndarray:
+    """
+    Rolling sample standard deviation of returns via prefix sums
+
+    Args:
+        returns: (days,) or (days x assets) returns
+        window: Window length in days
+
+    Returns:
+        (days - window + 1) x assets volatilities
+    """
+    r = np.asarray(returns, dtype=np.float64)
+    if r.ndim == 1:
+        r = r[:, None]
+    zeros = np.zeros((1, r.shape[1]))
+    s1 = np.vstack([zeros, np.cumsum(r, axis=0)])
+    s2 = np.vstack([zeros, np.cumsum(r * r, axis=0)])
+    window_sum = s1[window:] - s1[:-window]
+    window_sq_sum = s2[window:] - s2[:-window]
+    variance = np.maximum((window_sq_sum - window_sum ** 2 / window) / (window - 1), 0.0)
+    volatility = np.sqrt(variance)
+    return volatility * np.sqrt(TRADING_DAYS) if annualize else volatility
+
+
+def ewma_covariance(returns: np.ndarray, lam: float = EWMA_LAMBDA) -> np.ndarray:
+    """Exponentially weighted (zero-mean) covariance of a (days x assets) return matrix"""
+    r = np.asarray(returns, dtype=np.float64)
+    weights = (1 - lam) * lam ** np.arange(len(r) - 1, -1, -1)
+    weights /= weights.sum()
+    return (r * weights[:, None]).T @ r
+
+
+def correlation_from_covariance(covariance: np.ndarray) -> np.ndarray:
+    """Correlation matrix from a covariance matrix; flat series get zero correlation"""
+    std = np.sqrt(np.diag(covariance))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = covariance / np.outer(std, std)
+    correlation = np.nan_to_num(correlation, nan=0.0, posinf=0.0, neginf=0.0)
+    np.fill_diagonal(correlation, 1.0)
+    return correlation
+
+
+class MarketAnalytics:
+    """Volatility and correlation analytics over the stored market quote series"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def load_prices(self, symbols: Iterable[str], period: str = '1y') -> pd.DataFrame:
+        """
+        Daily price matrix (dates x symbols) for the period
+
+        Gaps are forward-filled; leading days before every symbol has a
+        value are dropped.
+        """
+        symbols = sorted(set(symbols))
+        days = PERIOD_DAYS.get(period, 365)
+        rows = self.db.query(MarketQuote.quote_date, MarketQuote.symbol, MarketQuote.value).filter(
+            MarketQuote.symbol.in_(symbols),
+            MarketQuote.quote_date >= pd.Timestamp.now().normalize().date() - pd.Timedelta(days=days)
+        ).all()
+        if not rows:
+            return pd.DataFrame(columns=symbols)
+
+        frame = pd.DataFrame(rows, columns=['quote_date', 'symbol', 'value'])
+        prices = frame.pivot(index='quote_date', columns='symbol', values='value').sort_index()
+        return prices.ffill().dropna()
+
+    def _cached(self, key: Hashable, symbols: Iterable[str], compute):
+        version = MarketQuote.get_series_version(self.db, symbols)
+        full_key = (key, version)
+        with _cache_lock:
+            if full_key in _cache:
+                _cache.move_to_end(full_key)
+                return _cache[full_key]
+
+        result = compute()
+        with _cache_lock:
+            _cache[full_key] = result
+            while len(_cache) > _CACHE_MAX_ENTRIES:
+                _cache.popitem(last=False)
+        return result
+
+    def volatility(self, symbol: str, period: str = '1y', window: int = 21) -> Optional[Dict[str, float]]:
+        """
+        Volatility statistics of one symbol
+
+        Returns:
+            Annualized historical, EWMA and latest rolling volatility plus the
+            percentile of the latest rolling value, or None if fewer than
+            window + 1 returns are stored
+        """
+        def compute():
+            prices = self.load_prices([symbol], period)
+            if symbol not in prices.columns or len(prices) < window + 2:
+                return None
+            returns = log_returns(prices[symbol].to_numpy())
+            rolling = rolling_volatility(returns, window)[:, 0]
+            latest = rolling[-1]
+            return {
+                'historical_volatility': float(returns.std(ddof=1) * np.sqrt(TRADING_DAYS)),
+                'ewma_volatility': float(np.sqrt(ewma_covariance(returns[:, None])[0, 0] * TRADING_DAYS)),
+                'rolling_volatility': float(latest),
+                'volatility_percentile': float((rolling <= latest).mean()),
+                'observations': float(len(returns)),
+            }
+
+        return self._cached(('volatility', symbol, period, window), [symbol], compute)
+
+    def correlation_matrix(self, symbols: Iterable[str], period: str = '1y',
+                           lam: float = EWMA_LAMBDA, min_observations: int = 10) -> Optional[Dict[str, Any]]:
+        """
+        EWMA covariance and correlation of the symbols' daily log returns
+
+        Symbols without stored data are left out.
+
+        Returns:
+            Dict with 'symbols', 'covariance', 'correlation' (NumPy arrays) and
+            'observations', or None if fewer than two symbols have enough data
+        """
+        symbols = sorted(set(symbols))
+
+        def compute():
+            prices = self.load_prices(symbols, period)
+            if prices.shape[1] < 2 or len(prices) < min_observations + 1:
+                return None
+            returns = log_returns(prices.to_numpy())
+            covariance = ewma_covariance(returns, lam)
+            return {
+                'symbols': list(prices.columns),
+                'covariance': covariance,
+                'correlation': correlation_from_covariance(covariance),
+                'observations': len(returns),
+            }
+
+        return self._cached(('correlation', tuple(symbols), period, lam), symbols, compute)
+
+    def average_correlation(self, symbols: Iterable[str], period: str = '1y') -> Optional[float]:
+        """Mean absolute pairwise correlation, None if it cannot be computed"""
+        result = self.correlation_matrix(symbols, period)
+        if result is None:
+            return None
+        correlation = result['correlation']
+        off_diagonal = correlation[~np.eye(len(correlation), dtype=bool)]
+        return float(np.abs(off_diagonal).mean())
+
+
+def currency_symbol(base_currency: str, target_currency: str) -> str:
+    """Quote symbol of a currency pair"""
+    return f"{base_currency}/{target_currency}"
+
+
+def factor_symbols(external_factors: Dict[str, Any]) -> List[str]:
+    """Quote symbols of the FX, commodity and index factors in an external factors dict"""
+    symbols = [
+        currency_symbol(rate.base_currency, rate.target_currency)
+        for rate in external_factors.get('currency_rates', [])
+    ]
+    symbols += [price.commodity for price in external_factors.get('commodity_prices', [])]
+    symbols += [index.symbol for index in external_factors.get('market_indices', [])]
+    return symbols
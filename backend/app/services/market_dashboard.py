@@ -0,0 +1,229 @@
+"""
+Market dashboard aggregator
+Fans out to all market data sources concurrently with per-source timeouts and
+keeps a pre-serialized dashboard snapshot that is refreshed in the background.
+Snapshots are shared between workers through the market_data_snapshots table.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.market_data_snapshot import MarketDataSnapshot
+from app.services.external_data_service import external_data_service
+
+logger = logging.getLogger(__name__)
+
+
+def _stored_currency_rates():
+    # Own session: a timed-out source may still be running after the request returns
+    db = SessionLocal()
+    try:
+        return external_data_service.get_stored_currency_rates(db)
+    finally:
+        db.close()
+
+
+DASHBOARD_SOURCES: Dict[str, Callable[[], Any]] = {
+    "currency_rates": _stored_currency_rates,
+    "interest_rates": external_data_service.get_interest_rates,
+    "commodity_prices": external_data_service.get_commodity_prices,
+    "market_indices": external_data_service.get_market_indices,
+    "economic_indicators": external_data_service.get_economic_indicators,
+}
+
+
+async def collect_dashboard_sources(
+    sources: Optional[Dict[str, Callable[[], Any]]] = None,
+    timeout: Optional[float] = None,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Run all sources concurrently in worker threads
+
+    Returns:
+        (results by source name, error message by source name) - a source that
+        fails or exceeds the timeout is reported in errors and left out of results
+    """
+    sources = sources if sources is not None else DASHBOARD_SOURCES
+    timeout = timeout if timeout is not None else settings.dashboard_source_timeout
+
+    names = list(sources)
+    outcomes = await asyncio.gather(
+        *(asyncio.wait_for(asyncio.to_thread(sources[name]), timeout) for name in names),
+        return_exceptions=True,
+    )
+
+    results, errors = {}, {}
+    for name, outcome in zip(names, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            errors[name] = f"timed out after {timeout}s"
+        elif isinstance(outcome, Exception):
+            errors[name] = str(outcome)
+        else:
+            results[name] = outcome
+    for name, error in errors.items():
+        logger.warning(f"Dashboard source '{name}' unavailable: {error}")
+    return results, errors
+
+
+def format_dashboard(results: Dict[str, Any], errors: Dict[str, str]) -> Dict[str, Any]:
+    """Shape source results into the dashboard payload"""
+    currency_rates = results.get("currency_rates", [])
+    commodity_prices = results.get("commodity_prices", [])
+    market_indices = results.get("market_indices", [])
+
+    return {
+        "currency_rates": [
+            {
+                "base_currency": rate.base_currency,
+                "target_currency": rate.target_currency,
+                "rate": rate.rate,
+                "timestamp": rate.timestamp.isoformat()
+            }
+            for rate in currency_rates[:5]  # Top 5 currencies
+        ],
+        "interest_rates": results.get("interest_rates", {}),
+        "commodity_prices": [
+            {
+                "commodity": price.commodity,
+                "price": price.price,
+                "currency": price.currency,
+                "timestamp": price.timestamp.isoformat()
+            }
+            for price in commodity_prices[:5]  # Top 5 commodities
+        ],
+        "market_indices": [
+            {
+                "symbol": data.symbol,
+                "value": data.value,
+                "timestamp": data.timestamp.isoformat(),
+                "metadata": data.metadata
+            }
+            for data in market_indices[:5]  # Top 5 indices
+        ],
+        "economic_indicators": results.get("economic_indicators", {}),
+        "last_updated": market_indices[0].timestamp.isoformat() if market_indices else None,
+        "partial": bool(errors),
+        "errors": errors,
+    }
+
+
+class DashboardSnapshot:
+    """
+    Serialized dashboard payload shared by all requests of a worker
+
+    Fresh snapshots are served as-is. Stale snapshots are served while a
+    background task rebuilds them; partial snapshots count as stale right away.
+    Only a worker without any snapshot makes the request wait for a build.
+
+    With a session_factory, built snapshots are stored for the other workers,
+    and a worker adopts a fresh complete stored snapshot instead of building
+    its own.
+    """
+
+    SOURCE = "dashboard"
+
+    def __init__(
+        self,
+        ttl: float,
+        sources: Optional[Dict[str, Callable[[], Any]]] = None,
+        session_factory: Optional[Callable[[], Session]] = None,
+    ):
+        self.ttl = ttl
+        self.sources = sources
+        self.session_factory = session_factory
+        self._body: Optional[bytes] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._pending: Optional[asyncio.Task] = None
+
+    @property
+    def body(self) -> Optional[bytes]:
+        return self._body
+
+    async def refresh(self) -> bytes:
+        """Rebuild the snapshot from all sources"""
+        results, errors = await collect_dashboard_sources(self.sources)
+        payload = jsonable_encoder(format_dashboard(results, errors))
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._body = body
+            self._expires_at = time.monotonic() + (0 if errors else self.ttl)
+        if self.session_factory is not None:
+            await asyncio.to_thread(self._store, payload)
+        return body
+
+    def _store(self, payload: Dict[str, Any]) -> None:
+        db = self.session_factory()
+        try:
+            MarketDataSnapshot.upsert(db, self.SOURCE, payload)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not store dashboard snapshot: {str(e)}")
+        finally:
+            db.close()
+
+    def _load_stored(self) -> Optional[bytes]:
+        """Adopt the stored snapshot if it is complete and fresh, returns its body"""
+        db = self.session_factory()
+        try:
+            stored = MarketDataSnapshot.get(db, self.SOURCE)
+            if stored is None or stored.payload.get("partial"):
+                return None
+            remaining = self.ttl - stored.age_seconds()
+            if remaining <= 0:
+                return None
+            body = json.dumps(stored.payload, ensure_ascii=False).encode("utf-8")
+        except Exception as e:
+            logger.warning(f"Could not read stored dashboard snapshot: {str(e)}")
+            return None
+        finally:
+            db.close()
+
+        with self._lock:
+            self._body = body
+            self._expires_at = time.monotonic() + remaining
+        return body
+
+    async def _update(self) -> bytes:
+        if self.session_factory is not None:
+            body = await asyncio.to_thread(self._load_stored)
+            if body is not None:
+                return body
+        return await self.refresh()
+
+    def _start_refresh(self) -> asyncio.Task:
+        # Single-flight per event loop: concurrent callers share one rebuild
+        if self._pending is None or self._pending.done() or self._pending.get_loop() is not asyncio.get_running_loop():
+            self._pending = asyncio.create_task(self._update())
+            self._pending.add_done_callback(self._log_refresh_failure)
+        return self._pending
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Dashboard snapshot refresh failed: {str(task.exception())}")
+
+    async def get_body(self) -> bytes:
+        """Serialized dashboard, building it only if no worker has a fresh one"""
+        with self._lock:
+            body, expires_at = self._body, self._expires_at
+
+        if body is None:
+            return await asyncio.shield(self._start_refresh())
+        if time.monotonic() >= expires_at:
+            self._start_refresh()
+        return body
+
+
+# Singleton instance
+dashboard_snapshot = DashboardSnapshot(ttl=settings.dashboard_snapshot_ttl, session_factory=SessionLocal)
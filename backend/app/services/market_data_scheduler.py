@@ -0,0 +1,235 @@
+"""
+Background market data refresher
+Periodically pulls CBR key rate, RUONIA and MOEX FX rates into the database so
+request handlers read stored values instead of waiting on upstream services,
+then publishes the shared rate-curve file. The leader also expires upload
+previews nobody confirmed.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Non-POSIX platforms: every worker acts as leader
+    fcntl = None
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+RefreshJob = Tuple[str, Callable[[Session], Any]]
+
+
+class LeaderLock:
+    """
+    Non-blocking inter-process file lock
+
+    Exactly one process on the host holds the lock; the operating system
+    releases it when the holder exits, so another worker takes over on its
+    next attempt.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def is_held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        """Try to become leader, returns True if this process holds the lock"""
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            self._fd = -1
+            return True
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        """Give up leadership"""
+        if self._fd is None:
+            return
+        if self._fd >= 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        self._fd = None
+
+
+def refresh_key_rate(db: Session) -> int:
+    """Refresh recent CBR key rates"""
+    from app.services.cbr_service import CBRService
+    return CBRService(db).update_key_rates(days_back=settings.market_data_key_rate_days_back)
+
+
+def refresh_ruonia(db: Session) -> float:
+    """Refresh recent values of the daily RUONIA series"""
+    from app.services.cbr_service import CBRService
+    rate = CBRService(db).refresh_ruonia()
+    if rate is None:
+        raise RuntimeError("RUONIA rate is not available from CBR")
+    return rate
+
+
+def refresh_currency_rates(db: Session) -> int:
+    """Refresh MOEX currency rates"""
+    from app.services.external_data_service import external_data_service
+    return len(external_data_service.refresh_currency_rates(db))
+
+
+def refresh_dashboard_snapshot(db: Session) -> int:
+    """Rebuild the dashboard from the refreshed data and store it for all workers"""
+    from app.services.market_dashboard import dashboard_snapshot
+    asyncio.run(dashboard_snapshot.refresh())
+    return len(dashboard_snapshot.body)
+
+
+def publish_curve_store(db: Session) -> int:
+    """Rewrite the shared curve file from the refreshed tables"""
+    from app.services.curve_store import publish_curves
+    return publish_curves(db)
+
+
+def expire_upload_previews(db: Session) -> int:
+    """Fail upload previews left unconfirmed and remove their spooled files"""
+    from app.services.upload_jobs import expire_previews
+    return expire_previews(db, timedelta(hours=settings.upload_preview_max_age_hours))
+
+
+DEFAULT_JOBS: List[RefreshJob] = [
+    ("key_rate", refresh_key_rate),
+    ("ruonia", refresh_ruonia),
+    ("moex_fx", refresh_currency_rates),
+    ("dashboard", refresh_dashboard_snapshot),
+    # Runs last so the file reflects this run's refreshes
+    ("curve_store", publish_curve_store),
+    ("upload_previews", expire_upload_previews),
+]
+
+
+class MarketDataScheduler:
+    """In-process async scheduler for market data refresh jobs"""
+
+    def __init__(
+        self,
+        interval: float,
+        jitter: float = 0.1,
+        lock_path: Optional[str] = None,
+        jobs: Optional[List[RefreshJob]] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.interval = interval
+        self.jitter = jitter
+        self.jobs = jobs if jobs is not None else list(DEFAULT_JOBS)
+        self.session_factory = session_factory
+        self.leader_lock = LeaderLock(
+            lock_path or os.path.join(tempfile.gettempdir(), "cfo_cto_helper_market_data.lock")
+        )
+        self.last_results: Dict[str, Dict[str, Any]] = {}
+        self._run_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Start the refresh loop on the running event loop"""
+        if self.is_running:
+            return
+        self._task = asyncio.create_task(self._loop(), name="market-data-refresher")
+        logger.info(f"Market data refresher started (interval={self.interval}s, jitter={self.jitter:.0%})")
+
+    async def stop(self) -> None:
+        """Stop the refresh loop and give up leadership"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.leader_lock.release()
+        logger.info("Market data refresher stopped")
+
+    async def run_once(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Run all refresh jobs once
+
+        Single-flight: if a run is already in progress the call returns None
+        immediately instead of starting an overlapping run.
+        """
+        if self._run_lock.locked():
+            logger.info("Market data refresh already in progress, skipping")
+            return None
+
+        async with self._run_lock:
+            results = {}
+            for name, job in self.jobs:
+                results[name] = await asyncio.to_thread(self._run_job, name, job)
+            self.last_results.update(results)
+            return results
+
+    def _run_job(self, name: str, job: Callable[[Session], Any]) -> Dict[str, Any]:
+        """Run one job in a worker thread with its own session"""
+        started = datetime.now()
+        db = self.session_factory()
+        try:
+            outcome = {"status": "ok", "result": job(db)}
+            logger.info(f"Market data refresh '{name}' succeeded: {outcome['result']}")
+        except Exception as e:
+            db.rollback()
+            outcome = {"status": "error", "error": str(e)}
+            logger.error(f"Market data refresh '{name}' failed: {str(e)}")
+        finally:
+            db.close()
+
+        finished = datetime.now()
+        outcome["finished_at"] = finished.isoformat()
+        outcome["duration_ms"] = round((finished - started).total_seconds() * 1000, 2)
+        return outcome
+
+    def next_delay(self) -> float:
+        """Refresh interval with random jitter so workers and hosts do not align"""
+        return max(0.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    async def _loop(self) -> None:
+        # Spread the first run as well so restarts do not hit upstream in lockstep
+        await asyncio.sleep(random.uniform(0, self.interval * self.jitter))
+        while True:
+            try:
+                if self.leader_lock.acquire():
+                    await self.run_once()
+                else:
+                    logger.debug("Another worker holds the market data refresh lock")
+            except Exception as e:
+                logger.error(f"Market data refresh loop error: {str(e)}")
+            await asyncio.sleep(self.next_delay())
+
+
+# Singleton instance
+market_data_scheduler = MarketDataScheduler(
+    interval=settings.market_data_refresh_interval,
+    jitter=settings.market_data_refresh_jitter,
+    lock_path=settings.market_data_lock_file,
+)
@@ -6,9 +6,10 @@ import pandas as pd
 from typing import List, Dict, Optional, Union
 from datetime import datetime, date
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func
 
 from app.models.rate_scenario import RateScenario, RateForecast, ScenarioType, DataType
+from app.services.excel_reader import excel_reader
 from app.schemas.rate_scenario import (
     RateScenarioCreate, RateForecastCreate, 
     ScenarioUploadResponse, RateScenarioResponse
@@ -39,7 +40,7 @@ class RateScenarioService:
         """
         try:
             # Read Excel file without headers first
-            df = pd.read_excel(file_path, engine='openpyxl', header=None)
+            df = excel_reader.read(file_path, header=None)
             
             logger.info(f"Excel shape: {df.shape}")
             logger.info(f"Excel columns: {df.columns.tolist()}")
@@ -342,6 +343,14 @@ class RateScenarioService:
             
         return query.order_by(RateForecast.forecast_date).all()
     
+    def get_forecasts_version(self, scenario_id: int) -> tuple:
+        """Validator for a scenario's forecasts: (row count, max id, max created_at)"""
+        return tuple(self.db.query(
+            func.count(RateForecast.id),
+            func.max(RateForecast.id),
+            func.max(RateForecast.created_at)
+        ).filter(RateForecast.scenario_id == scenario_id).one())
+    
     def delete_scenario(self, scenario_id: int) -> bool:
         """Delete a scenario and all its forecasts"""
         try:
@@ -0,0 +1,96 @@
+"""
+RUONIA compounding index
+Prefix-product of daily accrual factors so that the compounded-in-arrears
+rate of any period is a ratio of two index values
+"""
+
+from datetime import date, datetime
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+DateLike = Union[date, datetime, np.datetime64]
+
+
+def _to_day(value: DateLike) -> np.datetime64:
+    """Normalize a date-like value to numpy day resolution"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, 'D')
+
+
+class RuoniaCompoundingIndex:
+    """
+    Compounding index over a daily RUONIA series
+
+    Each published rate r_i accrues simple interest until the next publication,
+    giving the standard factor (1 + r_i * d_i / 365). The index is the running
+    product of these factors, evaluated for every calendar day, so
+
+        compounded_rate(start, end) = (I[end] / I[start] - 1) * 365 / days
+
+    is O(1) for any period. Days after the last publication accrue at the last
+    known rate.
+    """
+
+    def __init__(self, dates: Sequence[DateLike], rates: Sequence[float], day_count_basis: int = 365):
+        if len(dates) == 0:
+            raise ValueError("RUONIA series is empty")
+
+        pub_days = np.array([_to_day(d) for d in dates], dtype='datetime64[D]')
+        pub_rates = np.asarray(rates, dtype=np.float64)
+        order = np.argsort(pub_days, kind='stable')
+        pub_days = pub_days[order]
+        pub_rates = pub_rates[order]
+
+        self.basis = day_count_basis
+        self.first_day = pub_days[0]
+        self.last_day = pub_days[-1]
+        self.last_rate = float(pub_rates[-1])
+
+        # Index value on each publication day: product of the preceding factors
+        offsets = (pub_days - self.first_day).astype(np.int64)
+        gaps = np.diff(offsets)
+        factors = 1 + pub_rates[:-1] / 100 * gaps / self.basis
+        pub_index = np.concatenate(([1.0], np.cumprod(factors)))
+
+        # Expand to calendar days; inside a gap the publication's rate accrues linearly
+        calendar = np.arange(offsets[-1] + 1)
+        pos = np.searchsorted(offsets, calendar, side='right') - 1
+        elapsed = calendar - offsets[pos]
+        self._index = pub_index[pos] * (1 + pub_rates[pos] / 100 * elapsed / self.basis)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _index_at(self, offsets: np.ndarray) -> np.ndarray:
+        """Index values for day offsets from the first publication (offsets >= 0)"""
+        last = len(self._index) - 1
+        clipped = np.minimum(offsets, last)
+        values = self._index[clipped]
+        beyond = offsets - clipped
+        if beyond.any():
+            values = values * (1 + self.last_rate / 100 * beyond / self.basis)
+        return values
+
+    def compounded_rates(self, starts: Sequence[DateLike], ends: Sequence[DateLike]) -> np.ndarray:
+        """
+        Annualized compounded-in-arrears rates (percent) for many periods at once
+
+        Periods starting before the first publication or with no days yield NaN.
+        """
+        start_off = (np.array([_to_day(d) for d in starts], dtype='datetime64[D]') - self.first_day).astype(np.int64)
+        end_off = (np.array([_to_day(d) for d in ends], dtype='datetime64[D]') - self.first_day).astype(np.int64)
+        days = end_off - start_off
+
+        valid = (start_off >= 0) & (days > 0)
+        rates = np.full(len(days), np.nan)
+        if valid.any():
+            growth = self._index_at(end_off[valid]) / self._index_at(start_off[valid])
+            rates[valid] = (growth - 1) * self.basis / days[valid] * 100
+        return rates
+
+    def compounded_rate(self, start: DateLike, end: DateLike) -> Optional[float]:
+        """Annualized compounded-in-arrears rate (percent) for one period"""
+        rate = self.compounded_rates([start], [end])[0]
+        return None if np.isnan(rate) else float(rate)
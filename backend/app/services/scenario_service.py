@@ -3,7 +3,7 @@ Scenario analysis service for CFO/CTO Helper MVP
 Handles scenario creation, execution, and analysis logic
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Sequence, Tuple
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import pandas as pd
@@ -14,6 +14,11 @@ from app.models.scenario import Scenario
 from app.models.data_upload import DataUpload
 from app.models.analysis_result import AnalysisResult
 from app.models.user import User
+from app.services.upload_frames import upload_frame_cache
+
+
+# Upload columns read by the scenario analyses
+SCENARIO_COLUMNS = ('date', 'amount', 'category', 'customer')
 
 
 class ScenarioType(str, Enum):
@@ -90,33 +95,8 @@ class ScenarioService:
             # Load data for analysis
             data = self._load_scenario_data(scenario)
             
-            # Execute analysis based on scenario type
-            if scenario.scenario_type == ScenarioType.REVENUE_FORECAST:
-                results = self._execute_revenue_forecast(data, scenario.parameters)
-            elif scenario.scenario_type == ScenarioType.COST_ANALYSIS:
-                results = self._execute_cost_analysis(data, scenario.parameters)
-            elif scenario.scenario_type == ScenarioType.CASH_FLOW:
-                results = self._execute_cash_flow_analysis(data, scenario.parameters)
-            elif scenario.scenario_type == ScenarioType.RISK_ASSESSMENT:
-                results = self._execute_risk_assessment(data, scenario.parameters)
-            elif scenario.scenario_type == ScenarioType.MARKET_SCENARIO:
-                results = self._execute_market_scenario(data, scenario.parameters)
-            else:
-                raise ValueError(f"Unknown scenario type: {scenario.scenario_type}")
-            
-            # Save analysis results
-            analysis_result = AnalysisResult(
-                scenario_id=scenario_id,
-                results=results,
-                charts_config=self._generate_charts_config(results, scenario.scenario_type),
-                status="completed"
-            )
-            
-            self.db.add(analysis_result)
-            
-            # Update scenario status
-            scenario.status = "completed"
-            scenario.last_run = datetime.utcnow()
+            results = self.analyze_data(scenario.scenario_type, scenario.parameters, data)
+            analysis_result = self._store_analysis_result(scenario, results)
             
             self.db.commit()
             self.db.refresh(analysis_result)
@@ -124,24 +104,84 @@ class ScenarioService:
             return analysis_result
             
         except Exception as e:
-            scenario.status = "failed"
-            scenario.error_message = str(e)
+            self._mark_failed(scenario, e)
             self.db.commit()
             raise
 
-    def _load_scenario_data(self, scenario: Scenario) -> Dict[str, pd.DataFrame]:
-        """Load and prepare data for scenario analysis"""
+    def analyze_data(self, scenario_type: str, parameters: Dict[str, Any],
+                     data: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+        """
+        Run the analysis of a scenario type on already loaded data
+        
+        Does not touch the database, so several scenarios can be analyzed
+        concurrently on shared frames; each run works on its own shallow copies.
+        """
+        data = {category: df.copy(deep=False) for category, df in data.items()}
+        
+        # Execute analysis based on scenario type
+        if scenario_type == ScenarioType.REVENUE_FORECAST:
+            return self._execute_revenue_forecast(data, parameters)
+        elif scenario_type == ScenarioType.COST_ANALYSIS:
+            return self._execute_cost_analysis(data, parameters)
+        elif scenario_type == ScenarioType.CASH_FLOW:
+            return self._execute_cash_flow_analysis(data, parameters)
+        elif scenario_type == ScenarioType.RISK_ASSESSMENT:
+            return self._execute_risk_assessment(data, parameters)
+        elif scenario_type == ScenarioType.MARKET_SCENARIO:
+            return self._execute_market_scenario(data, parameters)
+        else:
+            raise ValueError(f"Unknown scenario type: {scenario_type}")
+
+    def _store_analysis_result(self, scenario: Scenario, results: Dict[str, Any]) -> AnalysisResult:
+        """Add the analysis result and mark the scenario completed (the caller commits)"""
+        
+        analysis_result = AnalysisResult(
+            scenario_id=scenario.id,
+            results=results,
+            charts_config=self._generate_charts_config(results, scenario.scenario_type),
+            status="completed"
+        )
+        self.db.add(analysis_result)
         
-        data = {}
+        scenario.status = "completed"
+        scenario.error_message = None
+        scenario.last_run = datetime.utcnow()
+        
+        return analysis_result
+
+    def _mark_failed(self, scenario: Scenario, error: Exception):
+        """Record a failed run on the scenario (the caller commits)"""
+        scenario.status = "failed"
+        scenario.error_message = str(error)
+
+    def _load_upload_frames(self, upload_ids: List[int],
+                            columns: Sequence[str] = SCENARIO_COLUMNS) -> Dict[int, Tuple[str, pd.DataFrame]]:
+        """Cached upload frames (read-only views), returns {upload_id: (category, DataFrame)}"""
+        
+        frames = upload_frame_cache.get_frames(self.db, upload_ids, columns=columns)
+        return {
+            upload_id: (upload.category, upload.frame)
+            for upload_id, upload in frames.items() if not upload.frame.empty
+        }
+
+    def _scenario_data(self, scenario: Scenario,
+                       frames: Dict[int, Tuple[str, pd.DataFrame]]) -> Dict[str, pd.DataFrame]:
+        """Group a scenario's upload frames by category"""
         
-        for upload_id in scenario.data_upload_ids:
-            upload = self.db.query(DataUpload).filter(DataUpload.id == upload_id).first()
-            if upload and upload.processed_data:
-                # Convert stored data back to DataFrame
-                df = pd.DataFrame(upload.processed_data)
-                data[upload.category] = df
+        by_category: Dict[str, List[pd.DataFrame]] = {}
+        for upload_id in scenario.data_upload_ids or []:
+            if upload_id in frames:
+                category, df = frames[upload_id]
+                by_category.setdefault(category, []).append(df)
         
-        return data
+        return {
+            category: dfs[0] if len(dfs) == 1 else pd.concat(dfs, ignore_index=True)
+            for category, dfs in by_category.items()
+        }
+
+    def _load_scenario_data(self, scenario: Scenario) -> Dict[str, pd.DataFrame]:
+        """Load and prepare data for scenario analysis"""
+        return self._scenario_data(scenario, self._load_upload_frames(scenario.data_upload_ids or []))
 
     def _execute_revenue_forecast(self, data: Dict[str, pd.DataFrame], parameters: Dict[str, Any]) -> Dict[str, Any]:
         """Execute revenue forecasting scenario"""
@@ -189,7 +229,7 @@ class ScenarioService:
             
             return {
                 'forecast_type': 'revenue',
-                'historical_data': monthly_revenue.to_dict(),
+                'historical_data': monthly_revenue.rename(str).to_dict(),
                 'forecast_data': forecast_df.to_dict('records'),
                 'total_forecasted': sum(forecast_values),
                 'growth_rate': growth_rate,
@@ -228,7 +268,7 @@ class ScenarioService:
                 else:
                     period_grouper = expenses_df['date'].dt.to_period('Q')
                 
-                cost_trends = expenses_df.groupby([period_grouper, 'category'])['amount'].sum().unstack(fill_value=0).to_dict()
+                cost_trends = expenses_df.groupby([period_grouper, 'category'])['amount'].sum().unstack(fill_value=0).rename(index=str).to_dict()
             
             # Cost efficiency metrics
             total_costs = expenses_df['amount'].sum()
@@ -293,8 +333,8 @@ class ScenarioService:
         
         return {
             'analysis_type': 'cash_flow',
-            'monthly_cash_flow': monthly_cash_flow.to_dict(),
-            'cumulative_cash_flow': cumulative_cash_flow.to_dict(),
+            'monthly_cash_flow': monthly_cash_flow.rename(str).to_dict(),
+            'cumulative_cash_flow': cumulative_cash_flow.rename(str).to_dict(),
             'projections': projections,
             'current_cash_position': cumulative_cash_flow.iloc[-1],
             'avg_monthly_flow': avg_monthly_flow,
@@ -0,0 +1,157 @@
+"""
+Streaming ingestion of large CSV uploads
+The upload is spooled to disk, its encoding detected from a sample, and the
+rows parsed, validated and written to the columnar dataset in fixed-size
+chunks, so memory use does not grow with the file
+"""
+
+import codecs
+import hashlib
+import itertools
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from fastapi import UploadFile
+
+from app.config import settings
+from app.services.dataset_store import DatasetStore, dataset_store, pa
+from app.services.validation_service import ChunkedValidation, ValidationService
+
+logger = logging.getLogger(__name__)
+
+# Same order as the in-memory upload path
+ENCODINGS = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1', 'utf-16']
+ENCODING_SAMPLE_SIZE = 64 * 1024
+SPOOL_CHUNK_SIZE = 1024 * 1024
+# Share of the first chunk's values that must parse as numbers for a numeric column
+NUMERIC_SHARE = 0.9
+
+
+class UploadTooLarge(ValueError):
+    """The upload exceeds the streaming size limit"""
+
+
+@dataclass
+class IngestResult:
+    """Outcome of a streamed ingestion"""
+    dataset_path: str
+    row_count: int
+    columns: List[str]
+    preview: List[Dict[str, Any]]
+    validation_errors: List[Dict[str, Any]]
+    column_validation: Optional[Dict[str, Any]] = None
+
+
+async def spool_upload(file: UploadFile, directory: str, max_bytes: int,
+                       suffix: str = '.csv') -> Tuple[str, int, str]:
+    """Copy an upload to a temporary file in fixed-size blocks, returns (path, size, SHA-256 hex digest)"""
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix='upload_', suffix=suffix, dir=directory)
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, 'wb') as spool:
+            while True:
+                block = await file.read(SPOOL_CHUNK_SIZE)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"File size exceeds {max_bytes / (1024 * 1024):.0f}MB limit")
+                digest.update(block)
+                spool.write(block)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, size, digest.hexdigest()
+
+
+def detect_encoding(path: str, sample_size: int = ENCODING_SAMPLE_SIZE) -> str:
+    """Encoding of a CSV file, decided from its first bytes"""
+    with open(path, 'rb') as f:
+        sample = f.read(sample_size)
+
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+
+    for encoding in ENCODINGS:
+        try:
+            # The sample may end in the middle of a multi-byte character
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=len(sample) < sample_size)
+            return encoding
+        except (UnicodeDecodeError, LookupError):
+            continue
+
+    raise ValueError("Unable to decode CSV file. Please ensure the file is saved in UTF-8 or standard encoding.")
+
+
+def column_schema(chunk: pd.DataFrame) -> Tuple["pa.Schema", List[str]]:
+    """
+    Dataset schema decided from the first chunk, returns (schema, numeric columns)
+
+    Columns whose values are (nearly) all numbers are stored as float64, all
+    others as strings; values that do not fit become nulls and are reported
+    by validation.
+    """
+    fields = []
+    numeric_columns = []
+    for col in chunk.columns:
+        values = chunk[col].dropna()
+        if len(values) and pd.to_numeric(values, errors='coerce').notna().mean() >= NUMERIC_SHARE:
+            fields.append(pa.field(str(col), pa.float64()))
+            numeric_columns.append(col)
+        else:
+            fields.append(pa.field(str(col), pa.string()))
+    return pa.schema(fields), numeric_columns
+
+
+def _typed(chunk: pd.DataFrame, numeric_columns: List[str]) -> pd.DataFrame:
+    if not numeric_columns:
+        return chunk
+    return chunk.assign(**{col: pd.to_numeric(chunk[col], errors='coerce') for col in numeric_columns})
+
+
+def ingest_csv(path: str, upload_id: int, category: str, encoding: str,
+               chunk_rows: Optional[int] = None, store: DatasetStore = dataset_store,
+               validation_service: Optional[ValidationService] = None) -> IngestResult:
+    """
+    Parse, validate and store a spooled CSV file chunk by chunk
+
+    Raises ValueError for files that cannot be read or have no rows.
+    """
+    if not store.enabled:
+        raise RuntimeError("Streaming ingestion requires columnar dataset storage (pyarrow)")
+
+    chunk_rows = chunk_rows or settings.upload_chunk_rows
+    validation = ChunkedValidation(validation_service or ValidationService(), category)
+    try:
+        with pd.read_csv(path, encoding=encoding, dtype=str, chunksize=chunk_rows) as reader:
+            first = next(reader, None)
+            if first is None or first.empty:
+                raise ValueError("The uploaded file is empty or contains no valid data rows.")
+
+            schema, numeric_columns = column_schema(first)
+            preview = _typed(first.head(settings.upload_preview_rows), numeric_columns).to_dict(orient='records')
+
+            with store.writer(upload_id, schema) as writer:
+                for chunk in itertools.chain([first], reader):
+                    validation.add(chunk)
+                    writer.write(_typed(chunk, numeric_columns))
+    except (UnicodeDecodeError, pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+        raise ValueError(f"Unable to read CSV file: {str(e)}")
+
+    logger.info(f"Streamed upload {upload_id}: {writer.rows} rows in chunks of {chunk_rows}")
+    return IngestResult(
+        dataset_path=writer.path,
+        row_count=writer.rows,
+        columns=list(first.columns),
+        preview=preview,
+        validation_errors=validation.result(),
+        column_validation=validation.by_column().to_dict(),
+    )
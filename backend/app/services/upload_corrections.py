@@ -0,0 +1,102 @@
+"""
+Corrections of processed uploads
+Columns of a stored upload can be renamed (remapped) and cell values fixed
+without uploading the file again. Only the validation rules of the columns
+corrected are run again: the other columns' results come from the
+per-column validation stored with the upload, and validation_errors is
+patched from them.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+import pandas as pd
+
+from app.models.data_upload import DataUpload, DataUploadStatus
+from app.services.dataset_store import DatasetStore, dataset_store
+from app.services.upload_jobs import MAX_VALIDATED_ROWS
+from app.services.validation_service import ValidationResult, ValidationService
+
+logger = logging.getLogger(__name__)
+
+
+def rename_columns(df: pd.DataFrame, column_mapping: Dict[str, str]) -> Set[int]:
+    """Rename columns of df in place, returns the positions renamed"""
+    unknown = [col for col in column_mapping if col not in df.columns]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(map(str, unknown))}")
+
+    names = [column_mapping.get(col, col) for col in df.columns]
+    if len(set(names)) != len(names):
+        raise ValueError("Column mapping would give several columns the same name")
+
+    renamed = {i for i, (old, new) in enumerate(zip(df.columns, names)) if old != new}
+    df.columns = names
+    return renamed
+
+
+def fix_values(df: pd.DataFrame, values: List[Dict[str, Any]]) -> Set[int]:
+    """
+    Set cell values of df, returns the positions of the columns changed
+
+    Each correction is {"row": ..., "column": ..., "value": ...} with rows
+    numbered from 1 as in validation errors and columns named after renaming.
+    """
+    by_column: Dict[str, Dict[int, Any]] = {}
+    for correction in values:
+        column, row = correction.get('column'), correction.get('row')
+        if column not in df.columns:
+            raise ValueError(f"Unknown column: {column}")
+        if not isinstance(row, int) or not 1 <= row <= len(df):
+            raise ValueError(f"Row {row} is outside the upload's rows 1-{len(df)}")
+        by_column.setdefault(column, {})[row - 1] = correction.get('value')
+
+    changed = set()
+    for column, fixes in by_column.items():
+        column_values = df[column].astype(object)
+        column_values.iloc[list(fixes)] = list(fixes.values())
+        df[column] = column_values.infer_objects()
+        changed.add(df.columns.get_loc(column))
+    return changed
+
+
+def apply_corrections(upload: DataUpload, column_mapping: Dict[str, str], values: List[Dict[str, Any]],
+                      service: Optional[ValidationService] = None, store: DatasetStore = dataset_store) -> ValidationResult:
+    """
+    Rename columns and fix values of a processed upload, then re-validate it
+
+    The corrected rows replace the stored ones. Raises ValueError for
+    corrections that do not apply to the upload.
+    """
+    df = store.load_upload_frame(upload)
+    if df.empty:
+        raise ValueError("The upload has no stored rows to correct")
+
+    previous = ValidationResult.from_dict(upload.column_validation) if upload.column_validation else None
+    # Streamed uploads were validated without a row limit
+    max_rows = previous.max_rows if previous is not None else MAX_VALIDATED_ROWS
+    if previous is not None and (previous.category != upload.category or previous.names != list(df.columns)):
+        previous = None
+
+    changed = rename_columns(df, column_mapping)
+    changed |= fix_values(df, values)
+
+    service = service or ValidationService()
+    if previous is not None:
+        result = service.revalidate(df, previous, changed, values_changed=bool(values))
+        logger.info(f"Re-validated upload {upload.id} after correcting {len(changed)} of {len(df.columns)} columns")
+    else:
+        # Uploads processed before results were kept per column
+        result = service.validate_by_column(df, upload.category, max_rows=max_rows)
+        logger.info(f"Validated all {len(df.columns)} columns of upload {upload.id}")
+
+    previous_path = upload.dataset_path
+    store.store_upload_rows(upload, df)
+    if previous_path != upload.dataset_path:
+        store.delete(previous_path)
+
+    upload.column_validation = result.to_dict()
+    upload.validation_errors = result.errors()
+    upload.error_count = len(upload.validation_errors)
+    upload.status = DataUploadStatus.COMPLETED if not upload.validation_errors else DataUploadStatus.FAILED
+    return result
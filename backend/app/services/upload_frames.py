@@ -0,0 +1,158 @@
+"""
+Cache of uploaded data as DataFrames
+Frames are keyed by (upload_id, updated_at, columns) so an edited upload is reloaded,
+bounded by memory in LRU order, and handed out as copy-on-write views that
+callers cannot use to change the cached data
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+from sqlalchemy.orm import Session, joinedload
+
+from app.config import settings
+from app.models.data_upload import DataUpload
+from app.services.dataset_store import dataset_store
+
+logger = logging.getLogger(__name__)
+
+# Cached frames are handed out as shallow copies, which only isolate the cache
+# under copy-on-write: the default from pandas 3, opt-in on pandas 2
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+CacheKey = Tuple[int, Optional[datetime], Optional[Tuple[str, ...]]]
+
+
+@dataclass(frozen=True)
+class UploadFrame:
+    """Rows of one upload with the metadata the analyses need"""
+    upload_id: int
+    user_id: int
+    category: str
+    frame: pd.DataFrame
+
+
+def frame_nbytes(frame: pd.DataFrame) -> int:
+    """Memory held by a frame, including its object columns"""
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+
+def read_only_view(frame: pd.DataFrame) -> pd.DataFrame:
+    """View of a shared frame; with copy-on-write, writes to it never reach the shared frame"""
+    return frame.copy(deep=False)
+
+
+class UploadFrameCache:
+    """LRU cache of upload DataFrames bounded by total memory"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, Tuple[UploadFrame, int]]" = OrderedDict()
+        self._keys: Dict[int, Set[CacheKey]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get_frames(self, db: Session, upload_ids: Iterable[int], user_id: Optional[int] = None,
+                   columns: Optional[Sequence[str]] = None) -> Dict[int, UploadFrame]:
+        """
+        Frames of the given uploads, optionally restricted to one user
+
+        One query reads the upload versions; the rows of uploads that are not
+        cached (or changed since) are then loaded with a single IN query, or
+        from their columnar dataset files. With columns, frames hold only
+        those of the columns that exist. Uploads without rows are returned
+        with an empty frame.
+        """
+        upload_ids = set(upload_ids)
+        if not upload_ids:
+            return {}
+        projection = tuple(sorted(set(columns))) if columns is not None else None
+
+        query = db.query(DataUpload.id, DataUpload.updated_at).filter(DataUpload.id.in_(upload_ids))
+        if user_id is not None:
+            query = query.filter(DataUpload.user_id == user_id)
+        versions = dict(query.all())
+
+        frames: Dict[int, UploadFrame] = {}
+        missing = []
+        with self._lock:
+            for upload_id, updated_at in versions.items():
+                entry = self._entries.get((upload_id, updated_at, projection))
+                if entry is None:
+                    missing.append(upload_id)
+                    continue
+                self._entries.move_to_end((upload_id, updated_at, projection))
+                frames[upload_id] = entry[0]
+            self._counters["hits"] += len(frames)
+            self._counters["misses"] += len(missing)
+
+        if missing:
+            # JSON rows are joined in the same query
+            uploads = db.query(DataUpload).options(joinedload(DataUpload.blob)).filter(DataUpload.id.in_(missing))
+            for upload in uploads.all():
+                cached = UploadFrame(
+                    upload_id=upload.id,
+                    user_id=upload.user_id,
+                    category=upload.category or 'data',
+                    frame=dataset_store.load_upload_frame(upload, projection),
+                )
+                self._store((upload.id, upload.updated_at, projection), cached)
+                frames[upload.id] = cached
+
+        return {
+            upload_id: UploadFrame(cached.upload_id, cached.user_id, cached.category, read_only_view(cached.frame))
+            for upload_id, cached in frames.items()
+        }
+
+    def _store(self, key: CacheKey, cached: UploadFrame) -> None:
+        nbytes = frame_nbytes(cached.frame)
+        if nbytes > self.max_bytes:
+            logger.info(f"Upload {cached.upload_id} ({nbytes} bytes) is larger than the frame cache, not cached")
+            return
+
+        with self._lock:
+            # Drop the entries of an older version of the same upload
+            for previous in [k for k in self._keys.get(cached.upload_id, ()) if k[1] != key[1] or k == key]:
+                self._drop(previous)
+
+            self._entries[key] = (cached, nbytes)
+            self._keys.setdefault(cached.upload_id, set()).add(key)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def _drop(self, key: CacheKey) -> None:
+        # Caller holds the lock
+        self._bytes -= self._entries.pop(key)[1]
+        keys = self._keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys[key[0]]
+
+    def invalidate(self, upload_id: Optional[int] = None) -> None:
+        """Drop one upload or the whole cache"""
+        with self._lock:
+            if upload_id is None:
+                self._entries.clear()
+                self._keys.clear()
+                self._bytes = 0
+                return
+            for key in list(self._keys.get(upload_id, ())):
+                self._drop(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters and memory use for monitoring"""
+        with self._lock:
+            return {**self._counters, "size": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+upload_frame_cache = UploadFrameCache(settings.upload_frame_cache_max_mb * 1024 * 1024)
@@ -0,0 +1,282 @@
+"""
+Background processing of file uploads
+Parsing, validation and storage of an upload run in a worker thread with its
+own session. The DataUpload row moves PENDING -> PROCESSING -> COMPLETED
+(or FAILED) and records the rows validated and errors found so far, so
+clients can poll its progress cheaply.
+"""
+
+import io
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.data_upload import DataUpload, DataUploadStatus
+from app.services.content_index import DATA_UPLOAD, ContentIndex, ParsedUpload, parse_cache
+from app.services.dataset_store import DatasetStore, dataset_store
+from app.services.excel_reader import excel_reader
+from app.services.streaming_ingest import ENCODINGS
+from app.services.upload_frames import upload_frame_cache
+from app.services.validation_service import ChunkedValidation, ValidationService
+
+logger = logging.getLogger(__name__)
+
+# Row limit of whole-file validation
+MAX_VALIDATED_ROWS = 100000
+
+
+class JobProgress:
+    """Progress of an upload job, committed to its DataUpload row"""
+
+    def __init__(self, db: Session, upload: DataUpload):
+        self.db = db
+        self.upload = upload
+
+    def update(self, rows_processed: int, error_count: int) -> None:
+        self.upload.rows_processed = rows_processed
+        self.upload.error_count = error_count
+        self.db.commit()
+
+
+UploadWork = Callable[[Session, DataUpload, JobProgress], Any]
+
+
+def ingest_frame(upload: DataUpload, df: pd.DataFrame, progress: JobProgress,
+                 validation_errors: Optional[List[Dict[str, Any]]] = None,
+                 chunk_rows: Optional[int] = None, store: DatasetStore = dataset_store,
+                 column_validation: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Validate a parsed upload chunk by chunk, reporting progress, and store its rows
+
+    Validation is skipped when the errors are already known (a file parsed before).
+    """
+    upload.row_count = len(df)
+
+    if validation_errors is None:
+        chunk_rows = chunk_rows or settings.upload_chunk_rows
+        validation = ChunkedValidation(ValidationService(), upload.category, max_rows=MAX_VALIDATED_ROWS)
+        for start in range(0, len(df), chunk_rows):
+            validation.add(df.iloc[start:start + chunk_rows])
+            progress.update(validation.rows, validation.error_count)
+        validation_errors = validation.result()
+        by_column = validation.by_column()
+        column_validation = by_column.to_dict() if by_column is not None else None
+
+    store.store_upload_rows(upload, df)
+    upload.validation_errors = validation_errors
+    upload.column_validation = column_validation
+    upload.status = DataUploadStatus.COMPLETED if not validation_errors else DataUploadStatus.FAILED
+    progress.update(len(df), len(validation_errors))
+    return validation_errors
+
+
+def parse_file_content(filename: str, file_content: bytes) -> Tuple[pd.DataFrame, Optional[str]]:
+    """Parse CSV or Excel bytes into a DataFrame, returns (df, encoding used for CSV)"""
+    if filename.endswith('.csv'):
+        for encoding in ENCODINGS:
+            try:
+                df = pd.read_csv(io.StringIO(file_content.decode(encoding)))
+                break
+            except (UnicodeDecodeError, UnicodeError, LookupError):
+                continue
+        else:
+            raise ValueError("Unable to decode CSV file. Please ensure the file is saved in UTF-8 or standard encoding.")
+        logger.info(f"Successfully parsed CSV file with encoding: {encoding}")
+    else:
+        try:
+            df = excel_reader.read(file_content)
+        except Exception as e:
+            raise ValueError(f"Unable to read Excel file: {str(e)}")
+        encoding = None
+
+    if df.empty:
+        raise ValueError("The uploaded file is empty or contains no valid data rows.")
+
+    logger.info(f"Successfully parsed file with {len(df)} rows and {len(df.columns)} columns")
+    return df, encoding
+
+
+def process_file_upload(db: Session, upload: DataUpload, progress: JobProgress,
+                        filename: str, file_content: bytes, content_hash: str) -> None:
+    """Upload job: parse, validate and store an uploaded file"""
+    # Parsing and validation are reused for files seen before (by any user)
+    parsed = parse_cache.get(content_hash, upload.category)
+    if parsed is None:
+        df, encoding = parse_file_content(filename, file_content)
+        validation_errors = ingest_frame(upload, df, progress)
+        parse_cache.put(content_hash, upload.category,
+                        ParsedUpload(df, validation_errors, encoding, upload.column_validation))
+    else:
+        logger.info(f"Reusing parsed content {content_hash[:12]} with {len(parsed.frame)} rows")
+        df, encoding = parsed.frame, parsed.encoding
+        validation_errors = ingest_frame(upload, df, progress, validation_errors=parsed.validation_errors,
+                                         column_validation=parsed.column_validation)
+
+    # Identical re-uploads by the same user get this result back at once
+    result = {
+        "upload_id": upload.id,
+        "status": upload.status.value,
+        "row_count": upload.row_count,
+        "column_count": len(df.columns),
+        "columns": list(df.columns),
+        "validation_errors": validation_errors,
+        "preview_data": upload.preview_data,
+        "encoding_used": encoding,
+    }
+    ContentIndex(db).record(upload.user_id, DATA_UPLOAD, content_hash, [upload.id],
+                            jsonable_encoder(result), variant=upload.category)
+
+
+def release_interrupted(upload: DataUpload) -> None:
+    """
+    Settle an upload whose job will never run or finish
+
+    A previewed file still on disk goes back to awaiting confirmation; uploads
+    whose content only existed in the job fail and have to be uploaded again.
+    """
+    if upload.file_path and os.path.exists(upload.file_path):
+        upload.status = DataUploadStatus.PENDING
+        upload.processing_log = "Processing was interrupted by a server restart, please confirm the upload again"
+    else:
+        upload.status = DataUploadStatus.FAILED
+        upload.processing_log = "Processing was interrupted by a server restart, please upload the file again"
+
+
+def expire_previews(db: Session, max_age: timedelta) -> int:
+    """
+    Fail previews left unconfirmed for max_age and delete their files, returns their count
+
+    A preview's file is spooled to disk until the user confirms the column
+    mapping; without this an abandoned preview keeps its file forever.
+    """
+    cutoff = datetime.now(timezone.utc) - max_age
+    expired = db.query(DataUpload).filter(
+        DataUpload.updated_at < cutoff,
+        DataUpload.status == DataUploadStatus.PENDING,
+        DataUpload.file_path.isnot(None)
+    ).all()
+    for upload in expired:
+        if os.path.exists(upload.file_path):
+            os.remove(upload.file_path)
+        upload.file_path = None
+        upload.status = DataUploadStatus.FAILED
+        upload.processing_log = "The preview was not confirmed in time, please upload the file again"
+    db.commit()
+
+    if expired:
+        logger.info(f"Expired {len(expired)} unconfirmed upload previews")
+    return len(expired)
+
+
+class UploadJobRunner:
+    """Thread pool running upload processing jobs"""
+
+    def __init__(self, max_workers: int, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload-job")
+        self._futures: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, upload_id: int, work: UploadWork) -> Future:
+        """Run work(db, upload, progress) for an upload in the background"""
+        future = self._executor.submit(self._run, upload_id, work)
+        with self._lock:
+            self._futures[upload_id] = future
+        future.add_done_callback(lambda done: self._forget(upload_id, done))
+        return future
+
+    def shutdown(self) -> None:
+        """Finish running jobs; queued jobs are cancelled and their uploads released"""
+        with self._lock:
+            futures = list(self._futures.items())
+        # Cancelling runs the done callbacks, which take the lock
+        queued = [upload_id for upload_id, future in futures if future.cancel()]
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if not queued:
+            return
+
+        db = self.session_factory()
+        try:
+            for upload in db.query(DataUpload).filter(DataUpload.id.in_(queued)):
+                release_interrupted(upload)
+            db.commit()
+            logger.warning(f"Cancelled {len(queued)} queued upload jobs at shutdown")
+        finally:
+            db.close()
+
+    def recover(self, stale_after: timedelta, preview_max_age: Optional[timedelta] = None) -> int:
+        """
+        Release uploads left unfinished by a previous process, returns their count
+
+        Jobs commit progress as they go, so only uploads not updated for
+        stale_after count as orphaned; jobs of other live workers are left alone.
+        Previews awaiting confirmation are not jobs and are kept, unless older
+        than preview_max_age.
+        """
+        cutoff = datetime.now(timezone.utc) - stale_after
+        db = self.session_factory()
+        try:
+            orphaned = db.query(DataUpload).filter(
+                DataUpload.updated_at < cutoff,
+                (DataUpload.status == DataUploadStatus.PROCESSING)
+                | ((DataUpload.status == DataUploadStatus.PENDING) & DataUpload.file_path.is_(None))
+            ).all()
+            for upload in orphaned:
+                release_interrupted(upload)
+            db.commit()
+            if preview_max_age is not None:
+                expire_previews(db, preview_max_age)
+        finally:
+            db.close()
+
+        if orphaned:
+            logger.warning(f"Released {len(orphaned)} uploads left unfinished by a previous run")
+        return len(orphaned)
+
+    def _forget(self, upload_id: int, future: Future) -> None:
+        with self._lock:
+            if self._futures.get(upload_id) is future:
+                del self._futures[upload_id]
+
+    def _run(self, upload_id: int, work: UploadWork) -> None:
+        db = self.session_factory()
+        try:
+            upload = db.get(DataUpload, upload_id)
+            if upload is None:
+                logger.warning(f"Upload {upload_id} no longer exists, job skipped")
+                return
+
+            upload.status = DataUploadStatus.PROCESSING
+            upload.rows_processed = 0
+            upload.error_count = 0
+            db.commit()
+
+            try:
+                work(db, upload, JobProgress(db, upload))
+                if upload.status == DataUploadStatus.PROCESSING:
+                    upload.status = DataUploadStatus.COMPLETED
+                db.commit()
+                logger.info(f"Upload {upload_id} processed: {upload.row_count} rows, status {upload.status.value}")
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Processing of upload {upload_id} failed: {str(e)}")
+                upload = db.get(DataUpload, upload_id)
+                if upload is not None:
+                    upload.status = DataUploadStatus.FAILED
+                    upload.processing_log = str(e)
+                    db.commit()
+        finally:
+            db.close()
+            upload_frame_cache.invalidate(upload_id)
+
+
+upload_job_runner = UploadJobRunner(settings.upload_job_workers)
@@ -0,0 +1,69 @@
+"""
+Upload preview and confirmed processing
+A preview reads only the head of an uploaded file to detect its columns,
+types and encoding. The file is kept on disk and fully parsed, validated and
+stored by an upload job once the user confirms the column mapping.
+"""
+
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.models.data_upload import DataUpload
+from app.services.dataset_store import DatasetStore, dataset_store
+from app.services.excel_reader import excel_reader
+from app.services.streaming_ingest import detect_encoding
+from app.services.upload_jobs import JobProgress, ingest_frame
+from app.services.upload_service import UploadService
+from app.services.validation_service import ValidationService
+
+
+def read_head(path: str, nrows: int) -> Tuple[pd.DataFrame, Optional[str]]:
+    """First rows of a CSV or Excel file, returns (df, encoding used for CSV)"""
+    if path.endswith('.csv'):
+        encoding = detect_encoding(path)
+        return pd.read_csv(path, encoding=encoding, nrows=nrows), encoding
+
+    # Both Excel engines stop reading after the rows needed
+    return excel_reader.read(path, nrows=nrows), None
+
+
+def read_file(path: str) -> Tuple[pd.DataFrame, Optional[str]]:
+    """All rows of a CSV or Excel file, returns (df, encoding used for CSV)"""
+    if path.endswith('.csv'):
+        encoding = detect_encoding(path)
+        return pd.read_csv(path, encoding=encoding), encoding
+    return excel_reader.read(path), None
+
+
+def build_preview(df: pd.DataFrame, encoding: Optional[str], category: str,
+                  preview_rows: int) -> Dict[str, Any]:
+    """Columns, inferred types and suggested column mapping of a file's head"""
+    column_types = UploadService().infer_column_types(df)
+    return {
+        "columns": list(df.columns),
+        "column_types": {
+            str(col): {"type": column_type.type, "confidence": round(column_type.confidence, 3)}
+            for col, column_type in column_types.items()
+        },
+        "encoding_used": encoding,
+        "preview_data": df.head(preview_rows).to_dict(orient='records'),
+        "suggestions": ValidationService().suggest_corrections(df, category),
+    }
+
+
+def process_confirmed_upload(db: Session, upload: DataUpload, progress: JobProgress,
+                             column_mapping: Dict[str, str], store: DatasetStore = dataset_store) -> None:
+    """Upload job: parse, validate and store a previewed file with the confirmed column mapping"""
+    df, _ = read_file(upload.file_path)
+    df = df.rename(columns=column_mapping)
+    if df.empty:
+        raise ValueError("The uploaded file is empty or contains no valid data rows.")
+
+    ingest_frame(upload, df, progress, store=store)
+
+    # The rows are stored now, the original file is no longer needed
+    os.remove(upload.file_path)
+    upload.file_path = None
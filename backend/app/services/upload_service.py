@@ -2,22 +2,40 @@
 
 import pandas as pd
 import numpy as np
+from pandas.tseries.api import guess_datetime_format
 from typing import Dict, List, Any, Optional
+from dataclasses import dataclass
 from datetime import datetime
 import json
 import os
 import tempfile
 
 from app.models.data_upload import DataUpload, DataUploadStatus
+from app.services.excel_reader import excel_reader
+
+# Sampled values a date format is guessed from
+DATE_FORMAT_GUESSES = 5
+
+
+@dataclass(frozen=True)
+class ColumnType:
+    """Inferred type of a column and the share of sampled values that fit it."""
+    type: str  # 'numeric', 'datetime' or 'text'
+    confidence: float
+    date_format: Optional[str] = None  # strptime format of datetime columns
 
 
 class UploadService:
     """Service for handling file uploads and data processing."""
     
-    def __init__(self):
+    def __init__(self, type_sample_size: int = 1000, type_min_share: float = 0.95):
         self.supported_formats = ['.csv', '.xlsx', '.xls']
         self.max_file_size = 10 * 1024 * 1024  # 10MB
         self.max_rows = 100000  # 100k rows limit
+        # Type inference looks at this many values per column; a type is chosen
+        # when at least `type_min_share` of them convert to it
+        self.type_sample_size = type_sample_size
+        self.type_min_share = type_min_share
     
     def validate_file(self, file_path: str, file_size: int) -> List[str]:
         """Validate uploaded file."""
@@ -55,8 +73,7 @@ class UploadService:
     def parse_excel(self, file_content: bytes) -> pd.DataFrame:
         """Parse Excel file content."""
         try:
-            # Use BytesIO for Excel files
-            df = pd.read_excel(pd.BytesIO(file_content))
+            df = excel_reader.read(file_content)
             return df
         except Exception as e:
             raise ValueError(f"Error parsing Excel file: {str(e)}")
@@ -84,32 +101,79 @@ class UploadService:
         
         return df_clean
     
-    def detect_data_types(self, df: pd.DataFrame) -> Dict[str, str]:
-        """Detect and suggest data types for columns."""
-        type_suggestions = {}
+    def infer_column_types(self, df: pd.DataFrame) -> Dict[str, ColumnType]:
+        """Infer column types from a sample of each column's values."""
+        column_types = {}
         
         for col in df.columns:
-            # Try to infer data type
-            if df[col].dtype == 'object':
-                # Try to convert to numeric
-                try:
-                    pd.to_numeric(df[col], errors='raise')
-                    type_suggestions[col] = 'numeric'
-                except:
-                    # Try to convert to datetime
-                    try:
-                        pd.to_datetime(df[col], errors='raise')
-                        type_suggestions[col] = 'datetime'
-                    except:
-                        type_suggestions[col] = 'text'
-            elif np.issubdtype(df[col].dtype, np.number):
-                type_suggestions[col] = 'numeric'
-            elif np.issubdtype(df[col].dtype, np.datetime64):
-                type_suggestions[col] = 'datetime'
+            dtype = df[col].dtype
+            if pd.api.types.is_bool_dtype(dtype):
+                column_types[col] = ColumnType('text', 1.0)
+            elif pd.api.types.is_numeric_dtype(dtype):
+                column_types[col] = ColumnType('numeric', 1.0)
+            elif pd.api.types.is_datetime64_any_dtype(dtype):
+                column_types[col] = ColumnType('datetime', 1.0)
+            elif dtype == object or pd.api.types.is_string_dtype(dtype):
+                column_types[col] = self._infer_from_sample(self._sample_values(df[col]))
             else:
-                type_suggestions[col] = 'text'
+                column_types[col] = ColumnType('text', 1.0)
         
-        return type_suggestions
+        return column_types
+    
+    def _sample_values(self, values: pd.Series) -> pd.Series:
+        """Non-empty values of one row from each of `type_sample_size` equal slices of the column."""
+        if len(values) > self.type_sample_size:
+            positions = np.linspace(0, len(values) - 1, self.type_sample_size).astype(np.int64)
+            sample = values.iloc[positions].dropna()
+            if not sample.empty:
+                return sample
+        # Short or sparse columns: sample from the non-empty values only
+        values = values.dropna()
+        if len(values) > self.type_sample_size:
+            positions = np.linspace(0, len(values) - 1, self.type_sample_size).astype(np.int64)
+            values = values.iloc[positions]
+        return values
+    
+    def _infer_from_sample(self, sample: pd.Series) -> ColumnType:
+        """Classify sampled values by the share that converts to each type."""
+        if sample.empty:
+            return ColumnType('text', 0.0)
+        
+        numeric_share = float(pd.to_numeric(sample, errors='coerce').notna().mean())
+        if numeric_share >= self.type_min_share:
+            return ColumnType('numeric', numeric_share)
+        
+        date_format, date_share = max(
+            ((date_format, float(self._to_datetime(sample, date_format).notna().mean()))
+             for date_format in self._date_format_candidates(sample)),
+            key=lambda candidate: candidate[1], default=(None, 0.0)
+        )
+        if date_share >= self.type_min_share:
+            return ColumnType('datetime', date_share, date_format)
+        
+        return ColumnType('text', 1.0 - max(numeric_share, date_share))
+    
+    @staticmethod
+    def _date_format_candidates(sample: pd.Series) -> List[str]:
+        """Formats guessed from the first values, read month-first and day-first."""
+        candidates = []
+        for value in sample.iloc[:DATE_FORMAT_GUESSES].astype(str):
+            for dayfirst in (False, True):
+                date_format = guess_datetime_format(value, dayfirst=dayfirst)
+                if date_format and date_format not in candidates:
+                    candidates.append(date_format)
+        return candidates
+    
+    @staticmethod
+    def _to_datetime(values: pd.Series, date_format: str) -> pd.Series:
+        try:
+            return pd.to_datetime(values, errors='coerce', format=date_format)
+        except (ValueError, TypeError):
+            return pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    
+    def detect_data_types(self, df: pd.DataFrame) -> Dict[str, str]:
+        """Detect and suggest data types for columns."""
+        return {col: column_type.type for col, column_type in self.infer_column_types(df).items()}
     
     def process_financial_data(self, df: pd.DataFrame, category: str) -> Dict[str, Any]:
         """Process financial data based on category."""
@@ -117,10 +181,15 @@ class UploadService:
             'original_rows': len(df),
             'processed_rows': 0,
             'columns': list(df.columns),
-            'data_types': self.detect_data_types(df),
+            'data_types': {},
+            'type_confidence': {},
             'summary': {}
         }
         
+        for col, column_type in self.infer_column_types(df).items():
+            processed_data['data_types'][col] = column_type.type
+            processed_data['type_confidence'][col] = round(column_type.confidence, 3)
+        
         # Clean the data
         df_clean = self.clean_dataframe(df)
         processed_data['processed_rows'] = len(df_clean)
@@ -2,10 +2,15 @@
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, Iterable, List, Any, Optional, Tuple
+from dataclasses import asdict, dataclass
 from datetime import datetime
 import re
 
+# Rows of a chunked file checked for duplicates; the distinct row hashes kept
+# for the check take 8 bytes per row, at most 16MB
+MAX_DUPLICATE_CHECK_ROWS = 2_000_000
+
 
 class ValidationError:
     """Represents a validation error."""
@@ -25,10 +30,59 @@ class ValidationError:
         }
 
 
+@dataclass
+class ValidationResult:
+    """
+    Errors of validate_financial_data kept per column.
+    
+    columns[i] holds the type, missing-value and sign errors of the i-th
+    column (named names[i]); table holds the structure, required-column and
+    duplicate-row errors. Stored with an upload so that a corrected column
+    can be re-validated on its own. max_rows is the row limit the file was
+    validated with (None for streamed uploads, which have no limit).
+    """
+    category: Optional[str]
+    names: List[str]
+    columns: List[Dict[str, List[Dict[str, Any]]]]
+    table: Dict[str, List[Dict[str, Any]]]
+    sign_columns: List[str]
+    max_rows: Optional[int] = 100000
+    
+    def errors(self) -> List[Dict[str, Any]]:
+        """All errors, in the order of validate_financial_data."""
+        errors = self.table['structure'] + self.table['required']
+        for entry in self.columns:
+            errors.extend(entry['types'])
+        for entry in self.columns:
+            errors.extend(entry['missing'])
+        errors.extend(self.table['duplicates'])
+        for name in self.sign_columns:
+            errors.extend(self.columns[self.names.index(name)]['sign'])
+        return errors
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ValidationResult":
+        return cls(**data)
+
+
+def _column_entry(types=(), missing=(), sign=()) -> Dict[str, List[Dict[str, Any]]]:
+    return {
+        'types': [error.to_dict() for error in types],
+        'missing': [error.to_dict() for error in missing],
+        'sign': [error.to_dict() for error in sign],
+    }
+
+
 class ValidationService:
     """Service for validating uploaded financial data."""
     
-    def __init__(self):
+    def __init__(self, max_errors_per_rule: int = 100):
+        # Row-level errors reported per rule and column; the rest are only counted
+        self.max_errors_per_rule = max_errors_per_rule
+        
         self.required_columns = {
             'revenue': ['date', 'amount'],
             'expenses': ['date', 'amount'],
@@ -39,6 +93,16 @@ class ValidationService:
             'forecast': ['date', 'category', 'amount']
         }
         
+        # Columns checked for negative values: (name keywords, label, message note)
+        self.sign_checks = {
+            'revenue': [(['amount', 'revenue', 'sales'], 'revenue', '')],
+            'expenses': [(['amount', 'expense', 'cost'], 'expense', ' (may be refunds)')],
+            'cash_flow': [
+                (['inflow', 'income', 'receipts'], 'inflow', ''),
+                (['outflow', 'payments', 'expenses'], 'outflow', ''),
+            ],
+        }
+        
         self.optional_columns = {
             'revenue': ['source', 'description', 'category'],
             'expenses': ['category', 'description', 'vendor'],
@@ -51,21 +115,101 @@ class ValidationService:
     
     def validate_financial_data(self, df: pd.DataFrame, category: str) -> List[Dict[str, Any]]:
         """Validate financial data based on category."""
-        errors = []
+        return self.validate_by_column(df, category).errors()
+    
+    def validate_by_column(self, df: pd.DataFrame, category: str,
+                           max_rows: Optional[int] = 100000) -> ValidationResult:
+        """validate_financial_data with the errors kept per column."""
+        return self.revalidate(df, None, range(len(df.columns)), values_changed=True,
+                               category=category, max_rows=max_rows)
+    
+    def revalidate(self, df: pd.DataFrame, previous: Optional[ValidationResult], changed: Iterable[int],
+                   values_changed: bool, category: Optional[str] = None,
+                   max_rows: Optional[int] = 100000) -> ValidationResult:
+        """
+        Validate a corrected frame, reusing the results of unchanged columns.
+        
+        df has the columns of the previous result in the same order; the
+        positions in changed were renamed or had values corrected. Those
+        columns, and the columns whose sign check moved with the new names,
+        are validated again. Checks on column names always run; duplicate rows
+        are only counted again when values changed. The row limit of the
+        previous result is kept.
+        """
+        if previous is not None:
+            category = previous.category
+            max_rows = previous.max_rows
+            if len(previous.names) != len(df.columns):
+                previous = None
         
         # Basic DataFrame validation
-        errors.extend(self._validate_basic_structure(df))
+        table = {
+            'structure': [error.to_dict() for error in self._validate_basic_structure(df, max_rows)],
+            'required': [],
+            'duplicates': [],
+        }
         
         # Category-specific validation
-        if category in self.required_columns:
-            errors.extend(self._validate_required_columns(df, category))
-            errors.extend(self._validate_data_types(df, category))
-            errors.extend(self._validate_data_quality(df, category))
+        if category not in self.required_columns:
+            return ValidationResult(category, list(df.columns), [_column_entry() for _ in df.columns], table, [],
+                                    max_rows)
+        
+        table['required'] = [error.to_dict() for error in self._validate_required_columns(df, category)]
+        if previous is not None and not values_changed:
+            table['duplicates'] = previous.table['duplicates']
+        else:
+            table['duplicates'] = [error.to_dict() for error in self._duplicate_rows_errors(df)]
+        
+        sign_columns = self._sign_check_columns(df.columns, category)
+        sign_names = [col for col, _, _ in sign_columns]
+        
+        changed = set(changed)
+        if previous is None:
+            changed = set(range(len(df.columns)))
+        elif sign_names != previous.sign_columns:
+            # A sign check depends on the position of its column among the checks
+            moved = {name for k, name in enumerate(sign_names) if previous.sign_columns[k:k + 1] != [name]}
+            moved |= {name for k, name in enumerate(previous.sign_columns) if sign_names[k:k + 1] != [name]}
+            changed |= {i for i, col in enumerate(df.columns) if col in moved or previous.names[i] in moved}
+        
+        columns = []
+        for i, col in enumerate(df.columns):
+            if i in changed:
+                columns.append(self._validate_column(df, i, sign_columns))
+            else:
+                columns.append(previous.columns[i])
+        return ValidationResult(category, list(df.columns), columns, table, sign_names, max_rows)
+    
+    def _validate_column(self, df: pd.DataFrame, col_index: int,
+                         sign_columns: List[Tuple[str, str, str]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Type, missing-value and sign errors of one column."""
+        col = df.columns[col_index]
+        values = df.iloc[:, col_index]
         
-        # Convert ValidationError objects to dictionaries
-        return [error.to_dict() for error in errors]
+        # Check for excessive missing values
+        missing = []
+        missing_pct = values.isna().sum() / len(df) * 100
+        if missing_pct > 80:
+            missing.append(ValidationError(None, col, f"Column has {missing_pct:.1f}% missing values", "warning"))
+        
+        # Category-specific quality checks, on the first column of a name
+        sign = []
+        if list(df.columns).index(col) == col_index:
+            for sign_col, label, note in sign_columns:
+                if sign_col != col:
+                    continue
+                numeric_values = pd.to_numeric(values, errors='coerce')
+                
+                negative_rows = df.index[(numeric_values < 0).to_numpy()] + 1
+                if len(negative_rows):
+                    sign.append(self._negative_values_error(col, label, note, negative_rows[:5].tolist()))
+                
+                if label == 'revenue' and (numeric_values == 0).sum() > len(df) * 0.5:
+                    sign.append(self._zero_revenue_error(col))
+        
+        return _column_entry(self._validate_column_types(df, col_index), missing, sign)
     
-    def _validate_basic_structure(self, df: pd.DataFrame) -> List[ValidationError]:
+    def _validate_basic_structure(self, df: pd.DataFrame, max_rows: Optional[int] = 100000) -> List[ValidationError]:
         """Validate basic DataFrame structure."""
         errors = []
         
@@ -79,7 +223,7 @@ class ValidationService:
             errors.append(ValidationError(None, None, "File must contain at least one data row", "error"))
         
         # Check for maximum rows
-        if len(df) > 100000:
+        if max_rows is not None and len(df) > max_rows:
             errors.append(ValidationError(None, None, "File contains too many rows (max 100,000)", "error"))
         
         # Check for duplicate columns
@@ -124,221 +268,162 @@ class ValidationService:
         
         return errors
     
-    def _validate_data_types(self, df: pd.DataFrame, category: str) -> List[ValidationError]:
-        """Validate data types for specific columns."""
+    def _validate_data_types(self, df: pd.DataFrame, category: str,
+                             tally: Optional[Dict[tuple, int]] = None, row_offset: int = 0) -> List[ValidationError]:
+        """
+        Validate data types for specific columns.
+        
+        With a tally, row errors are counted across calls (chunks of one file
+        starting at row_offset) and the per-rule summaries are left to the caller.
+        """
+        errors = []
+        for i in range(len(df.columns)):
+            errors.extend(self._validate_column_types(df, i, tally, row_offset))
+        return errors
+    
+    def _validate_column_types(self, df: pd.DataFrame, col_index: int,
+                               tally: Optional[Dict[tuple, int]] = None, row_offset: int = 0) -> List[ValidationError]:
+        """Validate the data type of one column, by its name."""
         errors = []
         
         # Find columns that should be numeric
         numeric_columns = ['amount', 'inflow', 'outflow', 'assets', 'liabilities', 'equity', 'revenue', 'expenses', 'net_income']
-        df_columns_lower = [col.lower().replace(' ', '_').replace('-', '_') for col in df.columns]
+        original_col = df.columns[col_index]
+        col_lower = original_col.lower().replace(' ', '_').replace('-', '_')
         
-        for i, col_lower in enumerate(df_columns_lower):
-            original_col = df.columns[i]
-            
-            # Check if column should be numeric
-            if any(num_col in col_lower for num_col in numeric_columns):
-                errors.extend(self._validate_numeric_column(df, original_col, i))
-            
-            # Check if column should be date
-            if 'date' in col_lower or 'period' in col_lower:
-                errors.extend(self._validate_date_column(df, original_col, i))
+        # Check if column should be numeric
+        if any(num_col in col_lower for num_col in numeric_columns):
+            errors.extend(self._validate_numeric_column(df, original_col, col_index, tally, row_offset))
+        
+        # Check if column should be date
+        if 'date' in col_lower or 'period' in col_lower:
+            errors.extend(self._validate_date_column(df, original_col, col_index, tally, row_offset))
         
         return errors
     
-    def _validate_numeric_column(self, df: pd.DataFrame, col_name: str, col_index: int) -> List[ValidationError]:
+    def _validate_numeric_column(self, df: pd.DataFrame, col_name: str, col_index: int,
+                                 tally: Optional[Dict[tuple, int]] = None, row_offset: int = 0) -> List[ValidationError]:
         """Validate numeric column."""
-        errors = []
-        
-        for row_idx, value in enumerate(df[col_name]):
-            if pd.isna(value):
-                continue
-            
-            # Try to convert to numeric
-            try:
-                numeric_value = pd.to_numeric(value, errors='raise')
-                
-                # Check for reasonable ranges
-                if abs(numeric_value) > 1e12:  # 1 trillion
-                    errors.append(ValidationError(
-                        row_idx + 1,
-                        col_name,
-                        f"Value {numeric_value} seems unusually large",
-                        "warning"
-                    ))
-                
-            except (ValueError, TypeError):
-                errors.append(ValidationError(
-                    row_idx + 1,
-                    col_name,
-                    f"Invalid numeric value: '{value}'",
-                    "error"
-                ))
-        
+        values = df.iloc[:, col_index]
+        numeric_values = pd.to_numeric(values, errors='coerce')
+        present = values.notna().to_numpy()
+        
+        invalid = present & numeric_values.isna().to_numpy()
+        # Check for reasonable ranges
+        too_large = (numeric_values.abs() > 1e12).to_numpy()  # 1 trillion
+        
+        errors = self._row_errors(
+            invalid, col_name, "error", "invalid numeric values",
+            lambda row: f"Invalid numeric value: '{values.iloc[row]}'", tally, row_offset
+        )
+        errors.extend(self._row_errors(
+            too_large, col_name, "warning", "unusually large values",
+            lambda row: f"Value {pd.to_numeric(values.iloc[row])} seems unusually large", tally, row_offset
+        ))
         return errors
     
-    def _validate_date_column(self, df: pd.DataFrame, col_name: str, col_index: int) -> List[ValidationError]:
+    def _validate_date_column(self, df: pd.DataFrame, col_name: str, col_index: int,
+                              tally: Optional[Dict[tuple, int]] = None, row_offset: int = 0) -> List[ValidationError]:
         """Validate date column."""
-        errors = []
-        
-        for row_idx, value in enumerate(df[col_name]):
-            if pd.isna(value):
-                continue
-            
-            # Try to parse as date
+        values = df.iloc[:, col_index]
+        parsed_dates = self._parse_dates(values)
+        present = values.notna().to_numpy()
+        
+        invalid = present & parsed_dates.isna().to_numpy()
+        # Check if date is in reasonable range
+        current_year = datetime.now().year
+        years = parsed_dates.dt.year
+        out_of_range = ((years < 1900) | (years > current_year + 10)).to_numpy()
+        
+        errors = self._row_errors(
+            invalid, col_name, "error", "invalid dates",
+            lambda row: f"Invalid date format: '{values.iloc[row]}'", tally, row_offset
+        )
+        errors.extend(self._row_errors(
+            out_of_range, col_name, "warning", "dates outside reasonable range",
+            lambda row: f"Date {parsed_dates.iloc[row].strftime('%Y-%m-%d')} is outside reasonable range",
+            tally, row_offset
+        ))
+        return errors
+    
+    def _parse_dates(self, values: pd.Series) -> pd.Series:
+        """Parse a column to datetimes, NaT where a value is not a date."""
+        try:
+            parsed = pd.to_datetime(values, errors='coerce')
+        except (ValueError, TypeError):
+            parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+        
+        # The fast path infers one format for the whole column; values written
+        # in another format are parsed one by one
+        for position in np.flatnonzero((parsed.isna() & values.notna()).to_numpy()):
             try:
-                parsed_date = pd.to_datetime(value, errors='raise')
-                
-                # Check if date is in reasonable range
-                current_year = datetime.now().year
-                if parsed_date.year < 1900 or parsed_date.year > current_year + 10:
-                    errors.append(ValidationError(
-                        row_idx + 1,
-                        col_name,
-                        f"Date {parsed_date.strftime('%Y-%m-%d')} is outside reasonable range",
-                        "warning"
-                    ))
-                
-            except (ValueError, TypeError):
-                errors.append(ValidationError(
-                    row_idx + 1,
-                    col_name,
-                    f"Invalid date format: '{value}'",
-                    "error"
-                ))
-        
+                parsed.iloc[position] = pd.to_datetime(values.iloc[position], errors='raise')
+            except (ValueError, TypeError, OverflowError):
+                continue
+        return parsed
+    
+    def _row_errors(self, mask: np.ndarray, col_name: str, severity: str, rule: str,
+                    message: Callable[[int], str], tally: Optional[Dict[tuple, int]] = None,
+                    row_offset: int = 0) -> List[ValidationError]:
+        """Errors for the first offending rows of a rule plus a count of the rest."""
+        rows = np.flatnonzero(mask)
+        own_tally = tally is None
+        tally = {} if own_tally else tally
+        
+        key = (col_name, severity, rule)
+        listed = tally.get(key, 0)
+        errors = [
+            ValidationError(row_offset + int(row) + 1, col_name, message(int(row)), severity)
+            for row in rows[:max(0, self.max_errors_per_rule - listed)]
+        ]
+        tally[key] = listed + len(rows)
+        
+        if own_tally:
+            errors.extend(self._rule_summaries(tally))
         return errors
     
-    def _validate_data_quality(self, df: pd.DataFrame, category: str) -> List[ValidationError]:
-        """Validate data quality issues."""
-        errors = []
-        
-        # Check for excessive missing values
-        for col in df.columns:
-            missing_pct = df[col].isna().sum() / len(df) * 100
-            if missing_pct > 80:
-                errors.append(ValidationError(
-                    None,
-                    col,
-                    f"Column has {missing_pct:.1f}% missing values",
-                    "warning"
-                ))
-        
-        # Check for duplicate rows
+    def _rule_summaries(self, tally: Dict[tuple, int]) -> List[ValidationError]:
+        """Counts of the rules that had more offending rows than were listed."""
+        return [
+            ValidationError(
+                None,
+                col_name,
+                f"{count} {rule} in total, only the first {self.max_errors_per_rule} rows are listed",
+                severity
+            )
+            for (col_name, severity, rule), count in tally.items() if count > self.max_errors_per_rule
+        ]
+    
+    def _duplicate_rows_errors(self, df: pd.DataFrame) -> List[ValidationError]:
+        """Check for duplicate rows."""
         duplicate_rows = df.duplicated().sum()
         if duplicate_rows > 0:
-            errors.append(ValidationError(
-                None,
-                None,
-                f"Found {duplicate_rows} duplicate rows",
-                "warning"
-            ))
-        
-        # Category-specific quality checks
-        if category == 'revenue':
-            errors.extend(self._validate_revenue_quality(df))
-        elif category == 'expenses':
-            errors.extend(self._validate_expenses_quality(df))
-        elif category == 'cash_flow':
-            errors.extend(self._validate_cash_flow_quality(df))
-        
-        return errors
+            return [self._duplicate_rows_error(duplicate_rows)]
+        return []
     
-    def _validate_revenue_quality(self, df: pd.DataFrame) -> List[ValidationError]:
-        """Validate revenue-specific data quality."""
-        errors = []
-        
-        # Find amount column
-        amount_cols = [col for col in df.columns if any(keyword in col.lower() for keyword in ['amount', 'revenue', 'sales'])]
-        
-        if amount_cols:
-            amount_col = amount_cols[0]
-            numeric_amounts = pd.to_numeric(df[amount_col], errors='coerce')
-            
-            # Check for negative revenue
-            negative_revenue = numeric_amounts < 0
-            if negative_revenue.any():
-                negative_rows = df[negative_revenue].index + 1
-                errors.append(ValidationError(
-                    None,
-                    amount_col,
-                    f"Found negative revenue values in rows: {list(negative_rows)[:5]}",
-                    "warning"
-                ))
-            
-            # Check for zero revenue
-            zero_revenue = numeric_amounts == 0
-            if zero_revenue.sum() > len(df) * 0.5:  # More than 50% zeros
-                errors.append(ValidationError(
-                    None,
-                    amount_col,
-                    "More than 50% of revenue values are zero",
-                    "warning"
-                ))
-        
-        return errors
+    def _duplicate_rows_error(self, count: int, checked_rows: Optional[int] = None) -> ValidationError:
+        if checked_rows is not None:
+            return ValidationError(None, None, f"Found {count} duplicate rows in the first {checked_rows:,} rows",
+                                   "warning")
+        return ValidationError(None, None, f"Found {count} duplicate rows", "warning")
     
-    def _validate_expenses_quality(self, df: pd.DataFrame) -> List[ValidationError]:
-        """Validate expenses-specific data quality."""
-        errors = []
-        
-        # Find amount column
-        amount_cols = [col for col in df.columns if any(keyword in col.lower() for keyword in ['amount', 'expense', 'cost'])]
-        
-        if amount_cols:
-            amount_col = amount_cols[0]
-            numeric_amounts = pd.to_numeric(df[amount_col], errors='coerce')
-            
-            # Check for negative expenses (might be refunds, but flag as warning)
-            negative_expenses = numeric_amounts < 0
-            if negative_expenses.any():
-                negative_rows = df[negative_expenses].index + 1
-                errors.append(ValidationError(
-                    None,
-                    amount_col,
-                    f"Found negative expense values in rows: {list(negative_rows)[:5]} (may be refunds)",
-                    "warning"
-                ))
-        
-        return errors
+    def _sign_check_columns(self, columns, category: str) -> List[Tuple[str, str, str]]:
+        """(column, label, note) of the columns checked for negative values."""
+        checks = self.sign_checks.get(category, [])
+        found = []
+        for keywords, label, note in checks:
+            matches = [col for col in columns if any(keyword in col.lower() for keyword in keywords)]
+            if not matches:
+                # Cash flow checks need both the inflow and the outflow column
+                return []
+            found.append((matches[0], label, note))
+        return found
     
-    def _validate_cash_flow_quality(self, df: pd.DataFrame) -> List[ValidationError]:
-        """Validate cash flow-specific data quality."""
-        errors = []
-        
-        # Find inflow and outflow columns
-        inflow_cols = [col for col in df.columns if any(keyword in col.lower() for keyword in ['inflow', 'income', 'receipts'])]
-        outflow_cols = [col for col in df.columns if any(keyword in col.lower() for keyword in ['outflow', 'payments', 'expenses'])]
-        
-        if inflow_cols and outflow_cols:
-            inflow_col = inflow_cols[0]
-            outflow_col = outflow_cols[0]
-            
-            numeric_inflows = pd.to_numeric(df[inflow_col], errors='coerce')
-            numeric_outflows = pd.to_numeric(df[outflow_col], errors='coerce')
-            
-            # Check for negative inflows
-            negative_inflows = numeric_inflows < 0
-            if negative_inflows.any():
-                negative_rows = df[negative_inflows].index + 1
-                errors.append(ValidationError(
-                    None,
-                    inflow_col,
-                    f"Found negative inflow values in rows: {list(negative_rows)[:5]}",
-                    "warning"
-                ))
-            
-            # Check for negative outflows
-            negative_outflows = numeric_outflows < 0
-            if negative_outflows.any():
-                negative_rows = df[negative_outflows].index + 1
-                errors.append(ValidationError(
-                    None,
-                    outflow_col,
-                    f"Found negative outflow values in rows: {list(negative_rows)[:5]}",
-                    "warning"
-                ))
-        
-        return errors
+    def _negative_values_error(self, col: str, label: str, note: str, rows: List[int]) -> ValidationError:
+        return ValidationError(None, col, f"Found negative {label} values in rows: {rows}{note}", "warning")
+    
+    def _zero_revenue_error(self, col: str) -> ValidationError:
+        return ValidationError(None, col, "More than 50% of revenue values are zero", "warning")
     
     def suggest_corrections(self, df: pd.DataFrame, category: str) -> List[Dict[str, Any]]:
         """Suggest corrections for common data issues."""
@@ -378,4 +463,140 @@ class ValidationService:
         if len(union) == 0:
             return 0.0
         
-        return len(intersection) / len(union)
\ No newline at end of file
+        return len(intersection) / len(union)
+
+class ChunkedValidation:
+    """
+    validate_financial_data for a file read in chunks.
+    
+    Row rules run on each chunk as it arrives; missing values, duplicate rows
+    and the category checks are accumulated and reported by result(). The
+    row limit of whole-file validation only applies when max_rows is given.
+    Duplicates are looked for in the first MAX_DUPLICATE_CHECK_ROWS rows.
+    """
+    
+    def __init__(self, service: ValidationService, category: str, max_rows: Optional[int] = None):
+        self.service = service
+        self.category = category
+        self.max_rows = max_rows
+        self.rows = 0
+        self._header_errors: List[ValidationError] = []
+        self._required_errors: List[ValidationError] = []
+        self._row_errors: List[ValidationError] = []
+        self._tally: Dict[tuple, int] = {}
+        self._missing: Optional[pd.Series] = None
+        self._row_hashes = np.empty(0, dtype=np.uint64)  # sorted, distinct
+        self._hashed_rows = 0
+        self._sign_columns: List[Tuple[str, str, str]] = []
+        self._negative_rows: Dict[str, List[int]] = {}
+        self._zero_counts: Dict[str, int] = {}
+    
+    def add(self, chunk: pd.DataFrame) -> None:
+        """Validate the next chunk of rows."""
+        if chunk.empty:
+            return
+        
+        checked = self.category in self.service.required_columns
+        if self._missing is None:
+            # Header checks once, on the first chunk
+            self._header_errors = self.service._validate_basic_structure(chunk, max_rows=None)
+            if checked:
+                self._required_errors = self.service._validate_required_columns(chunk, self.category)
+            self._sign_columns = self.service._sign_check_columns(chunk.columns, self.category)
+            self._missing = pd.Series(0, index=chunk.columns)
+        
+        if checked:
+            self._row_errors.extend(
+                self.service._validate_data_types(chunk, self.category, tally=self._tally, row_offset=self.rows)
+            )
+            self._missing = self._missing.add(chunk.isna().sum(), fill_value=0)
+            self._add_row_hashes(chunk)
+            
+            for col, label, _ in self._sign_columns:
+                numeric_values = pd.to_numeric(chunk[col], errors='coerce')
+                rows = self._negative_rows.setdefault(col, [])
+                if len(rows) < 5:
+                    negative = np.flatnonzero((numeric_values < 0).to_numpy())[:5 - len(rows)]
+                    rows.extend(int(row) + self.rows + 1 for row in negative)
+                self._zero_counts[col] = self._zero_counts.get(col, 0) + int((numeric_values == 0).sum())
+        
+        self.rows += len(chunk)
+    
+    def _add_row_hashes(self, chunk: pd.DataFrame) -> None:
+        """Merge the hashes of rows not seen before into the sorted distinct hashes."""
+        room = MAX_DUPLICATE_CHECK_ROWS - self._hashed_rows
+        if room <= 0:
+            return
+        hashes = np.unique(pd.util.hash_pandas_object(chunk.iloc[:room], index=False).to_numpy())
+        positions = np.searchsorted(self._row_hashes, hashes)
+        if len(self._row_hashes):
+            seen = self._row_hashes[np.minimum(positions, len(self._row_hashes) - 1)] == hashes
+        else:
+            seen = np.zeros(len(hashes), dtype=bool)
+        self._row_hashes = np.insert(self._row_hashes, positions[~seen], hashes[~seen])
+        self._hashed_rows += min(room, len(chunk))
+    
+    @property
+    def error_count(self) -> int:
+        """Errors and warnings found in the rows validated so far."""
+        return len(self._header_errors) + len(self._required_errors) + len(self._row_errors)
+    
+    def result(self) -> List[Dict[str, Any]]:
+        """Errors of the whole file, in the format of validate_financial_data."""
+        if self.rows == 0:
+            return [ValidationError(None, None, "File is empty", "error").to_dict()]
+        return self.by_column().errors()
+    
+    def by_column(self) -> Optional[ValidationResult]:
+        """Errors of the whole file kept per column, None if no rows were added."""
+        if self.rows == 0:
+            return None
+        
+        names = list(self._missing.index)
+        positions = {}
+        for i, col in enumerate(names):
+            positions.setdefault(col, i)
+        columns = [_column_entry() for _ in names]
+        
+        structure = list(self._header_errors)
+        if self.max_rows is not None and self.rows > self.max_rows:
+            structure.insert(0, ValidationError(None, None, "File contains too many rows (max 100,000)", "error"))
+        table = {
+            'structure': [error.to_dict() for error in structure],
+            'required': [error.to_dict() for error in self._required_errors],
+            'duplicates': [],
+        }
+        
+        if self.category not in self.service.required_columns:
+            return ValidationResult(self.category, names, columns, table, [], self.max_rows)
+        
+        # Row errors ordered as in whole-file validation: errors before
+        # warnings, each rule's summary after its rows
+        row_errors = self._row_errors + self.service._rule_summaries(self._tally)
+        row_errors.sort(key=lambda error: (error.severity == 'warning', error.row is None))
+        for error in row_errors:
+            columns[positions[error.column]]['types'].append(error.to_dict())
+        
+        # Check for excessive missing values
+        for i, (col, missing) in enumerate(self._missing.items()):
+            missing_pct = missing / self.rows * 100
+            if missing_pct > 80:
+                columns[i]['missing'].append(
+                    ValidationError(None, col, f"Column has {missing_pct:.1f}% missing values", "warning").to_dict()
+                )
+        
+        # Check for duplicate rows
+        duplicate_rows = self._hashed_rows - len(self._row_hashes)
+        if duplicate_rows > 0:
+            checked_rows = self._hashed_rows if self._hashed_rows < self.rows else None
+            table['duplicates'].append(self.service._duplicate_rows_error(duplicate_rows, checked_rows).to_dict())
+        
+        for col, label, note in self._sign_columns:
+            sign = columns[positions[col]]['sign']
+            if self._negative_rows[col]:
+                sign.append(self.service._negative_values_error(col, label, note, self._negative_rows[col]).to_dict())
+            if label == 'revenue' and self._zero_counts[col] > self.rows * 0.5:
+                sign.append(self.service._zero_revenue_error(col).to_dict())
+        
+        return ValidationResult(self.category, names, columns, table, [col for col, _, _ in self._sign_columns],
+                                self.max_rows)
@@ -0,0 +1,328 @@
+"""
+Historical-simulation VaR / Expected Shortfall
+Revalues a linear portfolio of risk-factor sensitivities on every stored
+historical day (FX quote log returns, key rate changes) in one matrix
+product and takes the loss tail with np.partition. Plain historical
+simulation (HS) uses the raw factor moves; filtered historical simulation
+(FHS) rescales them by EWMA volatility to today's level.
+"""
+
+import copy
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.cbr_key_rate import CBRKeyRate
+from app.models.market_quote import MarketQuote
+from app.services.curve_store import Curve, to_day_number
+from app.services.market_analytics import EWMA_LAMBDA
+
+logger = logging.getLogger(__name__)
+
+KEY_RATE_FACTOR = 'key_rate'
+HS = 'hs'
+FHS = 'fhs'
+MIN_OBSERVATIONS = 20
+
+
+@dataclass(frozen=True)
+class RiskPortfolio:
+    """
+    Linear portfolio: P&L of a day = sum of sensitivity x factor move
+
+    Sensitivities are in RUB per unit move: per unit log return for FX
+    symbols ('USD/RUB'), per 1.0 absolute change of the key rate for 'key_rate'.
+    """
+    sensitivities: Dict[str, float]
+    version: Hashable = None  # e.g. upload version; defaults to the sensitivities themselves
+
+    @property
+    def factors(self) -> List[str]:
+        return sorted(factor for factor, value in self.sensitivities.items() if value)
+
+    @property
+    def cache_version(self) -> Hashable:
+        if self.version is not None:
+            return self.version
+        return tuple(sorted(self.sensitivities.items()))
+
+    def sensitivity_vector(self) -> np.ndarray:
+        return np.array([self.sensitivities[factor] for factor in self.factors], dtype=np.float64)
+
+
+@dataclass
+class VaRResult:
+    """VaR and ES as positive losses in RUB"""
+    value_at_risk: float
+    expected_shortfall: float
+    confidence: float
+    window: int
+    method: str
+    observations: int
+    as_of: Optional[date]
+
+
+def tail_metrics(pnl: np.ndarray, confidence: float) -> Tuple[float, float]:
+    """
+    VaR and ES from a P&L sample with a linear-time selection
+
+    The k + 1 worst outcomes, k = floor((1 - confidence) * n), form the tail;
+    VaR is the best of them and ES their mean, both reported as losses.
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    k = min(int(np.floor((1 - confidence) * len(pnl))), len(pnl) - 1)
+    tail = np.partition(pnl, k)[:k + 1]
+    return float(-tail[k]), float(-tail.mean())
+
+
+def _fx_factors(factors: List[str]) -> List[str]:
+    return [factor for factor in factors if factor != KEY_RATE_FACTOR]
+
+
+def _key_rate_curve(db: Session) -> Optional[Curve]:
+    rows = db.query(CBRKeyRate.effective_date, CBRKeyRate.rate).order_by(CBRKeyRate.effective_date).all()
+    if not rows:
+        return None
+    return Curve(
+        days=np.array([to_day_number(row.effective_date) for row in rows], dtype=np.int64),
+        rates=np.array([row.rate for row in rows], dtype=np.float64),
+    )
+
+
+def latest_history_date(db: Session, factors: List[str]) -> Optional[date]:
+    """Last day with stored data: latest FX quote date, last business day for key-rate-only portfolios"""
+    fx = _fx_factors(factors)
+    if not fx:
+        return pd.bdate_range(end=date.today(), periods=1)[0].date()
+    return db.query(func.max(MarketQuote.quote_date)).filter(MarketQuote.symbol.in_(fx)).scalar()
+
+
+def history_version(db: Session, factors: List[str], up_to: date) -> tuple:
+    """Cheap validator of the stored history up to and including a day"""
+    version = ()
+    fx = _fx_factors(factors)
+    if fx:
+        version += tuple(db.query(
+            func.count(MarketQuote.id), func.max(MarketQuote.quote_date), func.max(MarketQuote.updated_at)
+        ).filter(MarketQuote.symbol.in_(fx), MarketQuote.quote_date <= up_to).one())
+    if KEY_RATE_FACTOR in factors:
+        version += tuple(db.query(
+            func.count(CBRKeyRate.id), func.max(CBRKeyRate.effective_date), func.max(CBRKeyRate.updated_at)
+        ).filter(CBRKeyRate.effective_date <= datetime.combine(up_to, dt_time.max)).one())
+    return version
+
+
+def load_factor_history(db: Session, factors: List[str], window: Optional[int] = None,
+                        after: Optional[date] = None) -> Tuple[List[date], np.ndarray]:
+    """
+    Daily factor moves, one column per factor
+
+    FX days are the stored quote dates (gaps forward-filled); key-rate-only
+    portfolios use business days. Either the last `window` moves or all
+    moves dated after `after` are returned.
+
+    Returns:
+        (dates, moves) where moves[i] is the move from the previous day to dates[i]
+    """
+    fx = _fx_factors(factors)
+    if fx:
+        if after is not None:
+            start = after
+        else:
+            recent = db.query(MarketQuote.quote_date).filter(MarketQuote.symbol.in_(fx)).distinct().order_by(
+                MarketQuote.quote_date.desc()
+            ).limit(window + 1).all()
+            if not recent:
+                return [], np.empty((0, len(factors)))
+            start = recent[-1][0]
+
+        rows = db.query(MarketQuote.quote_date, MarketQuote.symbol, MarketQuote.value).filter(
+            MarketQuote.symbol.in_(fx), MarketQuote.quote_date >= start
+        ).all()
+        frame = pd.DataFrame(rows, columns=['quote_date', 'symbol', 'value'])
+        prices = frame.pivot(index='quote_date', columns='symbol', values='value').reindex(columns=fx)
+        # Symbols without any stored quote contribute no moves
+        unpriced = [symbol for symbol in fx if prices[symbol].isna().all()]
+        if unpriced:
+            logger.info(f"No stored quotes for {', '.join(unpriced)}, treated as constant")
+            prices[unpriced] = 1.0
+        prices = prices.sort_index().ffill().dropna()
+        calendar = list(prices.index)
+        fx_moves = np.diff(np.log(prices.to_numpy(dtype=np.float64)), axis=0)
+    else:
+        today = date.today()
+        if after is not None:
+            days = pd.bdate_range(start=after, end=today)
+        else:
+            days = pd.bdate_range(end=today, periods=window + 1)
+        calendar = [day.date() for day in days]
+        fx_moves = np.empty((max(len(calendar) - 1, 0), 0))
+
+    if len(calendar) < 2:
+        return [], np.empty((0, len(factors)))
+
+    columns = []
+    for factor in factors:
+        if factor == KEY_RATE_FACTOR:
+            curve = _key_rate_curve(db)
+            if curve is None:
+                columns.append(np.zeros(len(calendar) - 1))
+                continue
+            levels = curve.rates_on(calendar) / 100
+            columns.append(np.nan_to_num(np.diff(levels)))
+        else:
+            columns.append(fx_moves[:, fx.index(factor)])
+    return calendar[1:], np.column_stack(columns)
+
+
+class HistoryWindow:
+    """
+    Rolling window of factor moves with EWMA volatility state for FHS
+
+    Standardized moves z[i] = moves[i] / sigma[i] use the EWMA volatility
+    forecast made before day i; appending a day only standardizes that day.
+    """
+
+    def __init__(self, dates: List[date], moves: np.ndarray, window: int, lam: float = EWMA_LAMBDA):
+        self.window = window
+        self.lam = lam
+        self.dates: List[date] = []
+        self.moves = np.empty((0, moves.shape[1]))
+        self.standardized = np.empty((0, moves.shape[1]))
+        # Seed the variance with the sample second moment of the loaded history
+        self.variance = np.mean(moves ** 2, axis=0) if len(moves) else np.zeros(moves.shape[1])
+        self.append(dates, moves)
+
+    def append(self, dates: List[date], moves: np.ndarray) -> None:
+        standardized = np.empty_like(moves)
+        variance = self.variance
+        for i, row in enumerate(moves):
+            sigma = np.sqrt(variance)
+            standardized[i] = np.divide(row, sigma, out=np.zeros_like(row), where=sigma > 0)
+            variance = self.lam * variance + (1 - self.lam) * row * row
+        self.variance = variance
+
+        self.dates = (self.dates + list(dates))[-self.window:]
+        self.moves = np.vstack([self.moves, moves])[-self.window:]
+        self.standardized = np.vstack([self.standardized, standardized])[-self.window:]
+
+    @property
+    def last_date(self) -> Optional[date]:
+        return self.dates[-1] if self.dates else None
+
+    def scenario_moves(self, method: str) -> np.ndarray:
+        """Factor moves to revalue: raw (HS) or rescaled to current EWMA volatility (FHS)"""
+        if method == FHS:
+            return self.standardized * np.sqrt(self.variance)
+        return self.moves
+
+
+@dataclass
+class _EngineState:
+    history: HistoryWindow
+    version: tuple
+    result: Optional[VaRResult] = field(default=None)
+
+
+class VaREngine:
+    """
+    Historical-simulation VaR/ES with results cached per
+    (portfolio version, window, confidence, method)
+
+    A cached entry is reused while the stored history is unchanged. When new
+    days are appended after the cached window, only those days are loaded and
+    revalued; any change to older history triggers a full rebuild.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._states: "OrderedDict[Hashable, _EngineState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compute(self, db: Session, portfolio: RiskPortfolio, window: Optional[int] = None,
+                confidence: Optional[float] = None, method: Optional[str] = None,
+                incremental: bool = True) -> Optional[VaRResult]:
+        """
+        VaR and ES of the portfolio
+
+        Returns:
+            VaRResult, or None if the portfolio has no factors or fewer than
+            MIN_OBSERVATIONS historical days are stored
+        """
+        window = window or settings.var_window
+        confidence = confidence or settings.var_confidence
+        method = method or settings.var_method
+        if method not in (HS, FHS):
+            raise ValueError(f"Unknown VaR method: {method}")
+
+        factors = portfolio.factors
+        if not factors:
+            return None
+
+        key = (portfolio.cache_version, window, confidence, method)
+        with self._lock:
+            state = self._states.get(key)
+
+        latest = latest_history_date(db, factors)
+        if latest is None:
+            return None
+
+        if state is not None and history_version(db, factors, state.history.last_date) == state.version:
+            if state.history.last_date >= latest:
+                return state.result
+            if incremental:
+                dates, moves = load_factor_history(db, factors, after=state.history.last_date)
+                if dates:
+                    # Extend a copy so concurrent readers of the cached state are unaffected
+                    history = copy.copy(state.history)
+                    history.append(dates, moves)
+                    logger.info(f"VaR history extended by {len(dates)} day(s) to {history.last_date}")
+                    return self._finish(db, key, _EngineState(history=history, version=()), portfolio,
+                                        confidence, method)
+
+        dates, moves = load_factor_history(db, factors, window=window)
+        if len(dates) < MIN_OBSERVATIONS:
+            logger.info(f"Not enough history for VaR: {len(dates)} days")
+            return None
+        state = _EngineState(history=HistoryWindow(dates, moves, window), version=())
+        return self._finish(db, key, state, portfolio, confidence, method)
+
+    def _finish(self, db: Session, key: Hashable, state: _EngineState, portfolio: RiskPortfolio,
+                confidence: float, method: str) -> VaRResult:
+        history = state.history
+        pnl = history.scenario_moves(method) @ portfolio.sensitivity_vector()
+        value_at_risk, expected_shortfall = tail_metrics(pnl, confidence)
+        state.result = VaRResult(
+            value_at_risk=value_at_risk,
+            expected_shortfall=expected_shortfall,
+            confidence=confidence,
+            window=history.window,
+            method=method,
+            observations=len(pnl),
+            as_of=history.last_date,
+        )
+        state.version = history_version(db, portfolio.factors, history.last_date)
+
+        with self._lock:
+            self._states[key] = state
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+        return state.result
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+
+# Singleton instance
+var_engine = VaREngine()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark batch uploads: files parsed and validated one after another, as with
+separate POST /upload requests, against the process pool of POST /upload/batch
+
+Usage: python benchmark_batch_upload.py [--files 12] [--rows 50000] [--workers 4]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+import pandas as pd
+
+from app.services.batch_upload import parse_batch
+
+
+def make_files(count: int, rows: int):
+    """Month-end style CSV files with a few bad values each"""
+    rng = np.random.default_rng(42)
+    files = []
+    for i in range(count):
+        df = pd.DataFrame({
+            'date': pd.date_range('2024-01-01', periods=rows, freq='min').strftime('%Y-%m-%d'),
+            'amount': rng.normal(1000, 250, rows).round(2).astype(str),
+            'customer': [f'customer {n}' for n in rng.integers(0, 500, rows)],
+            'description': 'invoice',
+        })
+        df.loc[rng.integers(0, rows, 20), 'amount'] = 'n/a'
+        files.append((f'ledger_{i:02d}.csv', df.to_csv(index=False).encode('utf-8')))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--files', type=int, default=12)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args()
+
+    files = make_files(args.files, args.rows)
+    categories = ['revenue'] * len(files)
+    size_mb = sum(len(content) for _, content in files) / (1024 * 1024)
+    print(f"{args.files} files x {args.rows} rows ({size_mb:.1f}MB), {args.workers} workers")
+
+    started = time.perf_counter()
+    sequential = parse_batch(files, categories, max_workers=1)
+    sequential_time = time.perf_counter() - started
+    print(f"Sequential: {sequential_time:.2f}s")
+
+    started = time.perf_counter()
+    concurrent = parse_batch(files, categories, max_workers=args.workers)
+    concurrent_time = time.perf_counter() - started
+    print(f"Batch:      {concurrent_time:.2f}s")
+
+    assert [p.validation_errors for p in sequential] == [p.validation_errors for p in concurrent]
+    print(f"Speedup:    {sequential_time / concurrent_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark Excel reading engines over the .xlsx fixtures in this directory and
+a generated ledger, checking that both engines return identical DataFrames
+
+Usage: python benchmark_excel_reader.py [--rows 20000] [--repeat 5]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+import pandas as pd
+
+from app.services.excel_reader import ExcelReader, python_calamine
+
+
+def timed(reader: ExcelReader, path: str, repeat: int, **kwargs):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        df = reader.read(path, **kwargs)
+        best = min(best, time.perf_counter() - started)
+    return df, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=20000, help="rows of the generated ledger")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if python_calamine is None:
+        sys.exit("python-calamine is not installed, nothing to compare")
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    paths = sorted(glob.glob(os.path.join(directory, '*.xlsx')))
+
+    ledger = os.path.join(tempfile.mkdtemp(), 'ledger.xlsx')
+    rng = np.random.default_rng(42)
+    pd.DataFrame({
+        'date': pd.date_range('2024-01-01', periods=args.rows, freq='h'),
+        'amount': rng.normal(1000, 250, args.rows).round(2),
+        'customer': [f'customer {n}' for n in rng.integers(0, 500, args.rows)],
+        'currency': 'RUB',
+    }).to_excel(ledger, index=False)
+    paths.append(ledger)
+
+    calamine, openpyxl = ExcelReader(), ExcelReader(prefer_calamine=False)
+    totals = [0.0, 0.0]
+    print(f"{'file':<36}{'openpyxl':>10}{'calamine':>10}{'speedup':>9}")
+    for path in paths:
+        expected, openpyxl_time = timed(openpyxl, path, args.repeat, header=None)
+        actual, calamine_time = timed(calamine, path, args.repeat, header=None)
+        pd.testing.assert_frame_equal(actual, expected)
+        totals[0] += openpyxl_time
+        totals[1] += calamine_time
+        print(f"{os.path.basename(path):<36}{openpyxl_time * 1000:>8.1f}ms{calamine_time * 1000:>8.1f}ms"
+              f"{openpyxl_time / calamine_time:>8.1f}x")
+
+    print(f"{'total':<36}{totals[0] * 1000:>8.1f}ms{totals[1] * 1000:>8.1f}ms{totals[0] / totals[1]:>8.1f}x")
+    print("All frames identical across engines")
+
+
+if __name__ == "__main__":
+    main()
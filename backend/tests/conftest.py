@@ -0,0 +1,42 @@
+"""
+Shared fixtures: in-memory SQLite databases holding only the tables a test needs
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.services.upload_frames import upload_frame_cache
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "tables(*tables): tables created in the test database, all without it")
+
+
+@pytest.fixture
+def session_factory(request):
+    """
+    Session factory over a fresh in-memory database
+
+    Tables are those of the closest tables marker, e.g. a module's
+    pytestmark = pytest.mark.tables(DataUpload.__table__, DataUploadBlob.__table__).
+    All connections share one database, so sessions can be used from other
+    threads (jobs, test clients).
+    """
+    marker = request.node.get_closest_marker("tables")
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=list(marker.args) if marker else None)
+    # Every test database reuses the same upload ids
+    upload_frame_cache.invalidate()
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    """Session over the test database"""
+    session = session_factory()
+    yield session
+    session.close()
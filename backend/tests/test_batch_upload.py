@@ -0,0 +1,133 @@
+"""
+Tests for batch uploads
+"""
+
+import asyncio
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+from starlette.datastructures import UploadFile
+
+from app.models.data_upload import DataUpload, DataUploadBlob
+from app.services.batch_upload import (
+    BatchParser, BundleTooLarge, batch_report, expand_bundle, read_batch_files, store_batch
+)
+from app.services.dataset_store import JSON, DatasetStore
+
+
+def _csv(rows: int, amount: str = '100') -> bytes:
+    return pd.DataFrame({
+        'date': pd.date_range('2024-01-01', periods=rows, freq='D').strftime('%Y-%m-%d'),
+        'amount': [amount] * rows,
+        'customer': [f'customer {i}' for i in range(rows)],
+    }).to_csv(index=False).encode('utf-8')
+
+
+def _zip(files, compression=zipfile.ZIP_DEFLATED) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression) as archive:
+        for name, content in files:
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+pytestmark = pytest.mark.tables(DataUpload.__table__, DataUploadBlob.__table__)
+
+
+def test_zip_archives_are_expanded():
+    archive = _zip([
+        ('close/revenue.csv', _csv(5)),
+        ('close/', b''),
+        ('__MACOSX/close/._revenue.csv', b'junk'),
+        ('close/.DS_Store', b'junk'),
+    ])
+
+    bundle = expand_bundle([('march.zip', archive), ('expenses.csv', _csv(3))], 1 << 20, 1 << 20)
+
+    assert [name for name, _ in bundle] == ['close/revenue.csv', 'expenses.csv']
+    assert bundle[0][1] == _csv(5)
+
+
+def test_bundle_size_is_checked_before_unzipping():
+    archive = _zip([('big.csv', b'0' * 5000)])
+
+    with pytest.raises(BundleTooLarge):
+        expand_bundle([('big.zip', archive)], max_file_size=1000, max_total_size=1 << 20)
+    with pytest.raises(BundleTooLarge):
+        expand_bundle([('a.csv', b'0' * 600), ('b.csv', b'0' * 600)], max_file_size=1000, max_total_size=1000)
+    with pytest.raises(ValueError):
+        expand_bundle([('broken.zip', b'not a zip')], 1000, 1000)
+
+
+def test_parts_are_size_checked_while_read():
+    class _Part(UploadFile):
+        async def read(self, size=-1):
+            self.reads += 1
+            return await super().read(size)
+
+    big = _Part(io.BytesIO(b'0' * (3 << 20)), filename='big.csv')
+    big.reads = 0
+    with pytest.raises(BundleTooLarge, match="'big.csv' exceeds"):
+        asyncio.run(read_batch_files([big], max_file_size=1 << 20, max_total_size=10 << 20))
+    assert big.reads == 2
+
+    parts = [UploadFile(io.BytesIO(_csv(5)), filename='a.csv'), UploadFile(io.BytesIO(_zip([])), filename='b.zip')]
+    assert [name for name, _ in asyncio.run(read_batch_files(parts, 1000, 1 << 20))] == ['a.csv', 'b.zip']
+
+
+@pytest.mark.parametrize('compression', [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_corrupt_archive_member_is_rejected(compression):
+    archive = bytearray(_zip([('revenue.csv', _csv(50))], compression))
+    data_start = archive.index(b'revenue.csv') + len('revenue.csv')
+    archive[data_start + 10] ^= 0xFF
+
+    with pytest.raises(ValueError, match='cannot be extracted'):
+        expand_bundle([('march.zip', bytes(archive))], 1 << 20, 1 << 20)
+
+
+def test_batch_is_parsed_concurrently_and_stored_in_one_transaction(db, tmp_path, monkeypatch):
+    bundle = [
+        ('revenue.csv', _csv(20)),
+        ('expenses.csv', _csv(10, amount='5')),
+        ('bad.csv', _csv(4, amount='oops')),
+        ('notes.txt', b'hello'),
+    ]
+
+    monkeypatch.setattr('os.cpu_count', lambda: 2)
+    parser = BatchParser(max_workers=2, max_batches=1)
+    try:
+        parsed = parser.parse(bundle, ['revenue', 'expenses', 'revenue', 'revenue'])
+    finally:
+        parser.shutdown()
+    sequential = BatchParser(max_workers=1, max_batches=1).parse(bundle, ['revenue', 'expenses', 'revenue', 'revenue'])
+    assert [p.validation_errors for p in parsed] == [p.validation_errors for p in sequential]
+
+    uploads = store_batch(db, 1, parsed, store=DatasetStore(str(tmp_path), storage=JSON))
+    report = batch_report(uploads, parsed)
+
+    assert db.query(DataUpload).count() == 4
+    assert (report['file_count'], report['completed'], report['failed'], report['total_rows']) == (4, 2, 2, 34)
+    assert [f['status'] for f in report['files']] == ['completed', 'completed', 'failed', 'failed']
+    assert report['files'][2]['validation_errors'][0]['message'] == "Invalid numeric value: 'oops'"
+    assert report['files'][3]['error'] == "Only CSV and Excel files are supported"
+    assert uploads[1].category == 'expenses' and uploads[1].name == 'expenses'
+    assert len(uploads[0].raw_data) == 20
+
+
+def test_failed_batch_writes_nothing(db, tmp_path, monkeypatch):
+    store = DatasetStore(str(tmp_path), storage=JSON)
+    parsed = BatchParser(max_workers=1, max_batches=1).parse([('a.csv', _csv(3)), ('b.csv', _csv(3))],
+                                                             ['revenue', 'revenue'])
+
+    def fail_second(upload, df, calls=[]):
+        calls.append(upload)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        return []
+    monkeypatch.setattr(store, 'store_upload_rows', fail_second)
+
+    with pytest.raises(OSError):
+        store_batch(db, 1, parsed, store=store)
+    assert db.query(DataUpload).count() == 0
@@ -0,0 +1,79 @@
+"""
+Tests for the upstream circuit breaker and latency budget
+"""
+
+import time
+
+import pytest
+
+from app.core.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    LatencyBudgetExceeded,
+    latency_budget,
+)
+
+
+def _fail():
+    raise ConnectionError("upstream down")
+
+
+def _breaker(**kwargs) -> CircuitBreaker:
+    options = dict(timeout=1.0, failure_rate_threshold=0.5, window_size=4, minimum_calls=4, open_seconds=0.05)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+
+def test_opens_on_failure_rate_and_fails_fast():
+    breaker = _breaker()
+    breaker.call(lambda: "ok")
+    breaker.call(lambda: "ok")
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+
+    assert breaker.state == CircuitState.OPEN
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: calls.append(1))
+    assert calls == []
+    assert breaker.metrics()["rejected"] == 1
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = _breaker()
+    for _ in range(4):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+
+    time.sleep(0.06)
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    assert breaker.state == CircuitState.OPEN
+
+    time.sleep(0.06)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.metrics()["opened"] == 2
+
+
+def test_slow_calls_count_as_failures():
+    breaker = _breaker(slow_call_threshold=0.01)
+    for _ in range(4):
+        breaker.call(time.sleep, 0.02)
+
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.metrics()["slow_calls"] == 4
+
+
+def test_latency_budget_caps_timeout():
+    breaker = _breaker(timeout=10.0)
+
+    assert breaker.effective_timeout(30) == 10.0
+    with latency_budget(0.5):
+        assert breaker.effective_timeout(30) <= 0.5
+    with latency_budget(0):
+        with pytest.raises(LatencyBudgetExceeded):
+            breaker.effective_timeout(30)
@@ -0,0 +1,108 @@
+"""
+Tests for the upload content index
+"""
+
+import asyncio
+import hashlib
+import io
+
+import pandas as pd
+import pytest
+from fastapi import UploadFile
+
+from app.models.data_upload import DataUpload, DataUploadBlob, DataUploadStatus
+from app.models.upload_content import UploadContent
+from app.services import content_index
+from app.services.content_index import (
+    DATA_UPLOAD, ContentIndex, ParseCache, ParsedUpload, read_and_hash
+)
+
+
+pytestmark = pytest.mark.tables(DataUpload.__table__, DataUploadBlob.__table__, UploadContent.__table__)
+
+
+@pytest.fixture
+def db(db):
+    db.add(DataUpload(id=1, user_id=1, name='Revenue', source_type='csv', category='revenue',
+                      status=DataUploadStatus.COMPLETED))
+    db.commit()
+    return db
+
+
+def test_read_and_hash_matches_sha256(monkeypatch):
+    monkeypatch.setattr(content_index, 'HASH_BLOCK_SIZE', 7)
+    data = bytes(range(256)) * 3
+    upload = UploadFile(file=io.BytesIO(data), filename='data.csv')
+
+    content, digest = asyncio.run(read_and_hash(upload))
+
+    assert content == data
+    assert digest == hashlib.sha256(data).hexdigest()
+
+
+def test_identical_upload_returns_recorded_result(db):
+    index = ContentIndex(db)
+    result = {'upload_id': 1, 'row_count': 3}
+    index.record(1, DATA_UPLOAD, 'abc', [1], result, variant='revenue')
+    db.commit()
+
+    assert index.lookup(1, DATA_UPLOAD, 'abc', variant='revenue') == result
+    # Other users, categories and contents are not matched
+    assert index.lookup(2, DATA_UPLOAD, 'abc', variant='revenue') is None
+    assert index.lookup(1, DATA_UPLOAD, 'abc', variant='expenses') is None
+    assert index.lookup(1, DATA_UPLOAD, 'def', variant='revenue') is None
+
+    # Recording again replaces the entry
+    index.record(1, DATA_UPLOAD, 'abc', [1], {'upload_id': 1, 'row_count': 4}, variant='revenue')
+    db.commit()
+    assert db.query(UploadContent).count() == 1
+    assert index.lookup(1, DATA_UPLOAD, 'abc', variant='revenue')['row_count'] == 4
+
+
+def test_entries_go_stale(db, monkeypatch):
+    index = ContentIndex(db)
+    index.record(1, DATA_UPLOAD, 'abc', [1], {'upload_id': 1})
+    db.commit()
+
+    version = content_index.PARSER_VERSIONS[DATA_UPLOAD]
+    monkeypatch.setitem(content_index.PARSER_VERSIONS, DATA_UPLOAD, version + 1)
+    assert index.lookup(1, DATA_UPLOAD, 'abc') is None
+    monkeypatch.setitem(content_index.PARSER_VERSIONS, DATA_UPLOAD, version)
+    assert index.lookup(1, DATA_UPLOAD, 'abc') is not None
+
+    db.query(DataUpload).delete()
+    db.commit()
+    assert index.lookup(1, DATA_UPLOAD, 'abc') is None
+
+
+def test_corrected_upload_is_forgotten(db):
+    index = ContentIndex(db)
+    index.record(1, DATA_UPLOAD, 'abc', [1], {'upload_id': 1}, variant='revenue')
+    index.record(1, DATA_UPLOAD, 'def', [2], {'upload_id': 2}, variant='revenue')
+    db.commit()
+
+    index.forget(1, DATA_UPLOAD, 1)
+    db.commit()
+
+    assert [entry.content_hash for entry in db.query(UploadContent)] == ['def']
+
+
+def test_parse_cache_is_bounded_and_returns_copies():
+    frame = pd.DataFrame({'amount': range(1000)})
+    nbytes = int(frame.memory_usage(index=True, deep=True).sum())
+    cache = ParseCache(max_bytes=2 * nbytes)
+
+    cache.put('a', 'revenue', ParsedUpload(frame, [], 'utf-8'))
+    parsed = cache.get('a', 'revenue')
+    parsed.frame.loc[0, 'amount'] = -1
+    parsed.validation_errors.append({'row': 1})
+
+    again = cache.get('a', 'revenue')
+    assert again.frame['amount'].iloc[0] == 0
+    assert again.validation_errors == []
+    assert cache.get('a', 'expenses') is None
+
+    cache.put('b', 'revenue', ParsedUpload(frame, [], None))
+    cache.put('c', 'revenue', ParsedUpload(frame, [], None))
+    assert cache.get('a', 'revenue') is None
+    assert cache.get('c', 'revenue') is not None
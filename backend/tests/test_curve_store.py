@@ -0,0 +1,109 @@
+"""
+Tests for the shared memory-mapped rate curve store
+"""
+
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from app.models.cbr_key_rate import CBRKeyRate
+from app.models.ruonia_rate import RuoniaRate
+from app.services import cbr_service
+from app.services.curve_store import Curve, CurveStore, publish_curves, to_day_number, write_curve_store
+
+
+def test_round_trip_with_zero_copy_views(tmp_path):
+    """Curves come back sorted as read-only views into the mapping"""
+    path = str(tmp_path / "curves.bin")
+    write_curve_store(path, {
+        "key_rate": ([date(2024, 7, 29), date(2024, 1, 1)], [18.0, 16.0]),
+        "ruonia": ([date(2025, 1, 1)], [21.0]),
+    })
+
+    store = CurveStore(path)
+    curve = store.get_curve("key_rate")
+
+    assert sorted(store.names()) == ["key_rate", "ruonia"]
+    assert curve.days.tolist() == [to_day_number(date(2024, 1, 1)), to_day_number(date(2024, 7, 29))]
+    assert curve.rates.tolist() == [16.0, 18.0]
+    assert not curve.rates.flags.owndata
+    assert not curve.rates.flags.writeable
+
+
+def test_step_lookup():
+    """A rate applies from its date until the next point"""
+    curve = Curve(
+        days=np.array([to_day_number(date(2024, 1, 1)), to_day_number(date(2024, 7, 29))], dtype="<i4"),
+        rates=np.array([16.0, 18.0]),
+    )
+
+    assert curve.rate_on(date(2023, 12, 31)) is None
+    assert curve.rate_on(date(2024, 7, 28)) == 16.0
+    assert curve.rate_on(date(2024, 7, 29)) == 18.0
+    np.testing.assert_array_equal(
+        curve.rates_on([date(2023, 1, 1), date(2024, 3, 1), date(2030, 1, 1)]), [np.nan, 16.0, 18.0]
+    )
+
+
+def test_reader_picks_up_new_generation(tmp_path):
+    """Replacing the file is visible to an existing reader; old views stay valid"""
+    path = str(tmp_path / "curves.bin")
+    write_curve_store(path, {"ruonia": ([date(2024, 1, 9)], [15.9])})
+    store = CurveStore(path)
+    old_curve = store.get_curve("ruonia")
+    old_generation = store.generation
+
+    write_curve_store(path, {"ruonia": ([date(2024, 1, 9), date(2024, 1, 10)], [15.9, 16.1])})
+    new_curve = store.get_curve("ruonia")
+
+    assert store.generation != old_generation
+    assert new_curve.rates.tolist() == [15.9, 16.1]
+    assert old_curve.rates.tolist() == [15.9]
+
+
+def test_missing_store_returns_none(tmp_path):
+    store = CurveStore(str(tmp_path / "absent.bin"))
+    assert store.get_curve("key_rate") is None
+    assert store.generation is None
+
+
+@pytest.mark.tables(CBRKeyRate.__table__)
+def test_service_reads_database_when_file_is_behind(db, tmp_path, monkeypatch):
+    """A key rate stored after the file was published is not hidden by the file"""
+    path = str(tmp_path / "curves.bin")
+    write_curve_store(path, {"key_rate": ([date(2024, 1, 1)], [16.0])})
+    monkeypatch.setattr(cbr_service, "curve_store", CurveStore(path))
+
+    service = cbr_service.CBRService(db)
+    db.add(CBRKeyRate(date=datetime(2024, 1, 1), effective_date=datetime(2024, 1, 1), rate=16.0))
+    db.commit()
+    assert service.get_key_rate_on_date(datetime(2024, 8, 1)) == 16.0
+
+    # Stored the way update_key_rates does, without publishing
+    db.add(CBRKeyRate(date=datetime(2024, 7, 26), effective_date=datetime(2024, 7, 29), rate=18.0))
+    db.commit()
+    db.info.pop('key_rate_version', None)
+    assert service.get_key_rate_on_date(datetime(2024, 8, 1)) == 18.0
+
+
+@pytest.mark.tables(CBRKeyRate.__table__, RuoniaRate.__table__)
+def test_service_reads_database_when_older_rate_is_corrected(db, tmp_path, monkeypatch):
+    """A correction of a published point is not hidden by the file either"""
+    path = str(tmp_path / "curves.bin")
+    monkeypatch.setattr(cbr_service, "curve_store", CurveStore(path))
+    rate = CBRKeyRate(date=datetime(2024, 1, 1), effective_date=datetime(2024, 1, 1), rate=16.0,
+                      updated_at=datetime(2024, 1, 1, 12))
+    db.add(rate)
+    db.commit()
+    publish_curves(db, path)
+
+    service = cbr_service.CBRService(db)
+    assert service.get_key_rate_on_date(datetime(2024, 8, 1)) == 16.0
+    assert cbr_service.curve_store.get_curve("key_rate").source_updated != -1
+
+    rate.rate = 15.0
+    rate.updated_at = datetime(2024, 1, 2, 12)
+    db.commit()
+    db.info.pop('key_rate_version', None)
+    assert service.get_key_rate_on_date(datetime(2024, 8, 1)) == 15.0
@@ -0,0 +1,64 @@
+"""
+Tests for columnar upload storage
+"""
+
+import pandas as pd
+import pytest
+
+from app.models.data_upload import DataUpload, DataUploadBlob, DataUploadStatus
+from app.services import upload_frames
+from app.services.dataset_store import ARROW, JSON, DatasetStore
+from app.services.upload_frames import UploadFrameCache
+
+FRAME = pd.DataFrame({
+    'date': [f'2024-{month:02d}-01' for month in range(1, 11)],
+    'amount': [1000.0 * month for month in range(1, 11)],
+    'currency': ['USD', 'EUR'] * 5,
+    'description': ['row'] * 10,
+})
+
+
+pytestmark = pytest.mark.tables(DataUpload.__table__, DataUploadBlob.__table__)
+
+
+def _upload(db, store: DatasetStore) -> DataUpload:
+    upload = DataUpload(user_id=1, name='Revenue', source_type='csv', category='revenue',
+                        status=DataUploadStatus.COMPLETED)
+    db.add(upload)
+    db.flush()
+    preview = store.store_upload_rows(upload, FRAME)
+    db.commit()
+    assert preview == FRAME.head(5).to_dict(orient='records')
+    return upload
+
+
+def test_json_storage_keeps_rows_in_table(db, tmp_path):
+    store = DatasetStore(str(tmp_path), storage=JSON)
+
+    upload = _upload(db, store)
+
+    assert upload.dataset_path is None
+    assert len(upload.raw_data) == 10
+    frame = store.load_upload_frame(upload, columns=['amount', 'missing'])
+    assert list(frame.columns) == ['amount']
+
+
+def test_arrow_storage_reads_only_needed_columns(db, tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    store = DatasetStore(str(tmp_path), storage=ARROW)
+    monkeypatch.setattr(upload_frames, 'dataset_store', store)
+
+    upload = _upload(db, store)
+
+    assert upload.raw_data is None
+    assert upload.dataset_path.endswith(f'upload_{upload.id}.arrow')
+    assert len(upload.preview_data) == 5
+    pd.testing.assert_frame_equal(store.load_upload_frame(upload), FRAME)
+
+    frames = UploadFrameCache(max_bytes=1 << 20).get_frames(db, [upload.id], columns=['date', 'amount', 'customer'])
+    frame = frames[upload.id].frame
+    assert sorted(frame.columns) == ['amount', 'date']
+    assert frame['amount'].sum() == FRAME['amount'].sum()
+
+    store.delete(upload.dataset_path)
+    assert not tmp_path.joinpath(f'upload_{upload.id}.arrow').exists()
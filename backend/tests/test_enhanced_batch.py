@@ -0,0 +1,104 @@
+"""
+Tests for batch enhanced scenario analysis
+"""
+
+from datetime import datetime
+
+import pytest
+
+import app.models  # noqa: F401 - registers all mappers
+from app.models.analysis_result import AnalysisResult
+from app.models.data_upload import DataUpload, DataUploadStatus
+from app.models.payment_schedule import PaymentSchedule  # noqa: F401
+from app.models.scenario import Scenario
+from app.services.enhanced_scenario_service import EnhancedScenarioService
+from app.services.external_data_service import CurrencyRate
+
+
+class _CountingMarketData:
+    def __init__(self):
+        self.calls = 0
+
+    def _count(self, value):
+        self.calls += 1
+        return value
+
+    def get_currency_rates(self):
+        return self._count([CurrencyRate('USD', 'RUB', 98.5, datetime(2025, 1, 15))])
+
+    def get_interest_rates(self, country='US'):
+        return self._count({'federal_funds_rate': 0.0525})
+
+    def get_commodity_prices(self):
+        return self._count([])
+
+    def get_market_indices(self):
+        return self._count([])
+
+    def get_economic_indicators(self):
+        return self._count({'inflation_rate': 0.03})
+
+
+REVENUE = [
+    {'date': f'2024-{month:02d}-01', 'amount': 100000 + 5000 * month, 'currency': 'USD'}
+    for month in range(1, 13)
+]
+
+
+@pytest.fixture
+def scenarios(db):
+    upload = DataUpload(user_id=1, name='Revenue', source_type='manual', category='revenue',
+                        raw_data=REVENUE, status=DataUploadStatus.COMPLETED)
+    db.add(upload)
+    db.flush()
+    rows = [
+        Scenario(user_id=1, name=f'Growth {rate}', scenario_type='revenue_forecast',
+                 parameters={'forecast_months': 6, 'growth_rate': rate}, data_upload_ids=[upload.id])
+        for rate in (0.01, 0.05, 0.10)
+    ]
+    rows.append(Scenario(user_id=1, name='No data', scenario_type='revenue_forecast',
+                         parameters={'forecast_months': 6, 'growth_rate': 0.05}, data_upload_ids=[]))
+    rows.append(Scenario(user_id=2, name='Other user', scenario_type='revenue_forecast',
+                         parameters={'forecast_months': 6, 'growth_rate': 0.05}, data_upload_ids=[upload.id]))
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def _service(db):
+    service = EnhancedScenarioService(db)
+    service.external_data = _CountingMarketData()
+    return service
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_batch_loads_shared_inputs_once(db, scenarios, monkeypatch, workers):
+    service = _service(db)
+    loads = []
+    original = service._load_upload_frames
+    monkeypatch.setattr(service, '_load_upload_frames', lambda ids, **kw: loads.append(ids) or original(ids, **kw))
+    ids = [scenario.id for scenario in scenarios] + [999]
+
+    batch = service.execute_enhanced_scenarios(ids, user_id=1, max_workers=workers)
+
+    assert service.external_data.calls == 5
+    assert len(loads) == 1
+    growth = [s.id for s in scenarios[:3]]
+    assert sorted(batch.results) == growth
+    totals = [batch.results[scenario_id].base_case['total_forecasted'] for scenario_id in growth]
+    assert totals == sorted(totals)
+    assert 'Revenue data required' in batch.errors[scenarios[3].id]
+    assert set(batch.errors) == {scenarios[3].id, scenarios[4].id, 999}
+
+    assert db.query(AnalysisResult).count() == 3
+    assert [s.status for s in scenarios] == ['completed'] * 3 + ['failed', 'created']
+
+
+def test_single_scenario_returns_plain_results(db, scenarios):
+    result = _service(db).execute_enhanced_scenario(scenarios[1].id)
+
+    assert isinstance(result.base_case, dict)
+    assert result.base_case['forecast_months'] == 6
+    assert result.scenario_name == 'Growth 0.05'
+    with pytest.raises(ValueError):
+        _service(db).execute_enhanced_scenario(12345)
@@ -0,0 +1,45 @@
+"""
+Tests for Excel reading engines
+"""
+
+import glob
+import os
+
+import pandas as pd
+import pytest
+
+from app.services.excel_reader import CALAMINE, OPENPYXL, ExcelReader
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', '*.xlsx')))
+
+
+@pytest.mark.parametrize('path', FIXTURES, ids=os.path.basename)
+def test_engines_read_identical_frames(path):
+    pytest.importorskip('python_calamine')
+    calamine, openpyxl = ExcelReader(), ExcelReader(prefer_calamine=False)
+
+    assert calamine.workbook_info(path).engine == CALAMINE
+    assert openpyxl.workbook_info(path).engine == OPENPYXL
+    assert calamine.sheet_names(path) == openpyxl.sheet_names(path)
+    for kwargs in ({}, {'header': None}, {'header': None, 'nrows': 3}, {'nrows': 10}):
+        pd.testing.assert_frame_equal(calamine.read(path, **kwargs), openpyxl.read(path, **kwargs))
+
+
+def test_workbook_metadata_is_cached_by_content(tmp_path, monkeypatch):
+    path = tmp_path / 'rates.xlsx'
+    pd.DataFrame({'date': ['2024-01-01', '2024-02-01'], 'rate': [16.0, 16.0]}).to_excel(path, index=False)
+    reader = ExcelReader(prefer_calamine=False, cache_size=1)
+    loads = []
+    load_info = reader._load_info
+    monkeypatch.setattr(reader, '_load_info', lambda source: loads.append(source) or load_info(source))
+
+    content = path.read_bytes()
+    frame = reader.read(content)
+    assert reader.sheet_names(content) == ('Sheet1',)
+    assert len(loads) == 1
+    pd.testing.assert_frame_equal(frame, reader.read(str(path)))
+    assert len(loads) == 2
+
+    # A modified file is looked at again
+    pd.DataFrame({'rate': [15.0]}).to_excel(path, index=False, sheet_name='Rates')
+    assert reader.sheet_names(str(path)) == ('Rates',)
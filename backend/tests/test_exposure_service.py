@@ -0,0 +1,81 @@
+"""
+Tests for exposure extraction from uploads and credit obligations
+"""
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from app.models.credit_obligation import CreditObligation, PaymentFrequency, PaymentType
+from app.models.data_upload import DataUpload, DataUploadBlob, DataUploadStatus
+from app.services import exposure_service
+from app.services.enhanced_scenario_service import EnhancedScenarioService
+from app.services.exposure_service import ExposureService, aggregate_exposures, cash_flow_frame
+
+ROWS = [
+    {'date': '2024-01-01', 'amount': 100000, 'currency': 'usd', 'category': 'revenue'},
+    {'date': '2024-01-15', 'amount': 20000, 'currency': 'USD', 'category': 'revenue'},
+    {'date': '2024-02-01', 'amount': -50000, 'currency': 'EUR', 'category': 'expenses'},
+    {'date': '2024-02-10', 'amount': 300000, 'category': 'Term deposit'},
+    {'date': '2024-03-01', 'amount': 40000, 'currency': 'RUB', 'category': 'Oil'},
+    {'date': '2024-03-05', 'amount': None, 'currency': 'RUB', 'category': 'gold'},
+]
+
+
+def test_aggregation_matches_row_loop():
+    exposures = aggregate_exposures(cash_flow_frame(pd.DataFrame(ROWS)))
+
+    assert exposures.currency == {'USD': 120000.0, 'EUR': -50000.0, 'RUB': 340000.0}
+    assert exposures.rate_sensitive == {'fixed_deposits': 300000.0}
+    assert exposures.commodity == {'OIL': 40000.0}
+
+
+def test_cash_flow_uploads_use_inflow_minus_outflow():
+    frame = pd.DataFrame([{'date': '2024-01-01', 'inflow': 500, 'outflow': 200, 'currency': 'CNY'}])
+
+    assert aggregate_exposures(cash_flow_frame(frame)).currency == {'CNY': 300.0}
+
+
+pytestmark = pytest.mark.tables(DataUpload.__table__, DataUploadBlob.__table__, CreditObligation.__table__)
+
+
+def _credit(user_id: int, principal: float, indicator: str, currency: str = 'RUB'):
+    return CreditObligation(
+        user_id=user_id, credit_name='Loan', principal_amount=principal, currency=currency,
+        start_date=datetime(2024, 1, 1), end_date=datetime(2026, 1, 1),
+        base_rate_indicator=indicator, base_rate_value=16.0, credit_spread=2.0, total_rate=18.0,
+        payment_frequency=PaymentFrequency.MONTHLY, payment_type=PaymentType.ANNUITY,
+    )
+
+
+def test_uploads_and_credits_share_one_cached_computation(db, monkeypatch):
+    upload = DataUpload(
+        user_id=1, name='Cash flows', source_type='manual', raw_data=ROWS, status=DataUploadStatus.COMPLETED
+    )
+    db.add_all([upload, _credit(1, 1_000_000, 'KEY_RATE'), _credit(1, 200_000, 'FIXED', 'USD'),
+                _credit(2, 9_999_999, 'KEY_RATE')])
+    db.commit()
+
+    calls = []
+    original = exposure_service.aggregate_exposures
+    monkeypatch.setattr(exposure_service, 'aggregate_exposures', lambda frame: calls.append(1) or original(frame))
+
+    service = EnhancedScenarioService(db)
+    cash_flows = service._get_cash_flows_from_uploads([upload.id], 1)
+    currency = service._identify_currency_exposures(cash_flows)
+    items = service._identify_rate_sensitive_items(cash_flows)
+    service._identify_commodity_exposures(cash_flows)
+
+    assert len(calls) == 1
+    assert currency['USD'] == pytest.approx(120000 - 200000)
+    assert currency['RUB'] == pytest.approx(340000 - 1_000_000)
+    # Fixed-rate credits are not rate sensitive; the other user's credit is ignored
+    assert items == {'fixed_deposits': 300000.0, 'variable_rate_debt': -1_000_000.0}
+
+    db.add(_credit(1, 500_000, 'RUONIA'))
+    db.commit()
+    items = ExposureService(db).get_exposures(cash_flows).rate_sensitive
+
+    assert len(calls) == 2
+    assert items['variable_rate_debt'] == pytest.approx(-1_500_000)
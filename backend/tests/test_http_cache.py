@@ -0,0 +1,103 @@
+"""
+Tests for conditional-GET responses and the serialized response cache
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from starlette.requests import Request
+
+from app.core.http_cache import ResponseCache, conditional_json_response, latest_modified, response_cache
+
+
+def _request(**headers) -> Request:
+    raw = [(name.replace('_', '-').encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def test_etag_revalidation_and_body_cache():
+    """Matching If-None-Match gives 304; the body is built once per validator"""
+    response_cache.clear()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {"rates": [16.0, 17.0]}
+
+    first = conditional_json_response(_request(), ("test",), (2, 10), build)
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.body == b'{"rates":[16.0,17.0]}'
+
+    not_modified = conditional_json_response(_request(if_none_match=etag), ("test",), (2, 10), build)
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+
+    cached = conditional_json_response(_request(), ("test",), (2, 10), build)
+    assert cached.body == first.body
+    assert len(builds) == 1
+
+    changed = conditional_json_response(_request(if_none_match=etag), ("test",), (3, 11), build)
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(builds) == 2
+
+
+def test_if_modified_since():
+    """If-Modified-Since is honored at one-second resolution when no ETag is sent"""
+    last_modified = datetime(2025, 8, 1, 12, 0, 0, 500000, tzinfo=timezone.utc)
+    first = conditional_json_response(_request(), ("lm",), (1,), lambda: {}, last_modified=last_modified)
+    assert first.headers["last-modified"] == "Fri, 01 Aug 2025 12:00:00 GMT"
+
+    response = conditional_json_response(
+        _request(if_modified_since=first.headers["last-modified"]), ("lm",), (1,), lambda: {}, last_modified=last_modified
+    )
+    assert response.status_code == 304
+
+    response = conditional_json_response(
+        _request(if_modified_since="Thu, 31 Jul 2025 12:00:00 GMT"), ("lm",), (1,), lambda: {}, last_modified=last_modified
+    )
+    assert response.status_code == 200
+
+
+def test_windowed_response_is_modified_when_window_moves():
+    """A response over a moving window is not 304 after the window start passes the data's last change"""
+    data_changed = datetime(2025, 8, 1, 12, 0, 0)
+    window_moved = datetime(2025, 8, 3, 0, 0, 0, tzinfo=timezone(timedelta(hours=3)))
+
+    last_modified = latest_modified(data_changed, window_moved)
+    assert last_modified == datetime(2025, 8, 2, 21, 0, 0, tzinfo=timezone.utc)
+    assert latest_modified(None, data_changed) == data_changed.astimezone(timezone.utc)
+
+    response = conditional_json_response(
+        _request(if_modified_since="Sat, 02 Aug 2025 09:00:00 GMT"), ("window",), (1,), lambda: {},
+        last_modified=last_modified
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.skipif(not hasattr(time, "tzset"), reason="needs time.tzset")
+def test_naive_timestamps_are_local_time(monkeypatch):
+    """Naive model timestamps come from datetime.now(), so they are converted from the server's zone"""
+    monkeypatch.setenv("TZ", "MSK-3")
+    time.tzset()
+    try:
+        assert latest_modified(datetime(2025, 8, 1, 12, 0, 0)) == datetime(2025, 8, 1, 9, 0, 0, tzinfo=timezone.utc)
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "1", b"a")
+    cache.set("b", "1", b"b")
+    assert cache.get("a", "1") == b"a"
+    cache.set("c", "1", b"c")
+
+    assert cache.get("b", "1") is None
+    assert cache.get("a", "1") == b"a"
+    assert cache.get("a", "2") is None
+    assert len(cache) == 2
@@ -0,0 +1,120 @@
+"""
+Tests for vectorized market analytics
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.models.market_quote import MarketQuote
+from app.services.market_analytics import (
+    MarketAnalytics,
+    correlation_from_covariance,
+    ewma_covariance,
+    rolling_volatility,
+)
+
+
+def test_rolling_volatility_matches_naive_loop():
+    returns = np.random.default_rng(3).normal(0, 0.01, size=(120, 3))
+    window = 21
+
+    result = rolling_volatility(returns, window)
+
+    expected = np.array([
+        returns[i:i + window].std(axis=0, ddof=1) * np.sqrt(252)
+        for i in range(len(returns) - window + 1)
+    ])
+    np.testing.assert_allclose(result, expected, rtol=1e-9)
+
+
+def test_ewma_covariance_matches_recursion():
+    returns = np.random.default_rng(5).normal(0, 0.01, size=(200, 2))
+    lam = 0.94
+
+    covariance = ewma_covariance(returns, lam)
+
+    # Normalized RiskMetrics recursion seeded with zero
+    expected = np.zeros((2, 2))
+    for r in returns:
+        expected = lam * expected + (1 - lam) * np.outer(r, r)
+    expected /= 1 - lam ** len(returns)
+    np.testing.assert_allclose(covariance, expected, rtol=1e-9)
+
+    correlation = correlation_from_covariance(covariance)
+    assert np.allclose(np.diag(correlation), 1.0)
+    assert correlation[0, 1] == pytest.approx(
+        covariance[0, 1] / np.sqrt(covariance[0, 0] * covariance[1, 1])
+    )
+
+
+pytestmark = pytest.mark.tables(MarketQuote.__table__)
+
+
+def _record_series(db, days: int = 80):
+    rng = np.random.default_rng(11)
+    start = datetime.now() - timedelta(days=days)
+    usd = 90 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+    eur = usd * 1.08 * np.exp(np.cumsum(rng.normal(0, 0.002, days)))
+    quotes = []
+    for i in range(days):
+        timestamp = start + timedelta(days=i)
+        quotes += [("USD/RUB", float(usd[i]), timestamp), ("EUR/RUB", float(eur[i]), timestamp)]
+    MarketQuote.record(db, "fx", quotes, source="moex")
+    db.commit()
+
+
+def test_analytics_over_stored_quotes(db):
+    _record_series(db)
+    analytics = MarketAnalytics(db)
+
+    stats = analytics.volatility("USD/RUB", "3m")
+    assert stats["observations"] == 79
+    assert 0.05 < stats["historical_volatility"] < 0.3
+    assert 0 < stats["volatility_percentile"] <= 1
+
+    # EUR/RUB is mostly USD/RUB moves, so the pair is strongly correlated
+    assert analytics.average_correlation(["USD/RUB", "EUR/RUB", "INR/RUB"], "3m") > 0.8
+    assert analytics.volatility("INR/RUB", "3m") is None
+
+
+def test_record_keeps_latest_value_per_day(db):
+    now = datetime.now()
+    MarketQuote.record(db, "fx", [("USD/RUB", 90.0, now)], source="moex")
+    db.commit()
+    version = MarketQuote.get_series_version(db, ["USD/RUB"])
+
+    MarketQuote.record(db, "fx", [("USD/RUB", 91.0, now)], source="moex")
+    db.commit()
+
+    rows = db.query(MarketQuote).all()
+    assert [(row.symbol, row.value) for row in rows] == [("USD/RUB", 91.0)]
+    assert MarketQuote.get_series_version(db, ["USD/RUB"]) != version
+
+
+def test_volatility_route_accepts_pair_symbols(session_factory, monkeypatch):
+    """USD/RUB reaches the quote-based calculation and keeps the mock's keys"""
+    from fastapi.testclient import TestClient
+
+    from app import database
+    from app.api.routes.market_data import get_current_user
+    from app.main import app
+    from app.services.external_data_service import ExternalDataService
+
+    _record_series(session_factory())
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    ExternalDataService._fetch_volatility_data.cache.invalidate()
+    app.dependency_overrides[get_current_user] = lambda: None
+    try:
+        response = TestClient(app, base_url="http://localhost").get(
+            "/api/v1/market-data/volatility/USD/RUB", params={"period": "3m"}
+        )
+    finally:
+        app.dependency_overrides.pop(get_current_user)
+        ExternalDataService._fetch_volatility_data.cache.invalidate()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["observations"] == 79
+    assert body["implied_volatility"] is None and body["beta"] is None
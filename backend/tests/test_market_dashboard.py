@@ -0,0 +1,95 @@
+"""
+Tests for the concurrent market dashboard aggregator
+"""
+
+import asyncio
+import json
+import time
+from datetime import timedelta
+
+import pytest
+
+from app.models.market_data_snapshot import MarketDataSnapshot
+from app.services.market_dashboard import DashboardSnapshot, collect_dashboard_sources
+
+
+def test_sources_run_concurrently_with_partial_results():
+    """A slow source times out without holding back or failing the others"""
+    def slow(delay, value):
+        def source():
+            time.sleep(delay)
+            return value
+        return source
+
+    def broken():
+        raise RuntimeError("upstream down")
+
+    sources = {
+        "interest_rates": slow(0.2, {"key_rate": 16.0}),
+        "economic_indicators": slow(0.2, {"gdp_growth": 2.1}),
+        "market_indices": slow(2.0, []),
+        "commodity_prices": broken,
+    }
+
+    async def timed():
+        started = time.monotonic()
+        outcome = await collect_dashboard_sources(sources, timeout=0.5)
+        return outcome, time.monotonic() - started
+
+    (results, errors), elapsed = asyncio.run(timed())
+
+    assert elapsed < 1.0
+    assert results == {"interest_rates": {"key_rate": 16.0}, "economic_indicators": {"gdp_growth": 2.1}}
+    assert errors["market_indices"] == "timed out after 0.5s"
+    assert errors["commodity_prices"] == "upstream down"
+
+
+def test_snapshot_is_built_once_and_reused():
+    calls = []
+
+    def source():
+        calls.append(1)
+        return {"key_rate": 16.0}
+
+    snapshot = DashboardSnapshot(ttl=60, sources={"interest_rates": source})
+
+    async def scenario():
+        first, second = await asyncio.gather(snapshot.get_body(), snapshot.get_body())
+        third = await snapshot.get_body()
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+
+    assert first == second == third
+    assert len(calls) == 1
+    payload = json.loads(first)
+    assert payload["interest_rates"] == {"key_rate": 16.0}
+    assert payload["partial"] is False
+
+
+@pytest.mark.tables(MarketDataSnapshot.__table__)
+def test_workers_share_stored_snapshot(session_factory):
+    """A worker adopts the snapshot another worker stored instead of building its own"""
+    calls = []
+
+    def source():
+        calls.append(1)
+        return {"key_rate": 16.0 + len(calls)}
+
+    leader = DashboardSnapshot(ttl=60, sources={"interest_rates": source}, session_factory=session_factory)
+    worker = DashboardSnapshot(ttl=60, sources={"interest_rates": source}, session_factory=session_factory)
+
+    built = asyncio.run(leader.refresh())
+    adopted = asyncio.run(worker.get_body())
+
+    assert adopted == built
+    assert len(calls) == 1
+
+    # Expired stored snapshots are rebuilt
+    db = session_factory()
+    stored = MarketDataSnapshot.get(db, DashboardSnapshot.SOURCE)
+    stored.fetched_at -= timedelta(hours=1)
+    db.commit()
+    db.close()
+    stale = DashboardSnapshot(ttl=60, sources={"interest_rates": source}, session_factory=session_factory)
+    assert json.loads(asyncio.run(stale.get_body()))["interest_rates"] == {"key_rate": 18.0}
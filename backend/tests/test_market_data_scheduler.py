@@ -0,0 +1,82 @@
+"""
+Tests for the background market data refresher
+"""
+
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+from app.services.market_data_scheduler import LeaderLock, MarketDataScheduler
+
+
+def test_only_one_leader_per_lock_file(tmp_path):
+    """A second process-level lock on the same file must not become leader"""
+    lock_path = str(tmp_path / "refresh.lock")
+    leader = LeaderLock(lock_path)
+    follower = LeaderLock(lock_path)
+
+    assert leader.acquire()
+    assert not follower.acquire()
+
+    leader.release()
+    assert follower.acquire()
+    follower.release()
+
+
+def test_overlapping_runs_are_skipped():
+    """run_once is single-flight: a concurrent call returns None without running jobs"""
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_job(db):
+        calls.append(db)
+        started.set()
+        release.wait(5)
+        return "done"
+
+    scheduler = MarketDataScheduler(
+        interval=60,
+        jobs=[("slow", slow_job)],
+        session_factory=MagicMock,
+    )
+
+    async def scenario():
+        first = asyncio.create_task(scheduler.run_once())
+        await asyncio.to_thread(started.wait, 5)
+        second = await scheduler.run_once()
+        release.set()
+        return await first, second
+
+    first_result, second_result = asyncio.run(scenario())
+
+    assert second_result is None
+    assert first_result["slow"]["status"] == "ok"
+    assert len(calls) == 1
+
+
+def test_failing_job_does_not_stop_other_jobs():
+    """Each job is isolated; a failure is recorded and the next job still runs"""
+    def failing_job(db):
+        raise RuntimeError("upstream down")
+
+    scheduler = MarketDataScheduler(
+        interval=60,
+        jobs=[("broken", failing_job), ("ok", lambda db: 3)],
+        session_factory=MagicMock,
+    )
+
+    results = asyncio.run(scheduler.run_once())
+
+    assert results["broken"]["status"] == "error"
+    assert "upstream down" in results["broken"]["error"]
+    assert results["ok"] == {**results["ok"], "status": "ok", "result": 3}
+
+
+def test_next_delay_stays_within_jitter_bounds():
+    """Jittered delay never leaves the configured +/- band"""
+    scheduler = MarketDataScheduler(interval=100, jitter=0.2, jobs=[])
+
+    delays = [scheduler.next_delay() for _ in range(200)]
+
+    assert all(80 <= delay <= 120 for delay in delays)
@@ -0,0 +1,104 @@
+"""
+Tests for MOEX currency rate fetching against a stored ISS response
+"""
+
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.config import settings
+from app.models.market_data_snapshot import MarketDataSnapshot
+from app.services.external_data_service import ExternalDataService
+
+FIXTURE = Path(__file__).parent / "fixtures" / "moex_fx_marketdata.json"
+
+
+def test_single_batched_iss_request():
+    """All instruments come from one request; CETS prices win and LAST backs up MARKETPRICE"""
+    service = ExternalDataService()
+    response = MagicMock()
+    response.json.return_value = json.loads(FIXTURE.read_text())
+    service.session.get = MagicMock(return_value=response)
+
+    rates = {rate.base_currency: rate.rate for rate in service._get_moex_currency_rates()}
+
+    assert service.session.get.call_count == 1
+    params = service.session.get.call_args.kwargs["params"]
+    assert params["securities"].split(",") == list(ExternalDataService.MOEX_CURRENCY_INSTRUMENTS)
+    assert rates == {"USD": 80.3925, "EUR": 93.9475, "CNY": 11.2315, "INR": 1.18}
+
+
+def test_non_cets_board_used_when_cets_has_no_price():
+    data = {
+        "marketdata": {
+            "columns": ["SECID", "BOARDID", "MARKETPRICE", "LAST", "WAPRICE"],
+            "data": [
+                ["USD000UTSTOM", "AUCB", None, 80.41, None],
+                ["USD000UTSTOM", "CETS", None, None, None],
+            ],
+        }
+    }
+
+    assert ExternalDataService._parse_moex_marketdata(data) == {"USD000UTSTOM": 80.41}
+
+
+def test_fallback_rates_are_not_cached(monkeypatch):
+    service = ExternalDataService()
+    ExternalDataService._fetch_currency_rates.cache.invalidate()
+    monkeypatch.setattr(service, "_store_currency_quotes", lambda rates: None)
+    service._get_moex_currency_rates = MagicMock(side_effect=ConnectionError("MOEX is down"))
+
+    fallback = service.get_currency_rates()
+    assert [rate.base_currency for rate in fallback] == [rate.base_currency for rate in service._get_mock_currency_rates()]
+
+    # MOEX recovers: the next call fetches instead of serving the fallback
+    service._get_moex_currency_rates = MagicMock(return_value=fallback[:1])
+    assert service.get_currency_rates() == fallback[:1]
+    assert service._get_moex_currency_rates.call_count == 1
+    ExternalDataService._fetch_currency_rates.cache.invalidate()
+
+
+def test_empty_iss_response_falls_back(monkeypatch):
+    """200 without prices is not cached or stored as the latest good rates"""
+    service = ExternalDataService()
+    ExternalDataService._fetch_currency_rates.cache.invalidate()
+    stored = []
+    monkeypatch.setattr(service, "_store_currency_quotes", stored.append)
+    response = MagicMock()
+    response.json.return_value = {"marketdata": {"columns": ["SECID", "BOARDID", "MARKETPRICE", "LAST", "WAPRICE"],
+                                                 "data": []}}
+    service.session.get = MagicMock(return_value=response)
+    service._last_good_currency_rates = service._get_mock_currency_rates()[:2]
+
+    assert service.get_currency_rates() == service._last_good_currency_rates
+    assert stored == []
+
+    response.json.return_value = json.loads(FIXTURE.read_text())
+    assert len(service.get_currency_rates()) == 4
+    assert service.session.get.call_count == 2
+    ExternalDataService._fetch_currency_rates.cache.invalidate()
+
+
+@pytest.mark.tables(MarketDataSnapshot.__table__)
+def test_stale_snapshot_is_refetched(db, monkeypatch):
+    """Stored rates past the maximum age are replaced by a live fetch, and kept when that fails"""
+    service = ExternalDataService()
+    stored = service._get_mock_currency_rates()[:1]
+    MarketDataSnapshot.upsert(db, service.FX_SNAPSHOT_SOURCE, service.currency_rates_to_payload(stored),
+                              fetched_at=datetime.now() - timedelta(seconds=settings.market_data_max_age + 60))
+    db.commit()
+
+    live = service._get_mock_currency_rates()
+    monkeypatch.setattr(service, "_fetch_currency_rates", lambda: live)
+    assert service.get_stored_currency_rates(db) == live
+
+    monkeypatch.setattr(service, "_fetch_currency_rates", MagicMock(side_effect=ConnectionError("MOEX is down")))
+    assert service.get_stored_currency_rates(db) == stored
+
+    MarketDataSnapshot.get(db, service.FX_SNAPSHOT_SOURCE).fetched_at = datetime.now()
+    db.commit()
+    assert service.get_stored_currency_rates(db) == stored
+    assert service._fetch_currency_rates.call_count == 1
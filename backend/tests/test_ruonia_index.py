@@ -0,0 +1,95 @@
+"""
+Tests for the RUONIA compounding index
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.cbr_service import CBRService
+from app.services.ruonia_index import RuoniaCompoundingIndex
+
+
+def _business_day_series(start: date, days: int, seed: int = 7):
+    """Weekday publications with a random-walk rate"""
+    rng = np.random.default_rng(seed)
+    dates, rates = [], []
+    rate = 16.0
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        if day.weekday() < 5:
+            rate += rng.normal(0, 0.05)
+            dates.append(day)
+            rates.append(rate)
+    return dates, rates
+
+
+def _naive_compounded_rate(dates, rates, start: date, end: date) -> float:
+    """Reference: loop over publications, each accruing until the next one"""
+    growth = 1.0
+    for i, day in enumerate(dates[:-1]):
+        if day < start or day >= end:
+            continue
+        accrual_days = (min(dates[i + 1], end) - day).days
+        growth *= 1 + rates[i] / 100 * accrual_days / 365
+    return (growth - 1) * 365 / (end - start).days * 100
+
+
+def test_matches_naive_loop_for_many_periods():
+    """Vectorized index gives the same rate as the per-day loop for publication-aligned periods"""
+    dates, rates = _business_day_series(date(2024, 1, 1), 400)
+    index = RuoniaCompoundingIndex(dates, rates)
+
+    rng = np.random.default_rng(1)
+    starts, ends = [], []
+    for _ in range(200):
+        i, j = sorted(rng.choice(len(dates), size=2, replace=False))
+        starts.append(dates[i])
+        ends.append(dates[j])
+
+    vectorized = index.compounded_rates(starts, ends)
+    expected = [_naive_compounded_rate(dates, rates, s, e) for s, e in zip(starts, ends)]
+
+    np.testing.assert_allclose(vectorized, expected, rtol=1e-12)
+
+
+def test_weekend_accrues_friday_rate():
+    """A Friday-to-Monday period accrues the Friday rate for three days"""
+    dates = [date(2024, 3, 1), date(2024, 3, 4)]  # Friday, Monday
+    index = RuoniaCompoundingIndex(dates, [15.0, 18.0])
+
+    assert index.compounded_rate(date(2024, 3, 1), date(2024, 3, 4)) == pytest.approx(15.0)
+
+
+def test_out_of_range_periods():
+    """Periods before the series are undefined; days after it accrue at the last rate"""
+    index = RuoniaCompoundingIndex([date(2024, 1, 9), date(2024, 1, 10)], [16.0, 16.0])
+
+    assert index.compounded_rate(date(2024, 1, 1), date(2024, 1, 10)) is None
+    assert index.compounded_rate(date(2024, 1, 10), date(2024, 1, 10)) is None
+    assert index.compounded_rate(date(2024, 1, 10), date(2024, 2, 10)) == pytest.approx(16.0)
+
+
+def test_parse_ruonia_xml():
+    """RuoniaXML <ro> records are parsed into date, rate and volume"""
+    content = b"""<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
+  <soap:Body>
+    <RuoniaXMLResponse xmlns="http://web.cbr.ru/">
+      <RuoniaXMLResult>
+        <Ruonia xmlns="">
+          <ro><D0>2024-01-09T00:00:00+03:00</D0><ruo>15.9300</ruo><vol>412.50</vol></ro>
+          <ro><D0>2024-01-10T00:00:00+03:00</D0><ruo>15.8700</ruo></ro>
+        </Ruonia>
+      </RuoniaXMLResult>
+    </RuoniaXMLResponse>
+  </soap:Body>
+</soap:Envelope>"""
+
+    records = CBRService.parse_ruonia_xml(content)
+
+    assert records == [
+        {'date': date(2024, 1, 9), 'rate': 15.93, 'volume': 412.5},
+        {'date': date(2024, 1, 10), 'rate': 15.87, 'volume': None},
+    ]
@@ -0,0 +1,89 @@
+"""
+Tests for streaming CSV ingestion
+"""
+
+import asyncio
+import hashlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import UploadFile
+
+from app.services.dataset_store import ARROW, DatasetStore
+from app.services.streaming_ingest import UploadTooLarge, detect_encoding, ingest_csv, spool_upload
+from app.services.validation_service import ChunkedValidation, ValidationService
+
+
+def _ledger(rows: int = 40) -> pd.DataFrame:
+    df = pd.DataFrame({
+        'date': pd.date_range('2024-01-01', periods=rows, freq='D').strftime('%Y-%m-%d'),
+        'amount': [str(100 * (i % 7) - 150) for i in range(rows)],
+        'account': [f'acc-{i % 3}' for i in range(rows)],
+        'memo': [None] * (rows - 2) + ['a', 'b'],
+    }).astype(object)
+    df.loc[3, 'amount'] = 'tbd'
+    df.loc[25, 'amount'] = 'oops'
+    df.loc[30, 'date'] = 'someday'
+    df.loc[33] = df.loc[32]
+    return df
+
+
+def test_chunked_validation_matches_whole_file():
+    df = _ledger()
+    service = ValidationService(max_errors_per_rule=1)
+
+    validation = ChunkedValidation(service, 'revenue')
+    for start in range(0, len(df), 7):
+        validation.add(df.iloc[start:start + 7])
+
+    assert validation.result() == service.validate_financial_data(df, 'revenue')
+
+
+def test_csv_is_parsed_validated_and_stored_in_chunks(tmp_path):
+    pytest.importorskip("pyarrow")
+    df = _ledger()
+    path = tmp_path / 'ledger.csv'
+    df.to_csv(path, index=False)
+    store = DatasetStore(str(tmp_path / 'datasets'), storage=ARROW)
+
+    result = ingest_csv(str(path), 7, 'revenue', detect_encoding(str(path)), chunk_rows=10, store=store)
+
+    assert result.row_count == 40
+    assert result.columns == ['date', 'amount', 'account', 'memo']
+    assert len(result.preview) == 5
+    invalid = [error['row'] for error in result.validation_errors if error['message'].startswith('Invalid numeric')]
+    assert invalid == [4, 26]
+
+    stored = store.read(result.dataset_path)
+    assert stored['amount'].dtype == np.float64
+    assert np.isnan(stored['amount'][25])
+    assert stored['amount'][0] == -150.0
+    assert stored['account'].tolist() == df['account'].tolist()
+    assert stored['memo'].isna().sum() == 38
+
+
+def test_encoding_is_detected_from_a_sample(tmp_path):
+    utf8 = tmp_path / 'utf8.csv'
+    # A multi-byte character cut by the sample boundary
+    utf8.write_bytes(b'a' * 9 + 'é,x\n'.encode('utf-8'))
+    latin = tmp_path / 'latin.csv'
+    latin.write_bytes('name\nCafé\n'.encode('cp1252'))
+
+    assert detect_encoding(str(utf8), sample_size=10) == 'utf-8'
+    assert detect_encoding(str(latin)) == 'latin-1'
+
+
+def test_spool_enforces_size_limit(tmp_path):
+    upload = UploadFile(file=io.BytesIO(b'x' * 5000), filename='big.csv')
+
+    path, size, digest = asyncio.run(spool_upload(upload, str(tmp_path), max_bytes=10_000))
+    assert size == 5000
+    assert digest == hashlib.sha256(b'x' * 5000).hexdigest()
+    assert open(path, 'rb').read() == b'x' * 5000
+
+    upload = UploadFile(file=io.BytesIO(b'x' * 5000), filename='big.csv')
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(spool_upload(upload, str(tmp_path), max_bytes=1000))
+    assert len(list(tmp_path.iterdir())) == 1
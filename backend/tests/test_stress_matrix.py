@@ -0,0 +1,147 @@
+"""
+Tests for matrix-form stress testing
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.enhanced_scenario_service import EnhancedScenarioService, RiskScenario
+from app.services.external_data_service import CommodityPrice, CurrencyRate, MarketData
+
+
+class _FixedMarketData:
+    """Deterministic stand-in for the external data service"""
+
+    def __init__(self):
+        now = datetime(2025, 1, 15)
+        self.rates = [
+            CurrencyRate('USD', 'RUB', 98.5, now),
+            CurrencyRate('EUR', 'RUB', 105.2, now),
+            CurrencyRate('CNY', 'RUB', 13.6, now),
+            CurrencyRate('INR', 'RUB', 1.18, now),
+        ]
+        self.prices = [
+            CommodityPrice('OIL', 78.0, 'USD', now),
+            CommodityPrice('GOLD', 2050.0, 'USD', now),
+            CommodityPrice('WHEAT', 6.1, 'USD', now),
+        ]
+        self.indices = [
+            MarketData('^GSPC', 4800.0, now, 'test', {}),
+            MarketData('^DJI', 37500.0, now, 'test', {}),
+            MarketData('^IXIC', 15000.0, now, 'test', {}),
+        ]
+
+    def get_currency_rates(self):
+        return self.rates
+
+    def get_interest_rates(self, country='US'):
+        return {'federal_funds_rate': 0.0525, 'treasury_10y': 0.043}
+
+    def get_commodity_prices(self):
+        return self.prices
+
+    def get_market_indices(self):
+        return self.indices
+
+
+@pytest.fixture
+def service():
+    service = EnhancedScenarioService(None)
+    service.external_data = _FixedMarketData()
+    return service
+
+
+CASH_FLOWS = pd.DataFrame([
+    {'amount': 150000, 'currency': 'USD', 'category': 'revenue'},
+    {'amount': 500000, 'currency': 'EUR', 'category': 'revenue'},
+    {'amount': 250000, 'currency': 'CNY', 'category': 'revenue'},
+    {'amount': -1000000, 'currency': 'RUB', 'category': 'expenses'},
+    {'amount': -500000, 'currency': 'RUB', 'category': 'bank loan'},
+    {'amount': 200000, 'currency': 'RUB', 'category': 'deposit'},
+    {'amount': 50000, 'currency': 'RUB', 'category': 'oil'},
+    {'amount': -25000, 'currency': 'RUB', 'category': 'gold'},
+])
+
+
+def _random_scenarios(count: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    return {
+        f"user_{i}": RiskScenario(
+            name=f"User {i}", description="generated",
+            market_shock=float(rng.uniform(-0.5, 0.2)),
+            currency_shock=float(rng.uniform(-0.3, 0.3)),
+            interest_rate_shock=float(rng.uniform(-0.02, 0.05)),
+            commodity_shock=float(rng.uniform(-0.4, 0.4)),
+            probability=float(rng.uniform(0, 0.1)),
+        )
+        for i in range(count)
+    }
+
+
+def test_matches_per_scenario_revaluation(service):
+    cash_flows = CASH_FLOWS
+    data = service.external_data
+
+    fx = service.execute_currency_risk_scenario(cash_flows)
+    rates = service.execute_interest_rate_risk_scenario(cash_flows)
+    commodities = service.execute_commodity_risk_scenario(cash_flows)
+    market = service.execute_market_correlation_scenario(cash_flows)
+
+    exposures = service._identify_currency_exposures(cash_flows)
+    items = service._identify_rate_sensitive_items(cash_flows)
+    commodity_exposures = service._identify_commodity_exposures(cash_flows)
+    correlations = service._identify_market_correlations(cash_flows, data.indices)
+
+    for name, scenario in service.risk_scenarios.items():
+        # Reference: rebuild the shocked market objects and revalue
+        shocked_rates = [
+            CurrencyRate(r.base_currency, r.target_currency, r.rate * (1 + scenario.currency_shock), r.timestamp)
+            for r in data.rates
+        ]
+        expected_fx = service._calculate_fx_impact(exposures, shocked_rates)
+        shocked_ir = {k: v + scenario.interest_rate_shock for k, v in data.get_interest_rates().items()}
+        expected_ir = service._calculate_interest_rate_impact(items, shocked_ir)
+        shocked_prices = [
+            CommodityPrice(p.commodity, p.price * (1 + scenario.commodity_shock), p.currency, p.timestamp)
+            for p in data.prices
+        ]
+        expected_commodity = service._calculate_commodity_impact(commodity_exposures, shocked_prices)
+        shocked_indices = [
+            MarketData(i.symbol, i.value * (1 + scenario.market_shock), i.timestamp, i.source, i.metadata)
+            for i in data.indices
+        ]
+        expected_market = service._calculate_market_impact(correlations, shocked_indices)
+
+        assert fx['stress_test_results'][name]['fx_impact'] == pytest.approx(expected_fx)
+        assert rates['stress_test_results'][name]['rate_impact'] == pytest.approx(expected_ir)
+        assert commodities['stress_test_results'][name]['commodity_impact'] == pytest.approx(expected_commodity)
+        assert market['stress_test_results'][name]['market_impact'] == pytest.approx(expected_market)
+        assert fx['stress_test_results'][name]['impact_change'] == pytest.approx(expected_fx - fx['current_fx_impact'])
+        assert fx['stress_test_results'][name]['scenario_probability'] == scenario.probability
+
+
+def test_thousands_of_user_scenarios(service):
+    scenarios = _random_scenarios(5000)
+
+    result = service.execute_currency_risk_scenario(CASH_FLOWS, scenarios=scenarios)
+
+    assert len(result['stress_test_results']) == 5000
+    user_7 = result['stress_test_results']['user_7']
+    sensitivity = service._fx_shock_sensitivity(
+        service._identify_currency_exposures(CASH_FLOWS), service.external_data.rates
+    )
+    assert sensitivity != 0
+    assert user_7['impact_change'] == pytest.approx(sensitivity * scenarios['user_7'].currency_shock)
+
+
+def test_added_scenarios_rebuild_shock_matrix(service):
+    assert len(service.get_shock_matrix().names) == 5
+
+    service.add_risk_scenarios(_random_scenarios(3))
+
+    matrix = service.get_shock_matrix()
+    assert matrix.shocks.shape == (8, 4)
+    assert matrix.names[-1] == 'user_2'
@@ -0,0 +1,113 @@
+"""
+Tests for the TTL / stale-while-revalidate cache
+"""
+
+import threading
+import time
+
+import pytest
+
+from app.core.ttl_cache import TTLCache, ttl_cached
+
+
+def test_fresh_hit_and_expiry():
+    """Values are reused within the TTL and reloaded after it"""
+    cache = TTLCache("test.fresh", ttl=0.05)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_load("k", loader) == 1
+    assert cache.get_or_load("k", loader) == 1
+    time.sleep(0.06)
+    assert cache.get_or_load("k", loader) == 2
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_stale_value_served_while_refreshing():
+    """A stale entry is returned immediately and refreshed in the background"""
+    cache = TTLCache("test.stale", ttl=0.01, stale_ttl=10)
+    refreshed = threading.Event()
+    values = iter(["old", "new"])
+
+    def loader():
+        value = next(values)
+        if value == "new":
+            refreshed.set()
+        return value
+
+    assert cache.get_or_load("k", loader) == "old"
+    time.sleep(0.02)
+    assert cache.get_or_load("k", loader) == "old"
+    assert refreshed.wait(2)
+    for _ in range(100):
+        if cache.stats()["inflight"] == 0:
+            break
+        time.sleep(0.01)
+    assert cache.get_or_load("k", loader) == "new"
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_concurrent_misses_share_one_load():
+    """Single-flight: callers arriving during a load wait for its result"""
+    cache = TTLCache("test.single_flight", ttl=60)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader))) for _ in range(5)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_errors_are_not_cached():
+    cache = TTLCache("test.errors", ttl=60)
+
+    def failing():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("k", failing)
+    assert cache.get_or_load("k", lambda: "ok") == "ok"
+    assert cache.stats()["errors"] == 1
+
+
+def test_decorator_keys_by_arguments_and_copies_lists():
+    class Service:
+        def __init__(self):
+            self.calls = 0
+
+        @ttl_cached("test.decorator", ttl=60)
+        def prices(self, symbols=None):
+            self.calls += 1
+            return list(symbols or [])
+
+    service = Service()
+    first = service.prices(["GOLD"])
+    first.append("mutated")
+
+    assert service.prices(["GOLD"]) == ["GOLD"]
+    assert service.prices(["OIL"]) == ["OIL"]
+    assert service.calls == 2
@@ -0,0 +1,87 @@
+"""
+Tests for compressed out-of-row storage of upload rows
+"""
+
+import zlib
+
+import pytest
+from sqlalchemy import event
+
+from app.core.compression import ZLIB, compress_json, decompress_json
+from app.models.data_upload import DataUpload, DataUploadBlob, DataUploadStatus
+
+ROWS = [{'date': f'2024-01-{day % 28 + 1:02d}', 'amount': 100 + day, 'customer': 'Контрагент'}
+        for day in range(500)]
+
+
+pytestmark = pytest.mark.tables(DataUpload.__table__, DataUploadBlob.__table__)
+
+
+@pytest.fixture
+def db(db):
+    db.add(DataUpload(id=1, user_id=1, name='Revenue', source_type='manual', category='revenue',
+                      raw_data=ROWS, preview_data=ROWS[:5], validation_errors=[],
+                      status=DataUploadStatus.COMPLETED))
+    db.commit()
+    db.expunge_all()
+    return db
+
+
+def test_json_round_trips_compressed():
+    codec, data = compress_json(ROWS)
+
+    assert decompress_json(codec, data) == ROWS
+    assert len(data) < len(str(ROWS)) / 5
+    assert decompress_json(ZLIB, zlib.compress(b'[1]')) == [1]
+
+
+def test_rows_are_stored_in_blob_table(db):
+    blob = db.get(DataUploadBlob, 1)
+
+    assert blob.size == len(blob.data)
+    assert blob.load() == ROWS
+    assert db.get(DataUpload, 1).raw_data == ROWS
+
+
+def test_listing_uploads_reads_only_metadata(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    uploads = db.query(DataUpload).filter(DataUpload.user_id == 1).all()
+    assert [(upload.name, upload.row_count) for upload in uploads] == [('Revenue', None)]
+
+    assert len(statements) == 1
+    assert 'preview_data' not in statements[0]
+    assert 'validation_errors' not in statements[0]
+    assert 'data_upload_blobs' not in statements[0]
+
+    # Deferred payloads are loaded together on first access
+    assert uploads[0].preview_data == ROWS[:5]
+    assert uploads[0].validation_errors == []
+    assert len(statements) == 2
+
+
+def test_clearing_rows_deletes_blob(db):
+    upload = db.get(DataUpload, 1)
+    upload.raw_data = None
+    db.commit()
+
+    assert db.get(DataUploadBlob, 1) is None
+    assert db.get(DataUpload, 1).raw_data is None
+
+
+def test_replacing_rows_updates_blob(db):
+    upload = db.get(DataUpload, 1)
+    upload.raw_data = ROWS[:3]
+    db.commit()
+    db.expunge_all()
+
+    assert db.get(DataUpload, 1).raw_data == ROWS[:3]
+    assert db.query(DataUploadBlob).count() == 1
+
+
+def test_deleting_upload_deletes_blob(db):
+    db.delete(db.get(DataUpload, 1))
+    db.commit()
+
+    assert db.query(DataUploadBlob).count() == 0
@@ -0,0 +1,122 @@
+"""
+Tests for corrections of processed uploads
+"""
+
+import pandas as pd
+import pytest
+
+from app.models.data_upload import DataUpload, DataUploadBlob, DataUploadStatus
+from app.services.dataset_store import ARROW, JSON, DatasetStore
+from app.services.streaming_ingest import ingest_csv
+from app.services.upload_corrections import apply_corrections
+from app.services.upload_jobs import ingest_frame
+from app.services.validation_service import ValidationService
+
+pytestmark = pytest.mark.tables(DataUpload.__table__, DataUploadBlob.__table__)
+
+FRAME = pd.DataFrame({
+    'date': pd.date_range('2024-01-01', periods=40, freq='D').strftime('%Y-%m-%d'),
+    'sum': [str(100 + i) for i in range(38)] + ['n/a', '1,5'],
+    'customer': [f'customer {i % 3}' for i in range(40)],
+})
+
+
+class _NoProgress:
+    def update(self, rows_processed: int, error_count: int) -> None:
+        pass
+
+
+class _CountingService(ValidationService):
+    def __init__(self):
+        super().__init__()
+        self.validated = []
+
+    def _validate_column(self, df, col_index, sign_columns):
+        self.validated.append(df.columns[col_index])
+        return super()._validate_column(df, col_index, sign_columns)
+
+
+@pytest.fixture(params=[ARROW, JSON])
+def store(request, tmp_path):
+    return DatasetStore(str(tmp_path / 'datasets'), storage=request.param)
+
+
+@pytest.fixture
+def upload(db, store):
+    upload = DataUpload(id=1, user_id=1, name='Revenue', source_type='csv', category='revenue',
+                        status=DataUploadStatus.PROCESSING)
+    db.add(upload)
+    db.flush()
+    ingest_frame(upload, FRAME, _NoProgress(), store=store)
+    db.commit()
+    return upload
+
+
+def test_remapped_column_is_validated_alone(upload, store):
+    assert any('amount' in error['message'] for error in upload.validation_errors)
+
+    service = _CountingService()
+    apply_corrections(upload, {'sum': 'amount'}, [], service=service, store=store)
+
+    assert service.validated == ['amount']
+    corrected = store.load_upload_frame(upload)
+    assert list(corrected.columns) == ['date', 'amount', 'customer']
+    assert upload.validation_errors == ValidationService().validate_financial_data(corrected, 'revenue')
+    assert [error['row'] for error in upload.validation_errors if error['column'] == 'amount'] == [39, 40]
+    assert upload.status == DataUploadStatus.FAILED
+
+
+def test_fixed_values_patch_validation_errors(upload, store):
+    apply_corrections(upload, {'sum': 'amount'}, [], store=store)
+
+    service = _CountingService()
+    apply_corrections(upload, {}, [{'row': 39, 'column': 'amount', 'value': '138'},
+                                   {'row': 40, 'column': 'amount', 'value': '1.5'}], service=service, store=store)
+
+    assert service.validated == ['amount']
+    assert upload.validation_errors == []
+    assert upload.error_count == 0
+    assert upload.status == DataUploadStatus.COMPLETED
+    assert store.load_upload_frame(upload)['amount'].tolist()[-2:] == ['138', '1.5']
+
+
+def test_upload_without_column_results_is_fully_validated(upload, store):
+    upload.column_validation = None
+    service = _CountingService()
+
+    apply_corrections(upload, {'sum': 'amount'}, [], service=service, store=store)
+
+    assert service.validated == ['date', 'amount', 'customer']
+    assert upload.column_validation['names'] == ['date', 'amount', 'customer']
+
+
+def test_streamed_upload_keeps_having_no_row_limit(tmp_path):
+    rows = 100_001
+    path = tmp_path / 'revenue.csv'
+    pd.DataFrame({
+        'date': pd.date_range('2000-01-01', periods=rows, freq='h').strftime('%Y-%m-%d %H:%M'),
+        'amount': range(1, rows + 1),
+        'customer': 'ACME',
+    }).to_csv(path, index=False)
+    store = DatasetStore(str(tmp_path / 'datasets'))
+    result = ingest_csv(str(path), 1, 'revenue', 'utf-8', store=store)
+    upload = DataUpload(id=1, user_id=1, name='Revenue', source_type='csv', category='revenue',
+                        dataset_path=result.dataset_path, validation_errors=result.validation_errors,
+                        column_validation=result.column_validation, status=DataUploadStatus.COMPLETED)
+    assert upload.validation_errors == []
+
+    apply_corrections(upload, {'customer': 'client'}, [], store=store)
+
+    assert upload.validation_errors == []
+    assert upload.status == DataUploadStatus.COMPLETED
+
+
+@pytest.mark.parametrize('mapping, values, message', [
+    ({'missing': 'amount'}, [], 'Unknown columns: missing'),
+    ({'sum': 'date'}, [], 'same name'),
+    ({}, [{'row': 41, 'column': 'sum', 'value': 1}], 'outside'),
+    ({}, [{'row': 1, 'column': 'amount', 'value': 1}], 'Unknown column: amount'),
+])
+def test_invalid_corrections_are_rejected(upload, store, mapping, values, message):
+    with pytest.raises(ValueError, match=message):
+        apply_corrections(upload, mapping, values, store=store)
@@ -0,0 +1,110 @@
+"""
+Tests for the upload DataFrame cache
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app.models.data_upload import DataUpload, DataUploadBlob, DataUploadStatus
+from app.services.upload_frames import UploadFrameCache, frame_nbytes
+
+
+def _rows(count: int, amount: int = 100):
+    return [{'date': f'2024-01-{day % 28 + 1:02d}', 'amount': amount + day} for day in range(count)]
+
+
+pytestmark = pytest.mark.tables(DataUpload.__table__, DataUploadBlob.__table__)
+
+
+@pytest.fixture
+def db(db):
+    db.add_all([
+        DataUpload(id=1, user_id=1, name='Revenue', source_type='manual', category='revenue',
+                   raw_data=_rows(50), status=DataUploadStatus.COMPLETED),
+        DataUpload(id=2, user_id=1, name='Expenses', source_type='manual', category='expenses',
+                   raw_data=_rows(50, amount=-10), status=DataUploadStatus.COMPLETED),
+        DataUpload(id=3, user_id=2, name='Other', source_type='manual', raw_data=_rows(5),
+                   status=DataUploadStatus.COMPLETED),
+        DataUpload(id=4, user_id=1, name='Empty', source_type='manual', status=DataUploadStatus.PENDING),
+    ])
+    db.commit()
+    return db
+
+
+def _count_statements(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_loads_missing_uploads_in_one_query(db):
+    cache = UploadFrameCache(max_bytes=10 * 1024 * 1024)
+    statements = _count_statements(db)
+
+    frames = cache.get_frames(db, [1, 2, 3, 4, 99])
+
+    assert len(statements) == 2
+    assert sorted(frames) == [1, 2, 3, 4]
+    assert frames[1].category == 'revenue'
+    assert frames[3].category == 'data'
+    assert frames[4].frame.empty
+    assert frames[2].frame['amount'].iloc[0] == -10
+
+    statements.clear()
+    again = cache.get_frames(db, [1, 2])
+
+    # Only the version check runs, the rows are not decoded again
+    assert len(statements) == 1
+    assert again[1].frame.equals(frames[1].frame)
+    assert cache.stats()['hits'] == 2
+
+
+def test_user_filter(db):
+    cache = UploadFrameCache(max_bytes=10 * 1024 * 1024)
+
+    assert sorted(cache.get_frames(db, [1, 3], user_id=1)) == [1]
+
+
+def test_callers_cannot_change_cached_frames(db):
+    cache = UploadFrameCache(max_bytes=10 * 1024 * 1024)
+    frame = cache.get_frames(db, [1])[1].frame
+
+    frame['amount'] = 0
+    frame.loc[0, 'date'] = 'changed'
+
+    cached = cache.get_frames(db, [1])[1].frame
+    assert cached['amount'].iloc[0] == 100
+    assert cached['date'].iloc[0] == '2024-01-01'
+
+
+def test_updated_upload_is_reloaded(db):
+    cache = UploadFrameCache(max_bytes=10 * 1024 * 1024)
+    cache.get_frames(db, [1])
+
+    upload = db.get(DataUpload, 1)
+    upload.raw_data = _rows(3, amount=7)
+    upload.updated_at = datetime(2030, 1, 1)
+    db.commit()
+
+    frame = cache.get_frames(db, [1])[1].frame
+    assert len(frame) == 3
+    assert frame['amount'].iloc[0] == 7
+    assert cache.stats()['size'] == 1
+
+
+def test_memory_bound_evicts_least_recently_used(db):
+    size = frame_nbytes(UploadFrameCache(max_bytes=1 << 30).get_frames(db, [1])[1].frame)
+    cache = UploadFrameCache(max_bytes=int(size * 1.5))
+
+    cache.get_frames(db, [1])
+    cache.get_frames(db, [2])
+
+    stats = cache.stats()
+    assert stats['size'] == 1
+    assert stats['evictions'] == 1
+    assert stats['bytes'] <= stats['max_bytes']
+    statements = _count_statements(db)
+    cache.get_frames(db, [2])
+    assert len(statements) == 1
@@ -0,0 +1,179 @@
+"""
+Tests for background upload processing
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import partial
+
+import pandas as pd
+import pytest
+
+from app.models.data_upload import DataUpload, DataUploadBlob, DataUploadStatus
+from app.models.upload_content import UploadContent
+from app.services import upload_jobs
+from app.services.content_index import DATA_UPLOAD, ContentIndex, parse_cache
+from app.services.dataset_store import JSON, dataset_store
+from app.services.upload_jobs import UploadJobRunner, process_file_upload
+
+CSV = pd.DataFrame({
+    'date': pd.date_range('2024-01-01', periods=25, freq='D').strftime('%Y-%m-%d'),
+    'amount': [str(100 + i) for i in range(24)] + ['oops'],
+    'customer': ['ACME'] * 25,
+}).to_csv(index=False).encode('utf-8')
+
+
+pytestmark = pytest.mark.tables(DataUpload.__table__, DataUploadBlob.__table__, UploadContent.__table__)
+
+
+@pytest.fixture(autouse=True)
+def json_datasets(monkeypatch):
+    monkeypatch.setattr(dataset_store, 'storage', JSON)
+
+
+def _pending_upload(db, upload_id: int = 1) -> DataUpload:
+    upload = DataUpload(id=upload_id, user_id=1, name='Revenue', source_type='csv', category='revenue',
+                        status=DataUploadStatus.PENDING)
+    db.add(upload)
+    db.commit()
+    return upload
+
+
+def test_upload_is_validated_in_chunks_with_progress(session_factory, monkeypatch):
+    monkeypatch.setattr(upload_jobs.settings, 'upload_chunk_rows', 10)
+    progress = []
+    monkeypatch.setattr(upload_jobs.JobProgress, 'update',
+                        lambda self, rows, errors: progress.append((self.upload.status, rows, errors)))
+    db = session_factory()
+    _pending_upload(db)
+
+    UploadJobRunner(1, session_factory).submit(
+        1, partial(process_file_upload, filename='revenue.csv', file_content=CSV, content_hash='hash-1')
+    ).result()
+
+    upload = db.get(DataUpload, 1)
+    db.refresh(upload)
+    assert upload.status == DataUploadStatus.FAILED
+    assert upload.row_count == 25
+    assert [error['row'] for error in upload.validation_errors] == [25]
+    assert [(rows, errors) for _, rows, errors in progress] == [(10, 0), (20, 0), (25, 1), (25, 1)]
+    assert progress[0][0] == DataUploadStatus.PROCESSING
+    assert len(upload.raw_data) == 25
+
+    # The result is indexed for identical re-uploads and the parsed file cached
+    result = ContentIndex(db).lookup(1, DATA_UPLOAD, 'hash-1', variant='revenue')
+    assert result['row_count'] == 25 and result['status'] == 'failed'
+    assert parse_cache.get('hash-1', 'revenue').validation_errors == upload.validation_errors
+
+
+def test_progress_is_recorded_on_the_upload(session_factory):
+    db = session_factory()
+    _pending_upload(db, upload_id=2)
+
+    UploadJobRunner(1, session_factory).submit(
+        2, partial(process_file_upload, filename='revenue.csv', file_content=CSV, content_hash='hash-2')
+    ).result()
+
+    upload = db.get(DataUpload, 2)
+    db.refresh(upload)
+    assert (upload.rows_processed, upload.error_count) == (25, 1)
+
+
+def test_failed_job_marks_upload_failed(session_factory):
+    db = session_factory()
+    _pending_upload(db, upload_id=3)
+
+    UploadJobRunner(1, session_factory).submit(
+        3, partial(process_file_upload, filename='revenue.csv', file_content=b'', content_hash='hash-3')
+    ).result()
+
+    upload = db.get(DataUpload, 3)
+    db.refresh(upload)
+    assert upload.status == DataUploadStatus.FAILED
+    assert upload.processing_log
+    assert db.query(UploadContent).count() == 0
+
+
+def test_queued_jobs_are_released_at_shutdown(session_factory, tmp_path):
+    db = session_factory()
+    _pending_upload(db, upload_id=4)
+    preview = tmp_path / 'revenue.csv'
+    preview.write_bytes(CSV)
+    db.add(DataUpload(id=5, user_id=1, name='Preview', source_type='csv', category='revenue',
+                      file_path=str(preview), status=DataUploadStatus.PROCESSING))
+    db.commit()
+
+    release = threading.Event()
+    runner = UploadJobRunner(1, session_factory)
+    runner.submit(4, lambda db, upload, progress: release.wait(5))
+    queued = [runner.submit(upload_id, lambda db, upload, progress: None) for upload_id in (4, 5)]
+
+    stopping = threading.Thread(target=runner.shutdown)
+    stopping.start()
+    while not all(future.cancelled() for future in queued):
+        time.sleep(0.01)
+    release.set()
+    stopping.join()
+
+    db.expire_all()
+    upload = db.get(DataUpload, 4)
+    assert upload.status == DataUploadStatus.FAILED
+    assert 'upload the file again' in upload.processing_log
+    # A confirmed preview can be confirmed again
+    assert db.get(DataUpload, 5).status == DataUploadStatus.PENDING
+
+
+def test_orphaned_uploads_are_recovered(session_factory, tmp_path):
+    db = session_factory()
+    preview = tmp_path / 'revenue.csv'
+    preview.write_bytes(CSV)
+    old = datetime(2020, 1, 1)
+    db.add_all([
+        DataUpload(id=6, user_id=1, name='Queued', source_type='csv', status=DataUploadStatus.PENDING,
+                   updated_at=old),
+        DataUpload(id=7, user_id=1, name='Running', source_type='csv', status=DataUploadStatus.PROCESSING,
+                   updated_at=old),
+        DataUpload(id=8, user_id=1, name='Confirmed', source_type='csv', file_path=str(preview),
+                   status=DataUploadStatus.PROCESSING, updated_at=old),
+        DataUpload(id=9, user_id=1, name='Previewed', source_type='csv', file_path=str(preview),
+                   status=DataUploadStatus.PENDING, updated_at=old),
+        DataUpload(id=10, user_id=1, name='Live', source_type='csv', status=DataUploadStatus.PROCESSING),
+    ])
+    db.commit()
+
+    assert UploadJobRunner(1, session_factory).recover(timedelta(minutes=30)) == 3
+
+    db.expire_all()
+    statuses = {upload.id: upload.status for upload in db.query(DataUpload)}
+    assert statuses == {
+        6: DataUploadStatus.FAILED,
+        7: DataUploadStatus.FAILED,
+        8: DataUploadStatus.PENDING,
+        9: DataUploadStatus.PENDING,
+        10: DataUploadStatus.PROCESSING,
+    }
+
+
+def test_unconfirmed_previews_expire(session_factory, tmp_path):
+    db = session_factory()
+    abandoned = tmp_path / 'abandoned.csv'
+    recent = tmp_path / 'recent.csv'
+    abandoned.write_bytes(CSV)
+    recent.write_bytes(CSV)
+    db.add_all([
+        DataUpload(id=11, user_id=1, name='Abandoned', source_type='csv', file_path=str(abandoned),
+                   status=DataUploadStatus.PENDING, updated_at=datetime(2020, 1, 1)),
+        DataUpload(id=12, user_id=1, name='Recent', source_type='csv', file_path=str(recent),
+                   status=DataUploadStatus.PENDING),
+    ])
+    db.commit()
+
+    assert UploadJobRunner(1, session_factory).recover(timedelta(minutes=30), timedelta(hours=24)) == 0
+
+    db.expire_all()
+    assert db.get(DataUpload, 11).status == DataUploadStatus.FAILED
+    assert db.get(DataUpload, 11).file_path is None
+    assert not abandoned.exists()
+    assert db.get(DataUpload, 12).status == DataUploadStatus.PENDING
+    assert recent.exists()
@@ -0,0 +1,86 @@
+"""
+Tests for upload previews and confirmed processing
+"""
+
+import os
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models.data_upload import DataUpload, DataUploadBlob, DataUploadStatus
+from app.services.dataset_store import JSON, DatasetStore
+from app.services.upload_jobs import UploadJobRunner
+from app.services.upload_preview import build_preview, process_confirmed_upload, read_head
+
+FRAME = pd.DataFrame({
+    'Дата': pd.date_range('2024-01-01', periods=300, freq='D').strftime('%Y-%m-%d'),
+    'Сумма': np.arange(300) * 10.0,
+    'customer': [f'customer {i % 7}' for i in range(300)],
+})
+
+
+pytestmark = pytest.mark.tables(DataUpload.__table__, DataUploadBlob.__table__)
+
+
+def test_csv_head_is_previewed(tmp_path):
+    path = tmp_path / 'revenue.csv'
+    FRAME.to_csv(path, index=False)
+
+    df, encoding = read_head(str(path), nrows=50)
+    preview = build_preview(df, encoding, 'revenue', preview_rows=3)
+
+    assert len(df) == 50
+    assert encoding == 'utf-8'
+    assert preview['columns'] == list(FRAME.columns)
+    assert [column['type'] for column in preview['column_types'].values()] == ['datetime', 'numeric', 'text']
+    assert len(preview['preview_data']) == 3
+
+
+def test_excel_head_is_read_without_loading_the_workbook(tmp_path):
+    path = tmp_path / 'revenue.xlsx'
+    FRAME.to_excel(path, index=False)
+
+    df, encoding = read_head(str(path), nrows=20)
+
+    assert encoding is None
+    assert list(df.columns) == list(FRAME.columns)
+    assert len(df) == 20
+    pd.testing.assert_frame_equal(df, pd.read_excel(path, nrows=20))
+
+
+def test_confirmed_upload_is_processed_with_mapping(tmp_path, session_factory):
+    path = tmp_path / 'revenue.csv'
+    FRAME.to_csv(path, index=False)
+    db = session_factory()
+    db.add(DataUpload(id=1, user_id=1, name='Revenue', source_type='csv', category='revenue',
+                      file_path=str(path), status=DataUploadStatus.PROCESSING))
+    db.commit()
+
+    store = DatasetStore(str(tmp_path / 'datasets'), storage=JSON)
+    UploadJobRunner(1, session_factory).submit(
+        1, partial(process_confirmed_upload, column_mapping={'Дата': 'date', 'Сумма': 'amount'}, store=store)
+    ).result()
+
+    upload = db.get(DataUpload, 1)
+    db.refresh(upload)
+    assert upload.status == DataUploadStatus.COMPLETED
+    assert upload.row_count == 300
+    assert sorted(upload.raw_data[0]) == ['amount', 'customer', 'date']
+    assert upload.file_path is None
+    assert not os.path.exists(path)
+
+
+def test_unreadable_confirmed_upload_fails(tmp_path, session_factory):
+    db = session_factory()
+    db.add(DataUpload(id=1, user_id=1, name='Revenue', source_type='csv', category='revenue',
+                      file_path=str(tmp_path / 'missing.csv'), status=DataUploadStatus.PROCESSING))
+    db.commit()
+
+    UploadJobRunner(1, session_factory).submit(1, partial(process_confirmed_upload, column_mapping={})).result()
+
+    upload = db.get(DataUpload, 1)
+    db.refresh(upload)
+    assert upload.status == DataUploadStatus.FAILED
+    assert upload.processing_log
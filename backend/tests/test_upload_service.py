@@ -0,0 +1,48 @@
+"""
+Tests for upload column type inference
+"""
+
+import numpy as np
+import pandas as pd
+
+from app.services.upload_service import UploadService
+
+
+def _frame(rows: int = 5000) -> pd.DataFrame:
+    return pd.DataFrame({
+        'date': pd.date_range('2024-01-01', periods=rows, freq='h').strftime('%d.%m.%Y %H:%M').astype(object),
+        'amount': [str(i * 1.5) for i in range(rows)],
+        'customer': [f'customer {i % 40}' for i in range(rows)],
+        'units': np.arange(rows),
+        'empty': [None] * rows,
+    })
+
+
+def test_types_are_inferred_from_a_sample():
+    df = _frame()
+    df.loc[17, 'amount'] = 'n.a.'
+
+    column_types = UploadService(type_sample_size=500).infer_column_types(df)
+
+    assert {col: column_type.type for col, column_type in column_types.items()} == {
+        'date': 'datetime',
+        'amount': 'numeric',
+        'customer': 'text',
+        'units': 'numeric',
+        'empty': 'text',
+    }
+    assert column_types['date'].date_format == '%d.%m.%Y %H:%M'
+    assert column_types['date'].confidence == 1.0
+    assert column_types['customer'].confidence == 1.0
+    assert column_types['empty'].confidence == 0.0
+
+
+def test_confidence_reflects_values_that_do_not_convert():
+    df = pd.DataFrame({'amount': ['1', '2', '3', 'x'] * 100})
+
+    service = UploadService(type_min_share=0.7)
+    column_types = service.infer_column_types(df)
+
+    assert column_types['amount'].type == 'numeric'
+    assert column_types['amount'].confidence == 0.75
+    assert UploadService().detect_data_types(df) == {'amount': 'text'}
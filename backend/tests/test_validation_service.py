@@ -0,0 +1,116 @@
+"""
+Tests for upload validation
+"""
+
+import numpy as np
+import pandas as pd
+
+from app.services import validation_service
+from app.services.validation_service import ChunkedValidation, ValidationService
+
+
+def _frame(rows: int = 20, freq: str = 'D') -> pd.DataFrame:
+    return pd.DataFrame({
+        'date': pd.date_range('2024-01-01', periods=rows, freq=freq).strftime('%Y-%m-%d').astype(object),
+        'amount': np.arange(1, rows + 1, dtype=np.int64).astype(object),
+        'description': [f'row {i}' for i in range(rows)],
+    })
+
+
+def test_row_errors_match_cell_checks():
+    df = _frame()
+    df.loc[3, 'amount'] = 'abc'
+    df.loc[4, 'amount'] = 2_000_000_000_000
+    df.loc[5, 'amount'] = None
+    df.loc[6, 'date'] = 'not a date'
+    df.loc[7, 'date'] = '03/15/2024'  # different format from the rest of the column
+    df.loc[8, 'date'] = '1850-06-01'
+
+    errors = ValidationService().validate_financial_data(df, 'revenue')
+
+    assert errors == [
+        {'row': 7, 'column': 'date', 'message': "Invalid date format: 'not a date'", 'severity': 'error'},
+        {'row': 9, 'column': 'date', 'message': 'Date 1850-06-01 is outside reasonable range', 'severity': 'warning'},
+        {'row': 4, 'column': 'amount', 'message': "Invalid numeric value: 'abc'", 'severity': 'error'},
+        {'row': 5, 'column': 'amount', 'message': 'Value 2000000000000 seems unusually large', 'severity': 'warning'},
+    ]
+
+
+def test_only_first_offenders_are_listed():
+    df = _frame(1000)
+    df.loc[10:509, 'amount'] = 'n/a'
+
+    errors = ValidationService(max_errors_per_rule=5).validate_financial_data(df, 'expenses')
+
+    amount_errors = [error for error in errors if error['column'] == 'amount']
+    assert [error['row'] for error in amount_errors[:5]] == [11, 12, 13, 14, 15]
+    assert amount_errors[5] == {
+        'row': None,
+        'column': 'amount',
+        'message': '500 invalid numeric values in total, only the first 5 rows are listed',
+        'severity': 'error',
+    }
+    assert len(amount_errors) == 6
+
+
+def test_clean_numeric_file_has_no_row_errors():
+    df = _frame(100_000, freq='min')
+    df['amount'] = df['amount'].astype(np.float64)
+
+    errors = ValidationService().validate_financial_data(df, 'revenue')
+
+    assert [error for error in errors if error['row'] is not None] == []
+
+
+def test_errors_by_column_match_chunked_validation():
+    df = _frame(300)
+    df.loc[3, 'amount'] = 'abc'
+    df.loc[8, 'date'] = '1850-06-01'
+    df.loc[20:, 'description'] = None
+    df.loc[299] = df.loc[298]
+
+    validation = ChunkedValidation(ValidationService(), 'revenue')
+    for start in range(0, len(df), 100):
+        validation.add(df.iloc[start:start + 100])
+
+    expected = ValidationService().validate_financial_data(df, 'revenue')
+    assert ValidationService().validate_by_column(df, 'revenue').errors() == expected
+    assert validation.by_column().errors() == expected
+
+
+def test_chunked_duplicate_check_is_bounded(monkeypatch):
+    monkeypatch.setattr(validation_service, 'MAX_DUPLICATE_CHECK_ROWS', 150)
+    df = _frame(300)
+    df.loc[100] = df.loc[0]
+    df.loc[120] = df.loc[0]
+    df.loc[299] = df.loc[1]
+
+    validation = ChunkedValidation(ValidationService(), 'revenue')
+    for start in range(0, len(df), 100):
+        validation.add(df.iloc[start:start + 100])
+
+    assert len(validation._row_hashes) == 148
+    assert validation.by_column().table['duplicates'] == [
+        {'row': None, 'column': None, 'message': "Found 2 duplicate rows in the first 150 rows", 'severity': 'warning'}
+    ]
+
+
+def test_revalidation_runs_only_corrected_columns(monkeypatch):
+    df = _frame(50)
+    df.columns = ['Period', 'sum', 'description']
+    df.loc[3, 'sum'] = 'abc'
+    service = ValidationService()
+    previous = service.validate_by_column(df, 'revenue')
+
+    validated = []
+    validate_column = service._validate_column
+    monkeypatch.setattr(service, '_validate_column',
+                        lambda df, col_index, sign_columns: validated.append(df.columns[col_index])
+                        or validate_column(df, col_index, sign_columns))
+
+    corrected = df.rename(columns={'sum': 'amount'})
+    result = service.revalidate(corrected, previous, {1}, values_changed=False)
+
+    assert validated == ['amount']
+    assert result.errors() == service.validate_financial_data(corrected, 'revenue')
+    assert {'row': 4, 'column': 'amount', 'message': "Invalid numeric value: 'abc'", 'severity': 'error'} in result.errors()
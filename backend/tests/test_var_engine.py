@@ -0,0 +1,132 @@
+"""
+Tests for the historical-simulation VaR engine
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.models.cbr_key_rate import CBRKeyRate
+from app.models.market_quote import MarketQuote
+from app.services.var_engine import (
+    FHS,
+    HS,
+    KEY_RATE_FACTOR,
+    RiskPortfolio,
+    VaREngine,
+    tail_metrics,
+)
+
+START = date(2024, 1, 1)
+
+
+pytestmark = pytest.mark.tables(MarketQuote.__table__, CBRKeyRate.__table__)
+
+
+@pytest.fixture
+def db(db):
+    db.add_all([
+        CBRKeyRate(date=datetime(2023, 12, 15), effective_date=datetime(2023, 12, 18), rate=16.0),
+        CBRKeyRate(date=datetime(2024, 4, 26), effective_date=datetime(2024, 4, 29), rate=16.0),
+        CBRKeyRate(date=datetime(2024, 7, 26), effective_date=datetime(2024, 7, 29), rate=18.0),
+    ])
+    db.commit()
+    return db
+
+
+def _prices(days: int, seed: int = 2):
+    rng = np.random.default_rng(seed)
+    usd = 90 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+    eur = 98 * np.exp(np.cumsum(rng.normal(0, 0.008, days)))
+    return usd, eur
+
+
+def _record(db, usd, eur, first: int = 0):
+    quotes = []
+    for i in range(first, len(usd)):
+        timestamp = datetime.combine(START + timedelta(days=i), datetime.min.time())
+        quotes += [("USD/RUB", float(usd[i]), timestamp), ("EUR/RUB", float(eur[i]), timestamp)]
+    MarketQuote.record(db, "fx", quotes, source="moex")
+    db.commit()
+
+
+PORTFOLIO = RiskPortfolio({"USD/RUB": 1_500_000.0, "EUR/RUB": -800_000.0, KEY_RATE_FACTOR: -400_000.0})
+
+
+def _naive_pnl(usd, eur, window: int):
+    """Reference: revalue the portfolio day by day"""
+    pnl = []
+    for i in range(len(usd) - window, len(usd)):
+        day = START + timedelta(days=i)
+        previous = day - timedelta(days=1)
+        key_rate_move = (_key_rate_on(day) - _key_rate_on(previous)) / 100
+        pnl.append(
+            1_500_000.0 * np.log(usd[i] / usd[i - 1])
+            - 800_000.0 * np.log(eur[i] / eur[i - 1])
+            - 400_000.0 * key_rate_move
+        )
+    return np.array(pnl)
+
+
+def _key_rate_on(day: date) -> float:
+    return 18.0 if day >= date(2024, 7, 29) else 16.0
+
+
+def test_tail_metrics_match_sorted_sample():
+    pnl = np.random.default_rng(4).normal(0, 1000, 500)
+
+    value_at_risk, expected_shortfall = tail_metrics(pnl, 0.95)
+
+    worst = np.sort(pnl)[:26]
+    assert value_at_risk == pytest.approx(-worst[-1])
+    assert expected_shortfall == pytest.approx(-worst.mean())
+    assert expected_shortfall >= value_at_risk
+
+
+def test_historical_var_matches_daily_revaluation(db):
+    usd, eur = _prices(300)
+    _record(db, usd, eur)
+
+    result = VaREngine().compute(db, PORTFOLIO, window=250, confidence=0.99, method=HS)
+
+    expected = tail_metrics(_naive_pnl(usd, eur, 250), 0.99)
+    assert result.observations == 250
+    assert result.as_of == START + timedelta(days=299)
+    assert (result.value_at_risk, result.expected_shortfall) == pytest.approx(expected)
+
+
+def test_appended_day_is_computed_incrementally(db):
+    usd, eur = _prices(301)
+    _record(db, usd[:300], eur[:300])
+    engine = VaREngine()
+    first = engine.compute(db, PORTFOLIO, window=250, confidence=0.95, method=HS)
+    assert engine.compute(db, PORTFOLIO, window=250, confidence=0.95, method=HS) is first
+
+    _record(db, usd, eur, first=300)
+    incremental = engine.compute(db, PORTFOLIO, window=250, confidence=0.95, method=HS)
+    full = VaREngine().compute(db, PORTFOLIO, window=250, confidence=0.95, method=HS)
+
+    assert incremental.as_of == full.as_of == START + timedelta(days=300)
+    assert incremental.value_at_risk == pytest.approx(full.value_at_risk)
+    assert incremental.expected_shortfall == pytest.approx(full.expected_shortfall)
+
+
+def test_filtered_historical_simulation_scales_to_current_volatility(db):
+    usd, eur = _prices(300)
+    # Calm history, turbulent last month
+    usd[-30:] = usd[-31] * np.exp(np.cumsum(np.random.default_rng(9).normal(0, 0.04, 30)))
+    _record(db, usd, eur)
+    portfolio = RiskPortfolio({"USD/RUB": 1_000_000.0})
+
+    hs = VaREngine().compute(db, portfolio, window=250, confidence=0.99, method=HS)
+    fhs = VaREngine().compute(db, portfolio, window=250, confidence=0.99, method=FHS)
+
+    assert fhs.value_at_risk > hs.value_at_risk
+
+
+def test_not_enough_history(db):
+    usd, eur = _prices(10)
+    _record(db, usd, eur)
+
+    assert VaREngine().compute(db, PORTFOLIO, window=250) is None
@@ -23,6 +23,9 @@ import { uploadApi } from '@/lib/api';
 import { toast } from 'react-hot-toast';
 import { DataVisualization } from '@/components/upload/DataVisualization';
 
+// Give up waiting for background processing after this long
+const PROCESSING_TIMEOUT_MS = 10 * 60 * 1000;
+
 interface DataUploadProps {
   onUploadComplete?: (uploadId: string) => void;
 }
@@ -90,9 +93,25 @@ export const DataUpload: React.FC<DataUploadProps> = ({ onUploadComplete }) => {
         formData.append('description', `Uploaded ${file.name}`);
         formData.append('category', 'revenue'); // Default category, should be selected by user
 
-        // Upload file
+        // Upload file; it is parsed and validated in the background
         const response = await uploadApi.uploadFile(formData);
         
+        setUploadProgress(prev => 
+          prev.map(upload => 
+            upload.id === uploadId 
+              ? { ...upload, status: 'processing', progress: 0 }
+              : upload
+          )
+        );
+        
+        const responseData = await waitForProcessing(response.data, (progress) =>
+          setUploadProgress(prev => 
+            prev.map(upload => 
+              upload.id === uploadId ? { ...upload, progress } : upload
+            )
+          )
+        );
+        
         setUploadProgress(prev => 
           prev.map(upload => 
             upload.id === uploadId 
@@ -101,8 +120,7 @@ export const DataUpload: React.FC<DataUploadProps> = ({ onUploadComplete }) => {
           )
         );
         
-        const responseData = response.data;
-        toast.success(`File ${file.name} uploaded successfully - ${responseData.row_count} rows, ${responseData.column_count} columns`);
+        toast.success(`File ${file.name} uploaded successfully - ${responseData.row_count} rows, ${responseData.error_count ?? responseData.validation_errors?.length ?? 0} issues`);
         console.log('Upload successful:', responseData);
         setCompletedUploadId(responseData.upload_id);
         onUploadComplete?.(responseData.upload_id);
@@ -125,6 +143,27 @@ export const DataUpload: React.FC<DataUploadProps> = ({ onUploadComplete }) => {
     }
   };
 
+  // Poll the upload's progress until its background processing has finished
+  const waitForProcessing = async (upload: any, onProgress: (progress: number) => void): Promise<any> => {
+    const deadline = Date.now() + PROCESSING_TIMEOUT_MS;
+    let state = upload;
+    // An interrupted job leaves a processing_log behind, whatever the status
+    while ((state.status === 'pending' || state.status === 'processing') && !state.processing_log) {
+      if (Date.now() > deadline) {
+        throw new Error('Processing is taking longer than expected, check the upload list later');
+      }
+      await new Promise(resolve => setTimeout(resolve, 1000));
+      state = (await uploadApi.getUploadProgress(upload.upload_id)).data;
+      if (state.row_count) {
+        onProgress(Math.round((state.rows_processed ?? 0) / state.row_count * 100));
+      }
+    }
+    if (state.processing_log) {
+      throw new Error(state.processing_log);
+    }
+    return state;
+  };
+
   const isValidFileType = (file: File): boolean => {
     const validTypes = [
       'text/csv',
@@ -173,6 +173,12 @@ export const uploadApi = {
   }),
   getUploads: () => api.get('/uploads'),
   getUpload: (uploadId: number) => api.get(`/uploads/${uploadId}`),
+  getUploadProgress: (uploadId: number) => api.get(`/uploads/${uploadId}/progress`),
+  correctUpload: (uploadId: number, formData: FormData) => api.post(`/uploads/${uploadId}/corrections`, formData, {
+    headers: {
+      'Content-Type': 'multipart/form-data',
+    },
+  }),
   deleteUpload: (uploadId: number) => api.delete(`/uploads/${uploadId}`),
   downloadTemplate: (category: string) => api.get(`/template/${category}`, {
     responseType: 'blob',